@@ -1,15 +1,23 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query, Security
 from fastapi.security import APIKeyHeader
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from pydantic import BaseModel, Field
 import uvicorn
 import logging
 from datetime import datetime
+import hashlib
 import os
+import tempfile
+import threading
+import uuid
 from pathlib import Path
 
-from pdf_processor import PDFSearchEngine
+from bounded_executor import BoundedExecutor, ExecutorQueueFull
+from document_catalog import DocumentCatalog
+from ingest_jobs import IngestJob, IngestWorkerPool, JobStore
 from search_result import SearchResult
 
 # API-Modelle
@@ -26,6 +34,22 @@ class SearchResponse(BaseModel):
     results: List[Dict]
     execution_time_ms: float
 
+class SearchBatchRequest(BaseModel):
+    queries: List[SearchQuery] = Field(..., description="Liste der Suchanfragen")
+
+class SearchBatchItem(BaseModel):
+    query: str
+    total_results: int
+    results: List[Dict]
+    execution_time_ms: float
+    error: Optional[str] = None
+
+class SearchBatchResponse(BaseModel):
+    timestamp: datetime
+    total_queries: int
+    results: List[SearchBatchItem]
+    execution_time_ms: float
+
 class ErrorResponse(BaseModel):
     error: str
     detail: Optional[str] = None
@@ -38,6 +62,22 @@ class APIConfig:
         self.upload_dir.mkdir(exist_ok=True)
         self.api_keys = os.environ.get("API_KEYS", "test_key").split(",")
         self.max_file_size = 100 * 1024 * 1024  # 100MB
+        self.upload_chunk_size = 1024 * 1024  # Uploads werden in 1MB-Blöcken geschrieben
+        self.max_batch_size = int(os.environ.get("SEARCH_BATCH_MAX_QUERIES", "256"))
+        
+        # Uploads laufen als Hintergrundaufträge, getrennt vom Query-Pool
+        self.ingest_workers = int(os.environ.get("INGEST_WORKERS", "1"))
+        self.ingest_queue_size = int(os.environ.get("INGEST_QUEUE_SIZE", "100"))  # max. wartende Aufträge
+        self.ingest_lease_seconds = float(os.environ.get("INGEST_LEASE_SECONDS", "120"))  # ohne Lebenszeichen gilt ein Auftrag als verwaist
+        self.query_workers = int(os.environ.get("QUERY_WORKERS", "4"))
+        self.query_queue_size = int(os.environ.get("QUERY_QUEUE_SIZE", "64"))
+        
+        # Suchmaschine und Modell werden erst bei der ersten Anfrage geladen (schneller Kaltstart);
+        # PRELOAD_SEARCH_ENGINE=1 lädt sie direkt nach dem Start im Hintergrund
+        self.persist_directory = os.environ.get("PERSIST_DIRECTORY", "./chroma_db")
+        # Auftragsdatenbank liegt bei den übrigen Daten, nicht im Arbeitsverzeichnis
+        self.jobs_db = os.environ.get("INGEST_JOBS_DB", str(Path(self.persist_directory) / "ingest_jobs.db"))
+        self.preload_search_engine = os.environ.get("PRELOAD_SEARCH_ENGINE", "0").lower() in ("1", "true", "yes")
 
 # API Setup
 app = FastAPI(
@@ -48,9 +88,86 @@ app = FastAPI(
 
 api_key_header = APIKeyHeader(name="X-API-Key")
 config = APIConfig()
-search_engine = PDFSearchEngine(persist_directory="./chroma_db")
 logger = logging.getLogger(__name__)
 
+_search_engine = None
+_search_engine_lock = threading.Lock()
+
+def get_search_engine():
+    """Erzeugt die Suchmaschine beim ersten Aufruf (importiert erst dann chromadb, fitz und NLTK)"""
+    global _search_engine
+    if _search_engine is None:
+        with _search_engine_lock:
+            if _search_engine is None:
+                from pdf_processor import PDFSearchEngine
+                
+                start = datetime.now()
+                _search_engine = PDFSearchEngine(persist_directory=config.persist_directory)
+                logger.info(f"Suchmaschine initialisiert in {(datetime.now() - start).total_seconds():.1f}s")
+    return _search_engine
+
+# Dokumentliste direkt aus dem Katalog, ohne die Suchmaschine zu laden
+document_catalog = DocumentCatalog(Path(config.persist_directory) / "pdf_chunks_catalog.json")
+
+query_executor = BoundedExecutor("query", config.query_workers, config.query_queue_size)
+
+def queue_full_exception(exc: ExecutorQueueFull) -> HTTPException:
+    """503-Antwort mit Retry-After, wenn ein Executor keine Aufgaben mehr annimmt"""
+    return HTTPException(
+        status_code=503,
+        detail="Server ausgelastet, bitte später erneut versuchen",
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+def process_ingest_job(job: IngestJob, report) -> Optional[str]:
+    """Verarbeitet einen Import-Auftrag; liefert eine Fehlermeldung oder None"""
+    success, error_message = get_search_engine().load_pdf(
+        job.file_path, job.content_hash, progress=report, document_name=job.filename
+    )
+    if not success:
+        return error_message or "Fehler bei der PDF-Verarbeitung"
+    return None
+
+job_store = JobStore(config.jobs_db, lease_timeout=config.ingest_lease_seconds)
+ingest_workers = IngestWorkerPool(job_store, process_ingest_job, workers=config.ingest_workers)
+
+async def save_upload(file: UploadFile, target_path: Path) -> Tuple[int, str]:
+    """
+    Schreibt einen Upload blockweise auf die Festplatte
+    
+    Die Größe wird während des Lesens geprüft und der SHA-256 nebenbei
+    berechnet; erst die vollständige Datei wird atomar an ihren Zielort
+    umbenannt. Der Speicherbedarf ist unabhängig von der Dateigröße.
+    Schreiben und Hashen laufen im Threadpool, damit große Uploads die
+    Event-Loop nicht blockieren.
+    
+    Returns:
+        (Dateigröße in Bytes, SHA-256 als Hex-String)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=target_path.parent, suffix=".part")
+    
+    def write_block(f, block: bytes) -> None:
+        digest.update(block)
+        f.write(block)
+    
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                block = await file.read(config.upload_chunk_size)
+                if not block:
+                    break
+                size += len(block)
+                if size > config.max_file_size:
+                    raise HTTPException(413, "Datei zu groß (max. 100MB)")
+                await run_in_threadpool(write_block, f, block)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+    return size, digest.hexdigest()
+
 # Authentifizierung
 async def verify_api_key(api_key: str = Security(api_key_header)) -> str:
     if api_key not in config.api_keys:
@@ -61,39 +178,46 @@ async def verify_api_key(api_key: str = Security(api_key_header)) -> str:
     return api_key
 
 # Endpunkte
-@app.post("/documents/upload", response_model=Dict)
+@app.post("/documents/upload", response_model=Dict, status_code=202)
 async def upload_document(
     file: UploadFile = File(...),
     api_key: str = Depends(verify_api_key)
 ):
-    """PDF-Dokument hochladen und verarbeiten"""
+    """PDF-Dokument hochladen und zur Verarbeitung einreihen (Fortschritt über /jobs/{job_id})"""
     try:
         # Validierung
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(400, "Nur PDF-Dateien sind erlaubt")
         
-        file_path = config.upload_dir / file.filename
+        if job_store.count("queued") >= config.ingest_queue_size:
+            raise HTTPException(
+                status_code=503,
+                detail="Zu viele wartende Import-Aufträge, bitte später erneut versuchen",
+                headers={"Retry-After": "30"}
+            )
         
-        # Datei speichern
+        # Eindeutiger Speicherort je Upload: ein späterer Upload mit gleichem Namen darf die
+        # Datei eines noch wartenden Auftrags nicht überschreiben (Hash gehört zum Inhalt)
+        filename = Path(file.filename).name
+        file_path = config.upload_dir / f"{uuid.uuid4().hex}_{filename}"
+        
+        # Datei blockweise speichern (Größenlimit und Hash während des Schreibens)
         try:
-            content = await file.read()
-            if len(content) > config.max_file_size:
-                raise HTTPException(400, "Datei zu groß (max. 100MB)")
-                
-            with open(file_path, "wb") as f:
-                f.write(content)
+            _, content_hash = await save_upload(file, file_path)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(500, f"Fehler beim Speichern der Datei: {str(e)}")
         
-        # PDF verarbeiten
-        success, error_message = search_engine.load_pdf(str(file_path))
-        
-        if not success:
-            raise HTTPException(400, error_message or "Fehler bei der PDF-Verarbeitung")
+        # Auftrag einreihen; die Verarbeitung übernehmen die Ingest-Worker
+        job = job_store.create(filename, str(file_path), content_hash)
+        ingest_workers.notify()
         
         return {
-            "message": "Dokument erfolgreich verarbeitet",
-            "filename": file.filename,
+            "message": "Dokument zur Verarbeitung eingereiht",
+            "job_id": job.id,
+            "status_url": f"/jobs/{job.id}",
+            "filename": filename,
             "timestamp": datetime.now().isoformat()
         }
         
@@ -113,16 +237,20 @@ async def search_documents(
     
     try:
         # Filter vorbereiten
-        filter_dict = {"document": query.document_filter} if query.document_filter else None
+        filter_dict = {"document_name": query.document_filter} if query.document_filter else None
         
-        # Suche durchführen
-        results = search_engine.search(
-            query=query.query,
-            top_k=query.top_k,
-            min_score=query.min_score,
-            filter_dict=filter_dict,
-            format_output=False
-        )
+        # Suche im Query-Pool durchführen
+        try:
+            results = await query_executor.run(
+                lambda **kwargs: get_search_engine().search(**kwargs),
+                query=query.query,
+                top_k=query.top_k,
+                min_score=query.min_score,
+                filter_dict=filter_dict,
+                format_output=False
+            )
+        except ExecutorQueueFull as e:
+            raise queue_full_exception(e)
         
         # Fehlerbehandlung
         if isinstance(results, tuple) and not results[0]:
@@ -145,27 +273,122 @@ async def search_documents(
         logger.error(f"Fehler bei der Suche: {str(e)}")
         raise HTTPException(500, "Interner Serverfehler")
 
+@app.post("/search/batch", response_model=SearchBatchResponse)
+async def search_documents_batch(
+    batch: SearchBatchRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """Mehrere Suchanfragen in einem Aufruf (ein Modelldurchlauf für alle Queries)"""
+    start_time = datetime.now()
+    
+    if not batch.queries:
+        raise HTTPException(400, "Mindestens eine Suchanfrage erforderlich")
+    if len(batch.queries) > config.max_batch_size:
+        raise HTTPException(400, f"Zu viele Suchanfragen (max. {config.max_batch_size})")
+    
+    try:
+        results = await query_executor.run(lambda queries: get_search_engine().search_batch(queries), [
+            {
+                "query": q.query,
+                "top_k": q.top_k,
+                "min_score": q.min_score,
+                "filter_dict": {"document_name": q.document_filter} if q.document_filter else None
+            }
+            for q in batch.queries
+        ])
+        
+        execution_time = (datetime.now() - start_time).total_seconds() * 1000
+        
+        return SearchBatchResponse(
+            timestamp=datetime.now(),
+            total_queries=len(results),
+            results=[SearchBatchItem(**r.to_dict()) for r in results],
+            execution_time_ms=execution_time
+        )
+        
+    except ExecutorQueueFull as e:
+        raise queue_full_exception(e)
+    except Exception as e:
+        logger.error(f"Fehler bei der Batch-Suche: {str(e)}")
+        raise HTTPException(500, "Interner Serverfehler")
+
+@app.get("/jobs/{job_id}", response_model=Dict)
+async def get_job(
+    job_id: str,
+    api_key: str = Depends(verify_api_key)
+):
+    """Status, Phase, Fortschritt und Restzeit eines Import-Auftrags"""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Auftrag nicht gefunden")
+    return job.to_dict()
+
 @app.get("/documents", response_model=List[str])
 async def list_documents(
     api_key: str = Depends(verify_api_key)
 ):
     """Liste aller verfügbaren Dokumente"""
     try:
-        documents = search_engine.vector_store.list_documents()
-        return documents
+        # Bestehende Datenbanken ohne Katalog: die Suchmaschine baut ihn beim Laden auf
+        if not document_catalog.exists() and (Path(config.persist_directory) / "chroma.sqlite3").exists():
+            return await query_executor.run(lambda: get_search_engine().vector_store.list_documents())
+        return document_catalog.names()
+    except ExecutorQueueFull as e:
+        raise queue_full_exception(e)
     except Exception as e:
         logger.error(f"Fehler beim Abrufen der Dokumentenliste: {str(e)}")
         raise HTTPException(500, "Interner Serverfehler")
 
+@app.get("/stats/cache", response_model=Dict)
+async def cache_statistics(
+    api_key: str = Depends(verify_api_key)
+):
+    """Trefferquoten und Verdrängungen der Such-Caches"""
+    if _search_engine is None:
+        return {"search_engine_loaded": False}
+    return _search_engine.cache_stats()
+
+@app.get("/stats/executors", response_model=Dict)
+async def executor_statistics(
+    api_key: str = Depends(verify_api_key)
+):
+    """Warteschlangentiefe und Wartezeiten des Query-Pools sowie Stand der Import-Aufträge"""
+    return {
+        "ingest_jobs": {
+            status: job_store.count(status)
+            for status in ("queued", "running", "done", "failed")
+        },
+        "query": query_executor.metrics()
+    }
+
+@app.on_event("startup")
+def start_ingest_workers():
+    ingest_workers.start()
+    if config.preload_search_engine:
+        threading.Thread(target=preload_search_engine, name="preload", daemon=True).start()
+
+def preload_search_engine():
+    """Lädt Suchmaschine und Modell vorab, damit die erste Suche nicht darauf wartet"""
+    try:
+        get_search_engine().encoder.encode(["Aufwärmen"])
+    except Exception as e:
+        logger.error(f"Vorabladen der Suchmaschine fehlgeschlagen: {str(e)}")
+
+@app.on_event("shutdown")
+def shutdown_executors():
+    ingest_workers.stop()
+    query_executor.shutdown(wait=False)
+
 # Error Handler
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     return JSONResponse(
         status_code=exc.status_code,
-        content=ErrorResponse(
+        content=jsonable_encoder(ErrorResponse(
             error=exc.detail,
             timestamp=datetime.now()
-        ).dict()
+        ).dict()),
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
@@ -173,11 +396,11 @@ async def general_exception_handler(request, exc):
     logger.error(f"Unbehandelter Fehler: {str(exc)}")
     return JSONResponse(
         status_code=500,
-        content=ErrorResponse(
+        content=jsonable_encoder(ErrorResponse(
             error="Interner Serverfehler",
             detail=str(exc),
             timestamp=datetime.now()
-        ).dict()
+        ).dict())
     )
 
 # Server starten
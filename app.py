@@ -1,11 +1,18 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 import os
-import re
+import json
+import uuid
+import zlib
 import logging
 import PyPDF2
 import anthropic
 
+from extraction_cache import ExtractionCache, hash_file
+from memory_cache import MemoryCache
+from parallel_extraction import DEFAULT_MIN_PAGES, extract_pages_parallel
+from sentence_index import SentenceIndex, extract_keywords
+
 # Konfigurieren Sie das Logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -19,176 +26,142 @@ anthropic_client = None
 if os.environ.get('ANTHROPIC_API_KEY'):
     anthropic_client = anthropic.Anthropic(api_key=os.environ.get('ANTHROPIC_API_KEY'))
 
+# Serverseitiger Dokumenten-Cache: /process_pdf legt den Satzindex ab, /search greift über die doc_id darauf zu
+document_cache = MemoryCache(
+    max_entries=int(os.environ.get('DOC_CACHE_MAX_ENTRIES', 64)),
+    max_bytes=int(os.environ.get('DOC_CACHE_MAX_BYTES', 256 * 1024 * 1024)),
+    ttl_seconds=float(os.environ.get('DOC_CACHE_TTL_SECONDS', 3600)),
+    size_of=lambda index: index.estimated_size()
+)
+
+# Inhaltsadressierter Extraktions-Cache (gemeinsam mit api.py nutzbar über EXTRACTION_CACHE_DIR)
+extraction_cache = ExtractionCache()
+EXTRACTION_BACKEND = 'pypdf2'
+
+# Parallele Seitenextraktion (1 = seriell, 0 = alle CPU-Kerne). Standardmäßig
+# höchstens zwei Prozesse pro Anfrage: gleichzeitige Uploads starten jeweils
+# eigene Prozesse und würden die Kerne sonst mehrfach belegen
+EXTRACTION_WORKERS = int(os.environ.get('PDF_EXTRACTION_WORKERS', 2))
+PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', DEFAULT_MIN_PAGES))
+
 # Hilfsfunktionen
+def iter_pdf_pages(pdf_path):
+    """Liefert den Text jeder Seite, sobald PyPDF2 sie extrahiert hat."""
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+
+def extract_page_range(pdf_path, start, end):
+    """Extrahiert die Seiten start..end-1 (läuft auch in Worker-Prozessen)."""
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+def join_pages(pages):
+    """Fügt Seitentexte in linearer Zeit zu einem Gesamttext zusammen."""
+    return "".join(page_text + "\n" for page_text in pages)
+
+def extract_pages_from_pdf(pdf_path):
+    """Liefert die Seitentexte einer PDF, bei identischem Inhalt aus dem Extraktions-Cache."""
+    content_hash = hash_file(pdf_path)
+    cached = extraction_cache.get(content_hash, EXTRACTION_BACKEND)
+    if cached:
+        return cached.pages
+    
+    with open(pdf_path, 'rb') as file:
+        page_count = len(PyPDF2.PdfReader(file).pages)
+    
+    pages = extract_pages_parallel(
+        pdf_path,
+        page_count,
+        extract_page_range,
+        max_workers=EXTRACTION_WORKERS,
+        min_pages=PARALLEL_MIN_PAGES
+    )
+    extraction_cache.put(content_hash, EXTRACTION_BACKEND, pages)
+    return pages
+
 def extract_text_from_pdf(pdf_path):
     """Extrahiert Text aus einer PDF-Datei."""
     try:
-        text = ""
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                text += page.extract_text() + "\n"
-        
-        return text
+        return join_pages(extract_pages_from_pdf(pdf_path))
     except Exception as e:
         logger.error(f"Fehler beim Extrahieren des Textes: {str(e)}")
         raise
 
-def get_direct_answer(query, text):
+def cache_document(text):
+    """Legt den Satzindex eines Textes im Dokumenten-Cache ab und gibt die doc_id zurück."""
+    doc_id = uuid.uuid4().hex
+    if not document_cache.put(doc_id, SentenceIndex(text)):
+        logger.warning(f"Text zu groß für den Dokumenten-Cache: {len(text)} Zeichen")
+        return None
+    return doc_id
+
+def stream_pdf_pages(pdf_path):
+    """
+    Erzeugt NDJSON-Zeilen mit dem Text jeder Seite, sobald sie extrahiert ist.
+    
+    Die letzte Zeile enthält {"done": true, "page_count": ..., "doc_id": ...}.
+    Tritt ein Fehler auf, wird stattdessen {"error": ...} gesendet.
+    """
+    pages = []
+    try:
+        content_hash = hash_file(pdf_path)
+        cached = extraction_cache.get(content_hash, EXTRACTION_BACKEND)
+        page_source = cached.pages if cached else iter_pdf_pages(pdf_path)
+        
+        for page_num, page_text in enumerate(page_source, 1):
+            pages.append(page_text)
+            yield json.dumps({'page': page_num, 'text': page_text}, ensure_ascii=False) + "\n"
+        
+        if not cached:
+            extraction_cache.put(content_hash, EXTRACTION_BACKEND, pages)
+        
+        doc_id = cache_document(join_pages(pages))
+        yield json.dumps({'done': True, 'page_count': len(pages), 'doc_id': doc_id}) + "\n"
+    except Exception as e:
+        logger.error(f"Fehler beim Streamen der PDF: {str(e)}")
+        yield json.dumps({'error': f'Fehler bei der Verarbeitung: {str(e)}', 'page_count': len(pages)}) + "\n"
+
+def gzip_stream(chunks):
+    """Komprimiert einen Stream mit gzip und leert den Puffer nach jedem Teilstück."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def get_direct_answer(query, text, index=None):
     """
     Versucht, eine direkte Antwort auf eine Frage im Text zu finden.
     
     Args:
         query (str): Die Suchanfrage/Frage
         text (str): Der Text, in dem gesucht werden soll
+        index (SentenceIndex): Optional - vorberechneter Satzindex des Textes
     
     Returns:
         dict: Ein Dictionary mit der gefundenen Antwort oder einer Fehlermeldung
     """
     logger.debug(f"get_direct_answer aufgerufen mit Query: '{query}'")
-    logger.debug(f"Text-Länge: {len(text)} Zeichen")
+    logger.debug(f"Text-Länge: {len(text) if text else 0} Zeichen")
     
     if not query or not text:
         logger.warning("Query oder Text ist leer")
         return {"direct_answer": None, "error": "Query oder Text ist leer"}
     
-    # Bereinigen der Query für die Regex-Suche
-    cleaned_query = query.lower().strip()
-    cleaned_query = re.sub(r'[?.,!]', '', cleaned_query)
-    logger.debug(f"Bereinigte Query: '{cleaned_query}'")
-    
-    # Extrahiere wichtige Schlüsselwörter (Wörter mit mehr als 3 Buchstaben)
-    keywords = [word for word in cleaned_query.split() if len(word) > 3]
+    keywords = extract_keywords(query)
     logger.debug(f"Extrahierte Schlüsselwörter: {keywords}")
     
-    if not keywords:
-        # Wenn keine langen Schlüsselwörter gefunden wurden, verwende alle Wörter
-        keywords = cleaned_query.split()
-        logger.debug(f"Keine langen Schlüsselwörter gefunden, verwende alle Wörter: {keywords}")
-    
-    # Verschiedene Suchmuster ausprobieren
-    patterns = [
-        # Muster 1: Sätze, die alle Schlüsselwörter enthalten
-        rf"(?i)[^.!?]*{' '.join([rf'.*\b{re.escape(word)}\b' for word in keywords])}.*?[.!?]",
-        
-        # Muster 2: Sätze, die mindestens ein Schlüsselwort enthalten
-        rf"(?i)[^.!?]*({'|'.join([rf'\b{re.escape(word)}\b' for word in keywords])}).*?[.!?]"
-    ]
-    
-    for i, pattern in enumerate(patterns):
-        logger.debug(f"Versuche Muster {i+1}: {pattern}")
-        try:
-            matches = re.findall(pattern, text)
-            logger.debug(f"Gefundene Übereinstimmungen für Muster {i+1}: {len(matches) if isinstance(matches, list) else 'Nicht-Liste-Typ'}")
-            
-            # Stelle sicher, dass matches eine Liste ist
-            if isinstance(matches, list) and matches:
-                if isinstance(matches[0], tuple):  # Bei Gruppen in der Regex
-                    logger.debug("Matches sind Tupel, extrahiere vollständige Übereinstimmungen")
-                    # Extrahiere den vollständigen Text aus dem Text
-                    full_matches = []
-                    for match in matches:
-                        # Suche nach dem ersten Vorkommen des Schlüsselworts im Text
-                        keyword = match[0] if match else keywords[0]
-                        start_idx = text.lower().find(keyword.lower())
-                        if start_idx >= 0:
-                            # Finde den Satz, der dieses Schlüsselwort enthält
-                            sentence_start = text.rfind('.', 0, start_idx) + 1
-                            sentence_end = text.find('.', start_idx)
-                            if sentence_end == -1:
-                                sentence_end = len(text)
-                            full_matches.append(text[sentence_start:sentence_end].strip())
-                    matches = full_matches
-                
-                # Sortiere Übereinstimmungen nach Relevanz (Anzahl der enthaltenen Schlüsselwörter)
-                matches = sorted(matches, key=lambda x: sum(word.lower() in x.lower() for word in keywords), reverse=True)
-                
-                # Logge die ersten 3 Übereinstimmungen
-                for j, match in enumerate(matches[:3]):
-                    logger.debug(f"Match {j+1}: {match[:100]}...")
-                
-                return {
-                    "direct_answer": matches[0].strip(),
-                    "matches": [m.strip() for m in matches[:3]],
-                    "pattern_used": i+1
-                }
-        except Exception as e:
-            logger.error(f"Fehler bei Muster {i+1}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-    
-    # Fallback: Einfache Satzsuche mit Schlüsselwörtern
-    logger.debug("Keine Übereinstimmungen gefunden, versuche Fallback-Methode")
-    try:
-        # Teile den Text in Sätze auf
-        sentences = re.split(r'[.!?]', text)
-        relevant_sentences = []
-        
-        logger.debug(f"Anzahl der Sätze im Text: {len(sentences)}")
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-                
-            relevance_score = sum(keyword.lower() in sentence.lower() for keyword in keywords)
-            if relevance_score > 0:
-                relevant_sentences.append((sentence, relevance_score))
-        
-        logger.debug(f"Gefundene relevante Sätze: {len(relevant_sentences)}")
-        
-        if relevant_sentences:
-            # Sortiere nach Relevanz
-            relevant_sentences.sort(key=lambda x: x[1], reverse=True)
-            
-            # Logge die ersten 3 relevanten Sätze
-            for i, (sentence, score) in enumerate(relevant_sentences[:3]):
-                logger.debug(f"Relevanter Satz {i+1} (Score {score}): {sentence[:100]}...")
-            
-            return {
-                "direct_answer": relevant_sentences[0][0],
-                "matches": [s[0] for s in relevant_sentences[:3]],
-                "pattern_used": "fallback"
-            }
-    except Exception as e:
-        logger.error(f"Fehler bei Fallback-Methode: {str(e)}")
-        import traceback
-        traceback.print_exc()
-    
-    # Letzte Fallback-Methode: Einfache Wortsuche
-    logger.debug("Versuche letzte Fallback-Methode: Einfache Wortsuche")
     try:
-        # Finde Absätze, die Schlüsselwörter enthalten
-        paragraphs = text.split('\n')
-        relevant_paragraphs = []
-        
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if not paragraph:
-                continue
-                
-            relevance_score = sum(keyword.lower() in paragraph.lower() for keyword in keywords)
-            if relevance_score > 0:
-                relevant_paragraphs.append((paragraph, relevance_score))
-        
-        logger.debug(f"Gefundene relevante Absätze: {len(relevant_paragraphs)}")
-        
-        if relevant_paragraphs:
-            # Sortiere nach Relevanz
-            relevant_paragraphs.sort(key=lambda x: x[1], reverse=True)
-            
-            # Logge die ersten 3 relevanten Absätze
-            for i, (paragraph, score) in enumerate(relevant_paragraphs[:3]):
-                logger.debug(f"Relevanter Absatz {i+1} (Score {score}): {paragraph[:100]}...")
-            
-            return {
-                "direct_answer": relevant_paragraphs[0][0],
-                "matches": [p[0] for p in relevant_paragraphs[:3]],
-                "pattern_used": "word_search"
-            }
+        if index is None:
+            index = SentenceIndex(text)
+        result = index.find_answer(keywords)
+        if result:
+            logger.debug(f"Treffer mit Muster {result['pattern_used']}")
+            return result
     except Exception as e:
-        logger.error(f"Fehler bei letzter Fallback-Methode: {str(e)}")
+        logger.error(f"Fehler bei der Satzsuche: {str(e)}")
         import traceback
         traceback.print_exc()
     
@@ -221,12 +194,12 @@ def index():
         
         <div class="endpoint">
             <h3>PDF-Verarbeitung</h3>
-            <p>Endpunkt: <code>/process_pdf</code> (POST)</p>
+            <p>Endpunkt: <code>/process_pdf</code> (POST, <code>?stream=1</code> für seitenweises NDJSON, optional <code>&amp;gzip=1</code>)</p>
         </div>
         
         <div class="endpoint">
             <h3>Suche</h3>
-            <p>Endpunkt: <code>/search</code> (POST)</p>
+            <p>Endpunkt: <code>/search</code> (POST, JSON: <code>{"doc_id": ..., "query": ...}</code>)</p>
         </div>
         
         <div class="endpoint">
@@ -287,12 +260,32 @@ def process_pdf():
         logger.debug(f"Speichere Datei unter: {file_path}")
         file.save(file_path)
         
+        # Streaming-Modus: jede Seite als NDJSON-Zeile, sobald sie extrahiert ist
+        if request.args.get('stream', '0') != '0':
+            logger.debug("Streame Seiten als NDJSON...")
+            headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            body = stream_pdf_pages(file_path)
+            
+            use_gzip = request.args.get('gzip', '0') != '0' and 'gzip' in request.headers.get('Accept-Encoding', '')
+            if use_gzip:
+                headers['Content-Encoding'] = 'gzip'
+                headers['Vary'] = 'Accept-Encoding'
+                body = gzip_stream(body)
+            
+            return Response(stream_with_context(body), mimetype='application/x-ndjson', headers=headers)
+        
         # Text aus PDF extrahieren
         logger.debug("Extrahiere Text aus PDF...")
         text = extract_text_from_pdf(file_path)
         logger.debug(f"Extrahierter Text (erste 100 Zeichen): {text[:100]}...")
         
-        return jsonify({'text': text})
+        # Satzindex serverseitig ablegen, damit /search nur noch die doc_id benötigt
+        doc_id = cache_document(text)
+        
+        response = {'doc_id': doc_id}
+        if request.args.get('include_text', '1') != '0':
+            response['text'] = text
+        return jsonify(response)
     except Exception as e:
         logger.error(f"Fehler bei der Verarbeitung: {str(e)}")
         import traceback
@@ -302,18 +295,30 @@ def process_pdf():
 @app.route('/search', methods=['POST'])
 def search():
     """Sucht nach einer Antwort im extrahierten Text."""
-    data = request.json
-    logger.debug(f"Suchanfrage erhalten: {data}")
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        logger.warning("Ungültige Anfrage: kein JSON-Objekt")
+        return jsonify({'error': 'Ungültige Anfrage. Erwartet wird ein JSON-Objekt.'}), 400
+    logger.debug(f"Suchanfrage erhalten: query={data.get('query')}, doc_id={data.get('doc_id')}")
     
-    if not data or 'query' not in data or 'text' not in data:
-        logger.warning("Ungültige Anfrage: query oder text fehlt")
-        return jsonify({'error': 'Ungültige Anfrage. "query" und "text" sind erforderlich.'}), 400
+    if 'query' not in data or ('doc_id' not in data and 'text' not in data):
+        logger.warning("Ungültige Anfrage: query oder doc_id/text fehlt")
+        return jsonify({'error': 'Ungültige Anfrage. "query" und "doc_id" (oder "text") sind erforderlich.'}), 400
     
     query = data['query']
-    text = data['text']
+    
+    if 'doc_id' in data:
+        index = document_cache.get(data['doc_id'])
+        if index is None:
+            logger.warning(f"Unbekannte oder abgelaufene doc_id: {data['doc_id']}")
+            return jsonify({'error': 'Dokument nicht gefunden oder abgelaufen. Bitte die PDF erneut über /process_pdf verarbeiten.'}), 404
+        text = index.text
+    else:
+        text = data['text']
+        index = None
     
     # Direkte Antwort suchen
-    result = get_direct_answer(query, text)
+    result = get_direct_answer(query, text, index=index)
     logger.debug(f"Suchergebnis: {result}")
     
     return jsonify({
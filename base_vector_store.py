@@ -0,0 +1,578 @@
+from typing import Callable, List, Dict, Optional, Set, Tuple
+from abc import ABC, abstractmethod
+import numpy as np
+import logging
+from pathlib import Path
+from dataclasses import dataclass
+from datetime import datetime
+import hashlib
+import os
+
+from document_catalog import DocumentCatalog, DocumentInfo
+from embedding_backends import get_encoder
+from embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from micro_batcher import MicroBatcher
+
+VECTOR_STORE_BACKENDS = ("chroma", "numpy")
+
+@dataclass
+class ChunkMetadata:
+    """Metadaten für einen Text-Chunk"""
+    document_name: str
+    chunk_id: str
+    page_number: int
+    chunk_number: int
+    prev_chunk_id: str = ""  # Nachbar-IDs für den Kontext ("" = kein Nachbar)
+    next_chunk_id: str = ""
+    timestamp: str = None
+
+    def __post_init__(self):
+        if self.timestamp is None:
+            self.timestamp = datetime.now().isoformat()
+
+    def to_dict(self) -> Dict:
+        return {
+            "document_name": self.document_name,
+            "chunk_id": self.chunk_id,
+            "page_number": self.page_number,
+            "chunk_number": self.chunk_number,
+            "prev_chunk_id": self.prev_chunk_id,
+            "next_chunk_id": self.next_chunk_id,
+            "timestamp": self.timestamp
+        }
+
+@dataclass
+class DocumentChunks:
+    """Chunks eines Dokuments für das gemeinsame Hinzufügen mehrerer Dokumente"""
+    document_name: str
+    chunks: List[str]
+    embeddings: np.ndarray
+    page_numbers: List[int]
+    page_count: Optional[int] = None
+    content_hash: Optional[str] = None
+
+class VectorStoreException(Exception):
+    """Basisklasse für VectorStore-Ausnahmen"""
+    pass
+
+class BaseVectorStore(ABC):
+    def __init__(self,
+                 persist_directory: str = "chroma_db",
+                 collection_name: str = "pdf_chunks",
+                 embedding_function_name: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2",
+                 query_cache_size: int = 1024,
+                 query_cache_dir: Optional[str] = None,
+                 query_batch_size: int = 32,
+                 query_batch_wait_ms: float = 5.0,
+                 embedding_function: Optional[Callable[[List[str]], np.ndarray]] = None):
+        """
+        Gemeinsame Grundlage der Vektordatenbank-Backends
+
+        Enthält Query-Einbettung (Cache, Micro-Batching), Chunk-IDs und
+        Metadaten, Dokumentkatalog sowie den Delta-Abgleich beim erneuten
+        Import. Die Backends implementieren nur die Speicherzugriffe
+        (_open_storage, _add_records, _delete_ids, ... und search_many_by_vector).
+
+        Args:
+            persist_directory: Verzeichnis für persistente Speicherung
+            collection_name: Name der Collection
+            embedding_function_name: Name des Embedding-Modells
+            query_cache_size: Anzahl der Query-Embeddings im LRU-Cache
+            query_cache_dir: Optional - Verzeichnis für die gemeinsame Festplattenstufe
+            query_batch_size: Maximale Anzahl gleichzeitiger Queries pro Modelldurchlauf
+            query_batch_wait_ms: Wartezeit zum Sammeln von Queries (0 = kein Micro-Batching)
+            embedding_function: Optional - eigene Funktion Texte -> Embeddings für Queries
+                (Standard: geteiltes torch-Modell embedding_function_name; sonst dient der Name nur als Cache-Schlüssel)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.persist_directory = Path(persist_directory)
+        self.collection_name = collection_name
+
+        try:
+            # Verzeichnis erstellen
+            self.persist_directory.mkdir(parents=True, exist_ok=True)
+
+            # Modell über die prozessweite Registry teilen statt eine eigene Kopie zu laden
+            self.embedding_function = embedding_function or get_encoder(embedding_function_name).encode
+
+            # Query-Embeddings cachen, damit wiederholte Anfragen keinen Modelldurchlauf kosten
+            self.query_cache = QueryEmbeddingCache(
+                max_entries=query_cache_size,
+                disk_cache=EmbeddingCache(query_cache_dir, embedding_function_name, normalize=False)
+                if query_cache_dir else None
+            )
+
+            # Gleichzeitige Einzel-Queries gemeinsam einbetten
+            self.query_batcher = (
+                MicroBatcher(self.embedding_function, query_batch_size, query_batch_wait_ms)
+                if query_batch_wait_ms > 0 else None
+            )
+
+            created = self._open_storage()
+
+            # Dokumentkatalog neben den Daten (einmaliger Aufbau für bestehende Datenbanken;
+            # auch leer anlegen, damit Leser ohne Backend wie /documents ihn vorfinden)
+            self.catalog = DocumentCatalog(self.persist_directory / f"{collection_name}_catalog.json")
+            if created or not self.catalog.exists():
+                self._rebuild_catalog()
+
+        except Exception as e:
+            raise VectorStoreException(f"Fehler bei der Initialisierung: {str(e)}")
+
+    # Speicherzugriffe der Backends
+
+    @abstractmethod
+    def _open_storage(self) -> bool:
+        """Öffnet oder erstellt den Speicher; True, wenn er neu angelegt wurde"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _add_records(self,
+                     chunk_ids: List[str],
+                     embeddings: np.ndarray,
+                     texts: List[str],
+                     metadatas: List[Dict],
+                     added_ids: List[str]) -> None:
+        """Fügt Chunks hinzu und trägt erfolgreich geschriebene IDs in added_ids ein (für Rollbacks)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _update_metadatas(self, records: List[Tuple[str, Dict]]) -> None:
+        """Ersetzt die Metadaten bestehender Chunks"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _delete_ids(self, chunk_ids: List[str]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _document_metadatas(self, document_name: str) -> Dict[str, Dict]:
+        """Metadaten aller Chunks eines Dokuments (ID -> Metadaten)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def _all_metadatas(self) -> List[Dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _delete_document_records(self, document_name: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _clear_records(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def search_many_by_vector(self,
+                              query_embeddings: List[np.ndarray],
+                              n_results: int = 3,
+                              where: Optional[Dict] = None) -> List[List[Dict]]:
+        """
+        Ähnlichkeitssuche für mehrere Query-Embeddings in einer Datenbankabfrage
+
+        Args:
+            query_embeddings: Embeddings der Suchanfragen
+            n_results: Anzahl der gewünschten Ergebnisse je Anfrage
+            where: Optionaler Filter für Metadaten (gilt für alle Anfragen)
+
+        Returns:
+            Eine Ergebnisliste pro Query-Embedding (gleiche Reihenfolge) mit
+            id, text, metadata und distance (quadrierte L2-Distanz)
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_chunk_texts(self, chunk_ids: List[str]) -> Dict[str, str]:
+        """Holt die Texte mehrerer Chunks in einem Aufruf (ID -> Text)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_document_chunks(self, document_name: str) -> List[Dict]:
+        """Holt alle Chunks eines bestimmten Dokuments (nach Chunk-Nummer sortiert)"""
+        raise NotImplementedError
+
+    # Gemeinsame Logik
+
+    @property
+    def version(self) -> int:
+        """Wird bei jeder Änderung des Index erhöht (Invalidierung von Ergebnis-Caches)"""
+        self.catalog.reload_if_changed()
+        return self.catalog.version
+
+    def _rebuild_catalog(self) -> None:
+        """Baut den Dokumentkatalog einmalig aus allen Chunk-Metadaten auf"""
+        metadatas = self._all_metadatas()
+        if metadatas:
+            self.logger.info("Baue Dokumentkatalog aus der bestehenden Collection auf...")
+
+        documents: Dict[str, DocumentInfo] = {}
+        for meta in metadatas:
+            name = meta['document_name']
+            info = documents.get(name)
+            if info is None:
+                info = documents[name] = DocumentInfo(
+                    name=name,
+                    chunk_count=0,
+                    page_count=0,
+                    ingested_at=meta.get('timestamp')
+                )
+            info.chunk_count += 1
+            info.page_count = max(info.page_count, meta.get('page_number') or 0)
+
+        self.catalog.replace_all(list(documents.values()))
+
+    def add_chunks(self,
+                  chunks: List[str],
+                  embeddings: np.ndarray,
+                  document_name: str,
+                  page_numbers: List[int],
+                  page_count: Optional[int] = None,
+                  content_hash: Optional[str] = None) -> bool:
+        """
+        Fügt Chunks und ihre Embeddings zur Datenbank hinzu
+
+        Args:
+            chunks: Liste von Textabschnitten
+            embeddings: NumPy-Array mit Embeddings
+            document_name: Name des Quelldokuments
+            page_numbers: Liste der Seitenzahlen für jeden Chunk
+            page_count: Optional - Seitenanzahl des Dokuments (für den Katalog)
+            content_hash: Optional - SHA-256 der PDF (für den Katalog)
+        """
+        return self.add_documents([DocumentChunks(
+            document_name=document_name,
+            chunks=chunks,
+            embeddings=embeddings,
+            page_numbers=page_numbers,
+            page_count=page_count,
+            content_hash=content_hash
+        )])
+
+    def add_documents(self, documents: List[DocumentChunks]) -> bool:
+        """
+        Fügt die Chunks mehrerer Dokumente gemeinsam hinzu
+
+        Die Chunks werden in möglichst großen Blöcken geschrieben und der
+        Katalog einmal für alle Dokumente aktualisiert.
+        """
+        try:
+            chunk_ids = []
+            metadatas = []
+            texts = []
+            embeddings = []
+
+            for document in documents:
+                # Eingabevalidierung
+                if len(document.chunks) != len(document.embeddings):
+                    raise ValueError(f"Anzahl der Chunks und Embeddings stimmt nicht überein ({document.document_name})")
+
+                if len(document.chunks) != len(document.page_numbers):
+                    raise ValueError(f"Anzahl der Chunks und Seitenzahlen stimmt nicht überein ({document.document_name})")
+
+                # IDs und Metadaten vorbereiten
+                ids, document_metadatas = self._build_chunk_records(
+                    document.document_name, document.chunks, document.page_numbers
+                )
+                chunk_ids.extend(ids)
+                metadatas.extend(document_metadatas)
+                texts.extend(document.chunks)
+                embeddings.append(np.asarray(document.embeddings, dtype=np.float32))
+
+            if not chunk_ids:
+                return True
+
+            # Chunks blockweise hinzufügen
+            added_ids = []
+            try:
+                self._add_records(chunk_ids, np.concatenate(embeddings), texts, metadatas, added_ids)
+
+                # Katalog aktualisieren; schlägt das fehl, werden die Chunks wieder entfernt
+                self.catalog.upsert_many([
+                    DocumentInfo(
+                        name=document.document_name,
+                        chunk_count=len(document.chunks),
+                        page_count=(
+                            document.page_count if document.page_count is not None
+                            else max(document.page_numbers, default=0)
+                        ),
+                        content_hash=document.content_hash
+                    )
+                    for document in documents
+                ])
+            except Exception:
+                if added_ids:
+                    self._delete_ids(added_ids)
+                raise
+
+            for document in documents:
+                self.logger.info(
+                    f"{len(document.chunks)} Chunks aus {document.document_name} zur Vektordatenbank hinzugefügt"
+                )
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Fehler beim Hinzufügen der Chunks: {str(e)}")
+            return False
+
+    def update_document(self,
+                        document_name: str,
+                        chunks: List[str],
+                        page_numbers: List[int],
+                        embed: Callable[[List[int]], np.ndarray],
+                        page_count: Optional[int] = None,
+                        content_hash: Optional[str] = None) -> Dict[str, int]:
+        """
+        Gleicht die gespeicherten Chunks eines Dokuments mit einer neuen Fassung ab
+
+        Die Chunk-IDs werden aus dem Inhalt abgeleitet: unveränderte Chunks
+        behalten ihre ID und ihr Embedding (nur Position und Nachbarn werden
+        bei Bedarf in den Metadaten angepasst), neue Chunks werden eingebettet
+        und eingefügt, verschwundene gelöscht. Für ein neues Dokument werden
+        einfach alle Chunks eingefügt.
+
+        Args:
+            document_name: Name des Dokuments
+            chunks: Texte der neuen Fassung in Dokumentreihenfolge
+            page_numbers: Seitenzahl je Chunk
+            embed: Funktion, die für eine Liste von Chunk-Indizes die Embeddings liefert
+            page_count: Optional - Seitenanzahl des Dokuments (für den Katalog)
+            content_hash: Optional - SHA-256 der PDF (für den Katalog)
+
+        Returns:
+            Anzahl hinzugefügter, entfernter, unveränderter und umnummerierter Chunks
+        """
+        if len(chunks) != len(page_numbers):
+            raise ValueError("Anzahl der Chunks und Seitenzahlen stimmt nicht überein")
+
+        chunk_ids, metadatas = self._build_chunk_records(document_name, chunks, page_numbers)
+
+        try:
+            stored = self._document_metadatas(document_name)
+        except Exception as e:
+            raise VectorStoreException(f"Fehler beim Abrufen der Chunks: {str(e)}")
+
+        new_indices = [i for i, chunk_id in enumerate(chunk_ids) if chunk_id not in stored]
+        kept_ids = set(chunk_ids) & stored.keys()
+        removed_ids = [chunk_id for chunk_id in stored if chunk_id not in kept_ids]
+
+        # Unveränderte Chunks: Metadaten nur anpassen, wenn sich Position oder Nachbarn geändert haben
+        compared = ("page_number", "chunk_number", "prev_chunk_id", "next_chunk_id")
+        moved = [
+            (chunk_id, metadata)
+            for chunk_id, metadata in zip(chunk_ids, metadatas)
+            if chunk_id in kept_ids
+            and any(stored[chunk_id].get(key) != metadata[key] for key in compared)
+        ]
+
+        embeddings = np.asarray(embed(new_indices), dtype=np.float32) if new_indices else None
+
+        added_ids = []
+        deleting = False
+        try:
+            if new_indices:
+                self._add_records(
+                    [chunk_ids[i] for i in new_indices],
+                    embeddings,
+                    [chunks[i] for i in new_indices],
+                    [metadatas[i] for i in new_indices],
+                    added_ids
+                )
+
+            if moved:
+                self._update_metadatas(moved)
+
+            deleting = True
+            if removed_ids:
+                self._delete_ids(removed_ids)
+
+            self.catalog.upsert(DocumentInfo(
+                name=document_name,
+                chunk_count=len(chunks),
+                page_count=page_count if page_count is not None else max(page_numbers, default=0),
+                content_hash=content_hash
+            ))
+        except Exception as e:
+            # Vor dem Löschen alter Chunks lässt sich die alte Fassung wiederherstellen
+            if added_ids and not deleting:
+                self._delete_ids(added_ids)
+            raise VectorStoreException(f"Fehler beim Aktualisieren von {document_name}: {str(e)}")
+
+        result = {
+            "added": len(new_indices),
+            "removed": len(removed_ids),
+            "unchanged": len(kept_ids),
+            "moved": len(moved)
+        }
+        self.logger.info(
+            f"{document_name} aktualisiert: {result['added']} neue, {result['removed']} entfernte, "
+            f"{result['unchanged']} unveränderte Chunks"
+        )
+        return result
+
+    @staticmethod
+    def chunk_ids_for(document_name: str, chunks: List[str]) -> List[str]:
+        """
+        Inhaltsabgeleitete Chunk-IDs: Dokumentname plus gekürzter SHA-256 des Textes
+
+        Wiederholt sich ein Text im Dokument, erhält jedes weitere Vorkommen
+        eine laufende Nummer, damit die IDs eindeutig bleiben.
+        """
+        occurrences: Dict[str, int] = {}
+        chunk_ids = []
+        for text in chunks:
+            digest = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+            count = occurrences.get(digest, 0)
+            occurrences[digest] = count + 1
+            chunk_ids.append(f"{document_name}_{digest}" if count == 0 else f"{document_name}_{digest}_{count}")
+        return chunk_ids
+
+    def get_document_chunk_ids(self, document_name: str) -> Set[str]:
+        """IDs aller gespeicherten Chunks eines Dokuments (ohne Texte und Embeddings)"""
+        try:
+            return set(self._document_metadatas(document_name))
+        except Exception as e:
+            raise VectorStoreException(f"Fehler beim Abrufen der Chunks: {str(e)}")
+
+    def _build_chunk_records(self,
+                             document_name: str,
+                             chunks: List[str],
+                             page_numbers: List[int]) -> Tuple[List[str], List[Dict]]:
+        """IDs und Metadaten (inkl. Nachbar-IDs) aller Chunks eines Dokuments"""
+        chunk_ids = self.chunk_ids_for(document_name, chunks)
+        metadatas = []
+        for i, (chunk_id, page_num) in enumerate(zip(chunk_ids, page_numbers)):
+            metadatas.append(ChunkMetadata(
+                document_name=document_name,
+                chunk_id=chunk_id,
+                page_number=page_num,
+                chunk_number=i,
+                prev_chunk_id=chunk_ids[i - 1] if i > 0 else "",
+                next_chunk_id=chunk_ids[i + 1] if i < len(chunk_ids) - 1 else ""
+            ).to_dict())
+        return chunk_ids, metadatas
+
+    def search(self,
+              query: str,
+              n_results: int = 3,
+              where: Optional[Dict] = None) -> List[Dict]:
+        """
+        Führt eine Ähnlichkeitssuche durch
+
+        Args:
+            query: Suchanfrage
+            n_results: Anzahl der gewünschten Ergebnisse
+            where: Optionaler Filter für Metadaten
+        """
+        try:
+            query_embedding = self.embed_query(query)
+        except Exception as e:
+            self.logger.error(f"Fehler beim Einbetten der Suchanfrage: {str(e)}")
+            raise VectorStoreException(f"Suchfehler: {str(e)}")
+
+        return self.search_by_vector(query_embedding, n_results=n_results, where=where)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Berechnet das Embedding einer Suchanfrage (mit LRU-Cache)"""
+        if self.query_batcher is not None:
+            return self.query_cache.get_or_compute(query, self.query_batcher.encode)
+        return self.query_cache.get_or_compute(
+            query,
+            lambda text: self.embedding_function([text])[0]
+        )
+
+    def embed_queries(self, queries: List[str]) -> List[np.ndarray]:
+        """Berechnet die Embeddings mehrerer Suchanfragen in einem Modelldurchlauf (mit LRU-Cache)"""
+        return self.query_cache.get_or_compute_many(queries, self.embedding_function)
+
+    def search_by_vector(self,
+                         query_embedding: np.ndarray,
+                         n_results: int = 3,
+                         where: Optional[Dict] = None) -> List[Dict]:
+        """
+        Führt eine Ähnlichkeitssuche mit einem bereits berechneten Query-Embedding durch
+
+        Args:
+            query_embedding: Embedding der Suchanfrage
+            n_results: Anzahl der gewünschten Ergebnisse
+            where: Optionaler Filter für Metadaten
+        """
+        return self.search_many_by_vector([query_embedding], n_results=n_results, where=where)[0]
+
+    @staticmethod
+    def neighbor_ids(metadata: Dict) -> Tuple[Optional[str], Optional[str]]:
+        """
+        IDs des vorherigen und nächsten Chunks laut Metadaten
+
+        Ältere Einträge ohne Nachbar-IDs fallen auf das Schema
+        {document_name}_chunk_{n} zurück; nicht existierende IDs liefert
+        get_chunk_texts einfach nicht zurück.
+        """
+        if 'prev_chunk_id' in metadata:
+            return metadata['prev_chunk_id'] or None, metadata['next_chunk_id'] or None
+
+        document_name = metadata['document_name']
+        chunk_number = metadata['chunk_number']
+        prev_id = f"{document_name}_chunk_{chunk_number - 1}" if chunk_number > 0 else None
+        return prev_id, f"{document_name}_chunk_{chunk_number + 1}"
+
+    def list_documents(self) -> List[str]:
+        """Listet alle verfügbaren Dokumente auf (aus dem Dokumentkatalog)"""
+        try:
+            return self.catalog.names()
+
+        except Exception as e:
+            self.logger.error(f"Fehler beim Auflisten der Dokumente: {str(e)}")
+            raise VectorStoreException(f"Fehler beim Auflisten: {str(e)}")
+
+    def has_documents(self) -> bool:
+        """Prüft, ob Dokumente in der Collection vorhanden sind"""
+        try:
+            return len(self.catalog) > 0
+        except:
+            return False
+
+    def get_document_info(self, document_name: str) -> Optional[DocumentInfo]:
+        """Liefert den Katalogeintrag eines Dokuments"""
+        return self.catalog.get(document_name)
+
+    def delete_document(self, document_name: str) -> bool:
+        """Löscht alle Chunks eines Dokuments"""
+        try:
+            self._delete_document_records(document_name)
+            self.catalog.remove(document_name)
+            self.logger.info(f"Dokument '{document_name}' gelöscht")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Fehler beim Löschen von {document_name}: {str(e)}")
+            return False
+
+    def clear(self) -> bool:
+        """Löscht alle Daten aus der Collection"""
+        try:
+            self._clear_records()
+            self.catalog.replace_all([])
+            self.logger.info("Collection geleert")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Fehler beim Leeren der Collection: {str(e)}")
+            return False
+
+def create_vector_store(backend: Optional[str] = None, **kwargs) -> BaseVectorStore:
+    """
+    Erzeugt die Vektordatenbank für das gewählte Backend
+
+    Args:
+        backend: 'chroma' (Standard) oder 'numpy' (In-Process-Index mit Memory-Mapping);
+            Standard aus VECTOR_STORE_BACKEND. Ein persist_directory gehört zu genau einem Backend.
+        **kwargs: Parameter des Backends (siehe BaseVectorStore)
+    """
+    backend = backend or os.environ.get("VECTOR_STORE_BACKEND", "chroma")
+    if backend == "chroma":
+        from vector_store import VectorStore
+        return VectorStore(**kwargs)
+    if backend == "numpy":
+        from numpy_store import NumpyVectorStore
+        return NumpyVectorStore(**kwargs)
+    raise ValueError(f"Unbekanntes VectorStore-Backend '{backend}' (erlaubt: {', '.join(VECTOR_STORE_BACKENDS)})")
@@ -0,0 +1,93 @@
+"""
+Benchmark: IVF-Index des NumPy-Backends gegen exakte Suche
+
+Erzeugt für mehrere Korpusgrößen synthetische, geclusterte Embeddings
+(ähnlich echten Satz-Embeddings, die nicht gleichverteilt sind), legt sie
+exakt im NumPy-Backend ab und öffnet den Index anschließend mit
+ann_index='ivf' (Training beim Öffnen). Gemessen werden Trainingszeit,
+Latenz pro Anfrage und recall@k gegenüber der exakten Suche für mehrere
+nprobe-Werte.
+
+Aufruf: python benchmark_ann_index.py [--sizes 100000 400000 1600000]
+        [--dim 384] [--queries 200] [--k 10] [--nprobe 4 16 64]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from numpy_store import NumpyVectorStore
+
+def clustered_embeddings(rng: np.random.Generator, centers: np.ndarray, count: int, noise: float) -> np.ndarray:
+    """Punkte um zufällige Zentren, L2-normalisiert"""
+    labels = rng.integers(0, len(centers), count)
+    embeddings = centers[labels] + noise * rng.standard_normal((count, centers.shape[1])).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+def run_queries(store: NumpyVectorStore, queries: np.ndarray, k: int):
+    """Liefert die Treffer-IDs je Anfrage und die Latenzen in Millisekunden"""
+    store.search_by_vector(queries[0], n_results=k)  # Aufwärmen
+    ids = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        results = store.search_by_vector(query, n_results=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append({result['id'] for result in results})
+    latencies.sort()
+    return ids, {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 400000, 1600000], help="Korpusgrößen (Chunks)")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding-Dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Anzahl der Suchanfragen")
+    parser.add_argument("--k", type=int, default=10, help="Ergebnisse pro Anfrage (recall@k)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64], help="Durchsuchte IVF-Listen")
+    parser.add_argument("--lists", type=int, default=None, help="Anzahl der IVF-Listen (Standard: etwa √N)")
+    parser.add_argument("--noise", type=float, default=0.08, help="Streuung um die Clusterzentren")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    dummy_encoder = lambda texts: np.zeros((len(texts), args.dim), dtype=np.float32)
+
+    print(f"{'Chunks':>9} {'Variante':<14} {'p50 ms':>9} {'p95 ms':>9} {'recall@' + str(args.k):>10}")
+    for size in args.sizes:
+        centers = rng.standard_normal((max(size // 200, 16), args.dim)).astype(np.float32) / np.sqrt(args.dim)
+        queries = clustered_embeddings(rng, centers, args.queries, args.noise)
+
+        with tempfile.TemporaryDirectory() as directory:
+            options = dict(persist_directory=directory, embedding_function=dummy_encoder, query_batch_wait_ms=0)
+            exact = NumpyVectorStore(ann_index="none", **options)
+            for start in range(0, size, 50000):
+                count = min(50000, size - start)
+                exact.add_chunks(
+                    chunks=[f"Chunk {start + i}" for i in range(count)],
+                    embeddings=clustered_embeddings(rng, centers, count, args.noise),
+                    document_name=f"doc_{start // 50000:04d}.pdf",
+                    page_numbers=[1] * count
+                )
+
+            truth, latency = run_queries(exact, queries, args.k)
+            print(f"{size:>9} {'exakt':<14} {latency['p50']:>9.2f} {latency['p95']:>9.2f} {1.0:>10.3f}")
+
+            start = time.perf_counter()
+            ivf = NumpyVectorStore(ann_index="ivf", ann_lists=args.lists, ann_min_rows=0, **options)
+            lists = ivf.stats()["ann"]["lists"]
+            print(f"{size:>9} IVF mit {lists} Listen trainiert in {time.perf_counter() - start:.1f} s")
+
+            for nprobe in args.nprobe:
+                ivf.nprobe = nprobe
+                found, latency = run_queries(ivf, queries, args.k)
+                recall = np.mean([len(a & b) / args.k for a, b in zip(found, truth)])
+                print(f"{size:>9} {'nprobe=' + str(nprobe):<14} {latency['p50']:>9.2f} {latency['p95']:>9.2f} {recall:>10.3f}")
+
+if __name__ == "__main__":
+    main()
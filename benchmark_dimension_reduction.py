@@ -0,0 +1,123 @@
+"""
+Benchmark: Übereinstimmung der Suche nach PCA-Dimensionsreduktion
+
+Passt für mehrere Zieldimensionen eine PCA-Projektion (wie NumpyVectorStore
+mit pca_dim) auf einer Stichprobe der Embeddings an und vergleicht die
+exakte Top-k-Suche im reduzierten Raum mit der Suche auf den vollen
+Embeddings: Anteil gemeinsamer Treffer (recall@k), gleicher bester Treffer,
+erklärte Varianz, Bytes pro Chunk und Latenz pro Anfrage. Damit lässt sich
+die Zieldimension für EMBEDDING_PCA_DIM wählen.
+
+Datenquelle (in dieser Reihenfolge):
+  --store DIR          Embeddings eines bestehenden NumPy-Index (nicht projiziert)
+  --embeddings X.npy   Embeddings aus einer NumPy-Datei
+  sonst                synthetische Embeddings mit niedrigdimensionaler Struktur
+
+Anfragen sind zurückgehaltene Embeddings des Korpus oder, mit --queries-file,
+Suchtexte (eine pro Zeile), die mit --model eingebettet werden.
+
+Aufruf: python benchmark_dimension_reduction.py [--store ./chroma_db]
+        [--dims 64 128 256 384] [--max-chunks 200000] [--queries 200] [--k 10]
+        [--queries-file anfragen.txt --model NAME --embedding-backend torch]
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from numpy_store import PCA_SAMPLE_ROWS
+from projection import PCAProjection
+
+def synthetic_embeddings(rng: np.random.Generator, count: int, dim: int, rank: int = 64) -> np.ndarray:
+    """Embeddings mit abfallendem Spektrum (wenige dominante Richtungen plus Rauschen)"""
+    scales = 1.0 / np.sqrt(np.arange(1, rank + 1))
+    basis = rng.standard_normal((rank, dim)).astype(np.float32)
+    embeddings = (rng.standard_normal((count, rank)).astype(np.float32) * scales) @ basis
+    embeddings += 0.15 * rng.standard_normal((count, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+def top_k(corpus: np.ndarray, corpus_norms: np.ndarray, queries: np.ndarray, k: int):
+    """Exakte Top-k (quadrierte L2-Distanz) je Anfrage und Latenz pro Anfrage in ms"""
+    results = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        distances = corpus_norms - 2.0 * (corpus @ query)
+        top = np.argpartition(distances, k - 1)[:k]
+        results.append(top[np.argsort(distances[top])])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, statistics.median(latencies)
+
+def load_corpus(args, rng: np.random.Generator) -> np.ndarray:
+    if args.store:
+        from numpy_store import NumpyVectorStore
+
+        store = NumpyVectorStore(
+            persist_directory=args.store,
+            collection_name=args.collection,
+            embedding_function=lambda texts: None,
+            ann_index="none"
+        )
+        if store.stats()["projection"] is not None:
+            raise SystemExit("Der Index ist bereits projiziert - die vollen Embeddings liegen nicht mehr vor")
+        return store.sample_embeddings(args.max_chunks + args.queries, seed=42)
+    if args.embeddings:
+        corpus = np.load(args.embeddings).astype(np.float32)
+        if len(corpus) > args.max_chunks + args.queries:
+            corpus = corpus[rng.choice(len(corpus), args.max_chunks + args.queries, replace=False)]
+        return corpus
+    return synthetic_embeddings(rng, args.max_chunks + args.queries, args.dim)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", help="Verzeichnis eines NumPy-Index (VECTOR_STORE_BACKEND=numpy)")
+    parser.add_argument("--collection", default="pdf_chunks", help="Collection im NumPy-Index")
+    parser.add_argument("--embeddings", help="NumPy-Datei (.npy) mit Embeddings")
+    parser.add_argument("--dim", type=int, default=768, help="Dimension der synthetischen Embeddings")
+    parser.add_argument("--max-chunks", type=int, default=200000, help="Maximale Korpusgröße")
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 128, 256, 384], help="Zieldimensionen")
+    parser.add_argument("--queries", type=int, default=200, help="Zurückgehaltene Embeddings als Anfragen")
+    parser.add_argument("--queries-file", help="Textdatei mit einer Suchanfrage pro Zeile")
+    parser.add_argument("--model", default="sentence-transformers/paraphrase-multilingual-mpnet-base-v2", help="Modell für --queries-file")
+    parser.add_argument("--embedding-backend", default="torch", help="Backend für --queries-file (torch, onnx, onnx-int8)")
+    parser.add_argument("--k", type=int, default=10, help="Ergebnisse pro Anfrage (recall@k)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    data = load_corpus(args, rng)
+    rng.shuffle(data)
+
+    if args.queries_file:
+        from embedding_backends import get_encoder
+
+        with open(args.queries_file, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+        queries = np.asarray(get_encoder(args.model, args.embedding_backend).encode(texts), dtype=np.float32)
+        corpus = data
+    else:
+        queries, corpus = data[:args.queries], data[args.queries:]
+
+    print(f"Korpus: {len(corpus)} Chunks x {corpus.shape[1]} Dimensionen, {len(queries)} Anfragen, k={args.k}")
+    truth, full_latency = top_k(corpus, np.einsum("ij,ij->i", corpus, corpus), queries, args.k)
+    print(f"{'Dimension':>9} {'Varianz':>8} {'recall@' + str(args.k):>10} {'Top-1 gleich':>13} "
+          f"{'Bytes/Chunk':>12} {'p50 ms':>8}")
+    print(f"{corpus.shape[1]:>9} {1.0:>8.1%} {1.0:>10.3f} {1.0:>13.1%} {corpus.shape[1] * 4:>12} {full_latency:>8.2f}")
+
+    sample = corpus[:PCA_SAMPLE_ROWS]
+    for dim in sorted(args.dims, reverse=True):
+        if dim >= corpus.shape[1]:
+            continue
+        projection = PCAProjection.fit(sample, dim)
+        reduced = projection.apply(corpus)
+        found, latency = top_k(reduced, np.einsum("ij,ij->i", reduced, reduced), projection.apply(queries), args.k)
+
+        recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(found, truth)])
+        same_first = np.mean([a[0] == b[0] for a, b in zip(found, truth)])
+        print(f"{dim:>9} {projection.explained_variance_ratio:>8.1%} {recall:>10.3f} {same_first:>13.1%} "
+              f"{dim * 4:>12} {latency:>8.2f}")
+
+if __name__ == "__main__":
+    main()
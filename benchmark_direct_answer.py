@@ -0,0 +1,147 @@
+"""
+Benchmark: Direktantwort-Suche mit Satzindex vs. bisheriger Regex-Kaskade
+
+Erzeugt einen synthetischen Text (Standard: 5 MB) und misst die Latenz der
+alten Implementierung (Regex-Muster über den gesamten Text) und des
+vorberechneten SentenceIndex (Aufbau einmalig, danach pro Anfrage).
+
+Aufruf: python benchmark_direct_answer.py [--size-mb 5] [--timeout 120]
+"""
+
+import argparse
+import multiprocessing
+import random
+import re
+import time
+
+from sentence_index import SentenceIndex, extract_keywords
+
+WORDS = [
+    "Maschine", "Spannung", "Temperatur", "Gehäuse", "Anschluss", "Leistung",
+    "Gewicht", "Abmessung", "Betrieb", "Sensor", "Motor", "Steuerung", "Ventil",
+    "Druck", "Material", "Oberfläche", "Schutzart", "Frequenz", "Strom", "Kabel",
+    "die", "der", "das", "und", "mit", "für", "bei", "ist", "wird", "von", "nach",
+]
+
+QUERIES = [
+    "Wie hoch ist die Betriebsspannung der Maschine?",
+    "Umgebungstemperatur Maschine",
+    "Welche Schutzart hat das Gehäuse?",
+    "Gibt es einen Hinweis zur Quantenverschränkung?",
+]
+
+def generate_text(size_bytes: int, line_length: int, seed: int = 42) -> str:
+    """Erzeugt datenblattähnlichen Text mit Zeilenumbrüchen wie aus PyPDF2"""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    line = 0
+    while size < size_bytes:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20)))
+        if rng.random() < 0.01:
+            sentence += " Betriebsspannung 230 V"
+        sentence = sentence[0].upper() + sentence[1:] + rng.choice([". ", ". ", "! ", "? "])
+        parts.append(sentence)
+        size += len(sentence)
+        line += len(sentence)
+        if line >= line_length:
+            parts.append("\n")
+            line = 0
+    return "".join(parts)
+
+def legacy_get_direct_answer(query: str, text: str) -> dict:
+    """Bisherige Implementierung aus app.get_direct_answer (ohne Logging)"""
+    keywords = extract_keywords(query)
+    patterns = [
+        r"(?i)[^.!?]*" + " ".join(r".*\b" + re.escape(w) + r"\b" for w in keywords) + r".*?[.!?]",
+        r"(?i)[^.!?]*(" + "|".join(r"\b" + re.escape(w) + r"\b" for w in keywords) + r").*?[.!?]",
+    ]
+    for i, pattern in enumerate(patterns):
+        matches = re.findall(pattern, text)
+        if matches:
+            if isinstance(matches[0], tuple):
+                full_matches = []
+                for match in matches:
+                    keyword = match[0] if match else keywords[0]
+                    start_idx = text.lower().find(keyword.lower())
+                    if start_idx >= 0:
+                        sentence_start = text.rfind('.', 0, start_idx) + 1
+                        sentence_end = text.find('.', start_idx)
+                        if sentence_end == -1:
+                            sentence_end = len(text)
+                        full_matches.append(text[sentence_start:sentence_end].strip())
+                matches = full_matches
+            matches = sorted(matches, key=lambda x: sum(w.lower() in x.lower() for w in keywords), reverse=True)
+            return {"direct_answer": matches[0].strip(), "pattern_used": i + 1}
+
+    relevant = []
+    for sentence in re.split(r'[.!?]', text):
+        sentence = sentence.strip()
+        if sentence:
+            score = sum(k.lower() in sentence.lower() for k in keywords)
+            if score > 0:
+                relevant.append((sentence, score))
+    if relevant:
+        relevant.sort(key=lambda x: x[1], reverse=True)
+        return {"direct_answer": relevant[0][0], "pattern_used": "fallback"}
+    return {"direct_answer": None}
+
+def _run_legacy(text: str, queries: list, result_queue) -> None:
+    for query in queries:
+        start = time.perf_counter()
+        legacy_get_direct_answer(query, text)
+        result_queue.put((query, time.perf_counter() - start))
+
+def benchmark_legacy(text: str, timeout: float) -> dict:
+    """Führt die alte Implementierung in einem eigenen Prozess mit Zeitlimit aus"""
+    result_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_legacy, args=(text, QUERIES, result_queue))
+    process.start()
+
+    timings = {}
+    deadline = time.monotonic() + timeout
+    while len(timings) < len(QUERIES):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            query, elapsed = result_queue.get(timeout=remaining)
+            timings[query] = elapsed
+        except Exception:
+            break
+
+    if process.is_alive():
+        process.terminate()
+    process.join()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=5.0, help="Textgröße in MB")
+    parser.add_argument("--line-length", type=int, default=2000, help="Zeichen pro Zeile im Text")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Zeitlimit für die alte Implementierung (s)")
+    args = parser.parse_args()
+
+    text = generate_text(int(args.size_mb * 1024 * 1024), args.line_length)
+    print(f"Textgröße: {len(text) / 1024 / 1024:.1f} MB, Zeilenlänge ~{args.line_length} Zeichen")
+
+    start = time.perf_counter()
+    index = SentenceIndex(text)
+    build_time = time.perf_counter() - start
+    print(f"SentenceIndex-Aufbau: {build_time * 1000:.0f} ms ({len(index.sentences)} Sätze, "
+          f"~{index.estimated_size() / 1024 / 1024:.0f} MB)")
+
+    legacy = benchmark_legacy(text, args.timeout)
+
+    print(f"\n{'Query':<50} {'alt (ms)':>12} {'neu (ms)':>10} {'Muster':>10}")
+    print("-" * 86)
+    for query in QUERIES:
+        start = time.perf_counter()
+        result = index.find_answer(extract_keywords(query))
+        elapsed = time.perf_counter() - start
+        pattern = result["pattern_used"] if result else "-"
+        old = f"{legacy[query] * 1000:.0f}" if query in legacy else f">{args.timeout:.0f}s"
+        print(f"{query[:50]:<50} {old:>12} {elapsed * 1000:>10.1f} {str(pattern):>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: Embedding-Backends torch, onnx und onnx-int8 im Vergleich
+
+Bettet einen synthetischen Korpus aus Chunk-Texten mit jedem Backend ein und
+misst den Durchsatz (Chunks pro Sekunde, wie beim Import). Für die
+Retrieval-Übereinstimmung wird mit jedem Backend eine exakte Top-k-Suche
+(Kosinus) über den eigenen Korpus ausgeführt und der Anteil der Treffer
+gemeldet, der mit dem torch-Pfad übereinstimmt (Top-k-Overlap), dazu die
+mittlere Kosinus-Ähnlichkeit der Chunk-Vektoren zum torch-Ergebnis.
+
+Aufruf: python benchmark_embedding_backends.py [--model NAME] [--chunks 2000]
+        [--queries 200] [--top-k 10] [--batch-size 32] [--backends torch onnx onnx-int8]
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from embedding_backends import BACKENDS, create_backend
+
+SUBJECTS = [
+    "Die Pumpe", "Der Antrieb", "Das Steuergerät", "Die Hydraulikeinheit", "Der Sensor",
+    "Das Netzteil", "Die Kupplung", "Der Kompressor", "Das Ventil", "Die Förderanlage",
+]
+
+FACTS = [
+    "arbeitet mit einer Betriebsspannung von {} Volt",
+    "erreicht ein Drehmoment von {} Nm bei Nenndrehzahl",
+    "muss alle {} Betriebsstunden gewartet werden",
+    "ist für Umgebungstemperaturen bis {} Grad Celsius ausgelegt",
+    "hat eine Leistungsaufnahme von {} Watt im Dauerbetrieb",
+    "wiegt ohne Zubehör etwa {} Kilogramm",
+    "erzeugt einen Schalldruckpegel von {} dB(A)",
+    "benötigt einen Kabelquerschnitt von mindestens {} mm²",
+]
+
+QUESTIONS = [
+    "Welche Betriebsspannung hat {}?",
+    "Wie oft muss {} gewartet werden?",
+    "Wie schwer ist {}?",
+    "Wie laut ist {} im Betrieb?",
+    "Welche Temperatur hält {} aus?",
+]
+
+def generate_chunks(count: int, seed: int = 42) -> list:
+    """Erzeugt Chunk-Texte aus mehreren Sätzen (ähnliche Länge wie echte Chunks)"""
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(count):
+        sentences = [
+            f"{rng.choice(SUBJECTS)} {rng.choice(FACTS).format(rng.randint(2, 900))}."
+            for _ in range(rng.randint(3, 8))
+        ]
+        chunks.append(" ".join(sentences))
+    return chunks
+
+def generate_queries(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [rng.choice(QUESTIONS).format(rng.choice(SUBJECTS).lower()) + f" ({i})" for i in range(count)]
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Exakte Top-k-Suche über normalisierte Vektoren"""
+    scores = queries @ corpus.T
+    indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return indices
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="paraphrase-multilingual-mpnet-base-v2", help="SentenceTransformer-Modell")
+    parser.add_argument("--chunks", type=int, default=2000, help="Anzahl der Korpus-Chunks")
+    parser.add_argument("--queries", type=int, default=200, help="Anzahl der Queries für den Top-k-Vergleich")
+    parser.add_argument("--top-k", type=int, default=10, help="k für den Top-k-Overlap")
+    parser.add_argument("--batch-size", type=int, default=32, help="Batchgröße beim Einbetten")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS), help="Zu vergleichende Backends")
+    args = parser.parse_args()
+
+    chunks = generate_chunks(args.chunks)
+    queries = generate_queries(args.queries)
+    backends = ["torch"] + [name for name in args.backends if name != "torch"]
+
+    results = {}
+    for name in backends:
+        print(f"Lade Backend {name} ...")
+        load_start = time.perf_counter()
+        # Gleiche Konfiguration wie PDFSearchEngine; torch bewusst auf der CPU für den Vergleich
+        encoder = create_backend(args.model, name, device="cpu", max_seq_length=512)
+        load_time = time.perf_counter() - load_start
+
+        # Aufwärmen (Lazy-Initialisierung, Graph-Optimierung)
+        encoder.encode(chunks[:args.batch_size], batch_size=args.batch_size)
+
+        start = time.perf_counter()
+        corpus = encoder.encode(chunks, batch_size=args.batch_size, normalize_embeddings=True)
+        elapsed = time.perf_counter() - start
+        query_vectors = encoder.encode(queries, batch_size=args.batch_size, normalize_embeddings=True)
+
+        results[name] = {
+            "load": load_time,
+            "throughput": len(chunks) / elapsed,
+            "corpus": corpus,
+            "hits": top_k(corpus, query_vectors, args.top_k),
+        }
+
+    reference = results["torch"]
+    print(f"\n{len(chunks)} Chunks, {len(queries)} Queries, Top-{args.top_k}, Batchgröße {args.batch_size}")
+    print(f"\n{'Backend':>10} | {'Laden s':>8} | {'Chunks/s':>9} | {'Faktor':>7} | "
+          f"{'Top-k-Overlap':>13} | {'Kosinus zu torch':>16}")
+    print("-" * 80)
+    for name in backends:
+        result = results[name]
+        overlap = np.mean([
+            len(set(a) & set(b)) / args.top_k
+            for a, b in zip(result["hits"], reference["hits"])
+        ])
+        cosine = float(np.mean(np.sum(result["corpus"] * reference["corpus"], axis=1)))
+        print(f"{name:>10} | {result['load']:>8.1f} | {result['throughput']:>9.1f} | "
+              f"{result['throughput'] / reference['throughput']:>6.2f}x | "
+              f"{overlap:>12.1%} | {cosine:>16.4f}")
+
+if __name__ == "__main__":
+    main()
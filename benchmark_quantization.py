@@ -0,0 +1,117 @@
+"""
+Benchmark: komprimierte Embeddings (int8 + Neubewertung) gegen float32
+
+Legt denselben Korpus im NumPy-Backend als float32 (Referenz), float16 und
+int8 mit float16-Originalen ab und vergleicht Speicherbedarf der ersten
+Suchstufe pro Chunk, Latenz und recall@k gegenüber der exakten
+float32-Suche. Für int8 werden mehrere Neubewertungsfaktoren gemessen
+(Kandidaten = Faktor * k; Faktor 1 entspricht der Suche nur auf den Codes).
+
+Ohne --embeddings werden geclusterte Zufallsvektoren verwendet; mit einer
+.npy-Datei (z. B. exportierte Chunk-Embeddings) wird ein Teil der Zeilen als
+Anfragen zurückgehalten.
+
+Aufruf: python benchmark_quantization.py [--chunks 200000] [--dim 768]
+        [--embeddings datei.npy] [--queries 200] [--k 10] [--rescore 1 2 4 8]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from numpy_store import NumpyVectorStore
+
+def clustered_embeddings(rng: np.random.Generator, count: int, dim: int, noise: float = 0.08) -> np.ndarray:
+    """Punkte um zufällige Zentren, L2-normalisiert"""
+    centers = rng.standard_normal((max(count // 200, 16), dim)).astype(np.float32) / np.sqrt(dim)
+    labels = rng.integers(0, len(centers), count)
+    embeddings = centers[labels] + noise * rng.standard_normal((count, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+def run_queries(store: NumpyVectorStore, queries: np.ndarray, k: int):
+    """Liefert die Treffer-IDs je Anfrage und die Latenzen in Millisekunden"""
+    store.search_by_vector(queries[0], n_results=k)  # Aufwärmen
+    ids = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        results = store.search_by_vector(query, n_results=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append({result['id'] for result in results})
+    latencies.sort()
+    return ids, {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+def build_store(directory: str, embeddings: np.ndarray, **options) -> NumpyVectorStore:
+    store = NumpyVectorStore(
+        persist_directory=directory,
+        embedding_function=lambda texts: np.zeros((len(texts), embeddings.shape[1]), dtype=np.float32),
+        query_batch_wait_ms=0,
+        ann_index="none",
+        **options
+    )
+    for start in range(0, len(embeddings), 50000):
+        count = min(50000, len(embeddings) - start)
+        store.add_chunks(
+            chunks=[f"Chunk {start + i}" for i in range(count)],
+            embeddings=embeddings[start:start + count],
+            document_name=f"doc_{start // 50000:04d}.pdf",
+            page_numbers=[1] * count
+        )
+    return store
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200000, help="Anzahl der Chunks (synthetisch)")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding-Dimension (synthetisch)")
+    parser.add_argument("--embeddings", help="NumPy-Datei (.npy) mit echten Embeddings statt Zufallsvektoren")
+    parser.add_argument("--queries", type=int, default=200, help="Anzahl der Suchanfragen")
+    parser.add_argument("--k", type=int, default=10, help="Ergebnisse pro Anfrage (recall@k)")
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 2, 4, 8], help="Neubewertungsfaktoren für int8")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    if args.embeddings:
+        data = np.load(args.embeddings).astype(np.float32)
+        rng.shuffle(data)
+        queries, corpus = data[:args.queries], data[args.queries:]
+    else:
+        data = clustered_embeddings(rng, args.chunks + args.queries, args.dim)
+        queries, corpus = data[:args.queries], data[args.queries:]
+    print(f"Korpus: {len(corpus)} Chunks x {corpus.shape[1]} Dimensionen, {len(queries)} Anfragen, k={args.k}")
+    print(f"{'Variante':<22} {'Bytes/Chunk':>12} {'Faktor':>7} {'p50 ms':>9} {'p95 ms':>9} {'recall@' + str(args.k):>10}")
+
+    def report(label, store, truth):
+        stats = store.stats()
+        scanned = stats["codes_bytes"] if stats["quantization"] == "int8" else stats["matrix_bytes"]
+        per_chunk = scanned / stats["rows"]
+        found, latency = run_queries(store, queries, args.k)
+        recall = np.mean([len(a & b) / args.k for a, b in zip(found, truth)]) if truth else 1.0
+        print(f"{label:<22} {per_chunk:>12.0f} {reference_bytes / per_chunk:>6.1f}x "
+              f"{latency['p50']:>9.2f} {latency['p95']:>9.2f} {recall:>10.3f}")
+        return found
+
+    with tempfile.TemporaryDirectory() as directory:
+        reference = build_store(f"{directory}/float32", corpus, dtype="float32")
+        reference_bytes = corpus.shape[1] * 4
+        truth = report("float32 (exakt)", reference, None)
+
+        report("float16", build_store(f"{directory}/float16", corpus, dtype="float16"), truth)
+
+        int8_store = build_store(f"{directory}/int8", corpus, quantization="int8", dtype="float16")
+        for factor in args.rescore:
+            int8_store.rescore_factor = factor
+            report(f"int8, Neubewertung {factor}x", int8_store, truth)
+
+        disk = int8_store.stats()
+        print(f"\nint8-Modus auf der Platte: {disk['codes_bytes'] / 1e6:.1f} MB Codes (erste Stufe, im RAM) "
+              f"+ {disk['matrix_bytes'] / 1e6:.1f} MB float16-Originale (nur für Kandidaten gelesen)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: Query-Embeddings mit und ohne Micro-Batching
+
+Simuliert 1, 8, 32 und 128 gleichzeitige Clients, die jeweils einzelne
+Suchanfragen einbetten. Verglichen werden Einzelaufrufe des Modells (bisheriges
+Verhalten) und der MicroBatcher, der gleichzeitige Anfragen zu einem
+Modelldurchlauf zusammenfasst. Gemessen werden Durchsatz und Latenz.
+
+Aufruf: python benchmark_query_batching.py [--model NAME] [--requests 512]
+        [--clients 1 8 32 128] [--batch-size 32] [--wait-ms 5]
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sentence_transformers import SentenceTransformer
+
+from micro_batcher import MicroBatcher
+
+TERMS = [
+    "Betriebsspannung", "Schutzart", "Umgebungstemperatur", "Gewicht", "Abmessungen",
+    "Anschlussleistung", "Drehmoment", "Wartungsintervall", "Schmiermittel", "Sicherung",
+    "Motorleistung", "Druckbereich", "Kabelquerschnitt", "Geräuschpegel", "Frequenz",
+]
+
+TEMPLATES = [
+    "Wie hoch ist die {} der Maschine?",
+    "Welche {} hat das Gerät?",
+    "{} laut Datenblatt",
+    "Gibt es Angaben zur {} im Handbuch?",
+]
+
+def generate_queries(count: int, seed: int = 42) -> list:
+    """Erzeugt unterschiedliche Queries (kein Cache-Effekt)"""
+    rng = random.Random(seed)
+    return [
+        f"{rng.choice(TEMPLATES).format(rng.choice(TERMS))} #{i}"
+        for i in range(count)
+    ]
+
+def run_clients(encode, queries: list, clients: int) -> dict:
+    """Verteilt die Queries auf gleichzeitige Clients und misst jede Anfrage"""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(chunk):
+        for query in chunk:
+            start = time.perf_counter()
+            encode(query)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    chunks = [queries[i::clients] for i in range(clients)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(client, chunks))
+    total = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "qps": len(queries) / total,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="paraphrase-multilingual-mpnet-base-v2", help="SentenceTransformer-Modell")
+    parser.add_argument("--requests", type=int, default=512, help="Anzahl der Queries pro Durchlauf")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32, 128], help="Gleichzeitige Clients")
+    parser.add_argument("--batch-size", type=int, default=32, help="Maximale Batchgröße des MicroBatchers")
+    parser.add_argument("--wait-ms", type=float, default=5.0, help="Wartezeit des MicroBatchers in ms")
+    args = parser.parse_args()
+
+    print(f"Lade Modell {args.model} ...")
+    model = SentenceTransformer(args.model)
+    queries = generate_queries(args.requests)
+
+    def encode_single(query):
+        return model.encode([query])[0]
+
+    batcher = MicroBatcher(lambda texts: model.encode(texts), args.batch_size, args.wait_ms)
+
+    # Aufwärmen (Lazy-Initialisierung von Tokenizer und Modell)
+    encode_single("Aufwärmen")
+    batcher.encode("Aufwärmen")
+
+    print(f"\n{args.requests} Queries pro Durchlauf, Batchgröße {args.batch_size}, Wartezeit {args.wait_ms} ms")
+    print(f"\n{'Clients':>8} | {'einzeln QPS':>12} {'p50 ms':>8} {'p95 ms':>8} | "
+          f"{'Batch QPS':>10} {'p50 ms':>8} {'p95 ms':>8} | {'Faktor':>7}")
+    print("-" * 88)
+    for clients in args.clients:
+        single = run_clients(encode_single, queries, clients)
+        batched = run_clients(batcher.encode, queries, clients)
+        print(f"{clients:>8} | {single['qps']:>12.1f} {single['p50']:>8.1f} {single['p95']:>8.1f} | "
+              f"{batched['qps']:>10.1f} {batched['p50']:>8.1f} {batched['p95']:>8.1f} | "
+              f"{batched['qps'] / single['qps']:>6.2f}x")
+
+    stats = batcher.stats()
+    print(f"\nMicroBatcher: {stats['batches']} Batches, mittlere Größe {stats['avg_batch_size']:.1f}, "
+          f"größter Batch {stats['largest_batch']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: Kaltstart der API (Importzeit und Latenz der ersten Anfragen)
+
+Startet für jeden Durchlauf einen frischen Python-Prozess, importiert api.py
+und schickt über den FastAPI-TestClient nacheinander GET /documents, die
+erste POST /search (lädt Suchmaschine und Modell) und eine zweite Suche.
+Gemeldet werden Median und Maximum je Phase sowie die Module mit der
+größten kumulativen Importzeit (python -X importtime).
+
+Aufruf: python benchmark_startup.py [--runs 5] [--persist-directory chroma_db]
+        [--query "Wartungsintervall der Pumpe"] [--offline] [--top-imports 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+import api
+timings = {"import_api": time.perf_counter() - start}
+timings["heavy_modules"] = sorted(m for m in ("chromadb", "torch", "sentence_transformers", "fitz", "nltk") if m in sys.modules)
+
+from fastapi.testclient import TestClient
+headers = {"X-API-Key": api.config.api_keys[0]}
+with TestClient(api.app) as client:
+    for name, method, path, body in [
+        ("first_documents", "get", "/documents", None),
+        ("first_search", "post", "/search", {"query": sys.argv[1]}),
+        ("second_search", "post", "/search", {"query": sys.argv[1] + " ?"}),
+    ]:
+        start = time.perf_counter()
+        response = client.request(method, path, json=body, headers=headers)
+        timings[name] = time.perf_counter() - start
+        timings[name + "_status"] = response.status_code
+print("TIMINGS " + json.dumps(timings))
+"""
+
+PHASES = ["import_api", "first_documents", "first_search", "second_search"]
+
+def run_probe(query: str, env: dict, importtime: bool = False) -> tuple:
+    """Führt einen Kaltstart in einem neuen Prozess aus; liefert (Zeiten, stderr)"""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE, query]
+    result = subprocess.run(command, capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    for line in result.stdout.splitlines():
+        if line.startswith("TIMINGS "):
+            return json.loads(line[len("TIMINGS "):]), result.stderr
+    raise RuntimeError(f"Messlauf fehlgeschlagen:\n{result.stderr[-2000:]}")
+
+def top_imports(stderr: str, count: int) -> list:
+    """Wertet die Ausgabe von -X importtime aus (kumulative Zeit in Mikrosekunden)"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|", 2)
+        # Oberste Ebene ist mit drei Leerzeichen eingerückt, Untermodule tiefer
+        if len(name) - len(name.lstrip()) == 3:
+            entries.append((int(cumulative_us), name.strip()))
+    return sorted(entries, reverse=True)[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Anzahl der Kaltstarts")
+    parser.add_argument("--persist-directory", default="chroma_db", help="Verzeichnis der Vektordatenbank")
+    parser.add_argument("--query", default="Wie oft muss die Pumpe gewartet werden?", help="Suchanfrage")
+    parser.add_argument("--offline", action="store_true", help="Mit OFFLINE_MODE=1 messen")
+    parser.add_argument("--top-imports", type=int, default=10, help="Anzahl der teuersten Importe")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env["PERSIST_DIRECTORY"] = os.path.abspath(args.persist_directory)
+        env["INGEST_JOBS_DB"] = os.path.join(tmp, "ingest_jobs.db")  # Keine fremden Aufträge abarbeiten
+        env["PRELOAD_SEARCH_ENGINE"] = "0"
+        if args.offline:
+            env["OFFLINE_MODE"] = "1"
+
+        runs = [run_probe(args.query, env)[0] for _ in range(args.runs)]
+        _, importtime_stderr = run_probe(args.query, env, importtime=True)
+
+    print(f"\n{args.runs} Kaltstarts{' (offline)' if args.offline else ''}, "
+          f"nach dem Import geladen: {', '.join(runs[0]['heavy_modules']) or 'keine schweren Module'}")
+    print(f"\n{'Phase':>16} | {'Median ms':>10} | {'Max ms':>10} | {'Status':>6}")
+    print("-" * 52)
+    for phase in PHASES:
+        values = [run[phase] * 1000 for run in runs]
+        status = runs[0].get(phase + "_status", "")
+        print(f"{phase:>16} | {statistics.median(values):>10.1f} | {max(values):>10.1f} | {status:>6}")
+
+    total = [sum(run[phase] for phase in PHASES[:3]) * 1000 for run in runs]
+    print(f"\nImport bis erste Suche beantwortet: Median {statistics.median(total):.0f} ms")
+
+    print("\nTeuerste Importe (kumulativ):")
+    for cumulative_us, name in top_imports(importtime_stderr, args.top_imports):
+        print(f"{cumulative_us / 1000:>10.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: Suchlatenz der Vektordatenbank-Backends
+
+Legt einen synthetischen Korpus aus normalisierten Zufallsvektoren in einem
+temporären Verzeichnis an und misst die Latenz einzelner Suchanfragen
+(search_by_vector, ohne Query-Einbettung) mit und ohne Filter auf
+document_name. Zum Vergleich wird ein reines Matrix-Vektor-Produkt im
+Arbeitsspeicher gemessen.
+
+Aufruf: python benchmark_vector_stores.py [--chunks 100000] [--dim 768]
+        [--documents 1000] [--queries 200] [--backends numpy chroma]
+        [--dtype float32]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from base_vector_store import VECTOR_STORE_BACKENDS, create_vector_store
+
+def random_embeddings(rng: np.random.Generator, count: int, dim: int) -> np.ndarray:
+    embeddings = rng.standard_normal((count, dim)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings
+
+def measure(search, queries: np.ndarray) -> dict:
+    """Latenz je Anfrage in Millisekunden"""
+    search(queries[0])  # Aufwärmen (Memory-Mapping, Caches)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(0.95 * (len(latencies) - 1))],
+    }
+
+def fill_store(store, embeddings: np.ndarray, documents: int) -> float:
+    """Verteilt die Embeddings gleichmäßig auf Dokumente, liefert die Ladezeit"""
+    start = time.perf_counter()
+    for doc, rows in enumerate(np.array_split(np.arange(len(embeddings)), documents)):
+        store.add_chunks(
+            chunks=[f"Dokument {doc} Abschnitt {row}" for row in rows],
+            embeddings=embeddings[rows],
+            document_name=f"doc_{doc:05d}.pdf",
+            page_numbers=[1] * len(rows)
+        )
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100000, help="Anzahl der Chunks im Korpus")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding-Dimension")
+    parser.add_argument("--documents", type=int, default=1000, help="Anzahl der Dokumente")
+    parser.add_argument("--queries", type=int, default=200, help="Anzahl der Suchanfragen")
+    parser.add_argument("--n-results", type=int, default=5, help="Ergebnisse pro Anfrage")
+    parser.add_argument("--backends", nargs="+", choices=VECTOR_STORE_BACKENDS, default=["numpy"])
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32", help="Speicherformat des NumPy-Backends")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    embeddings = random_embeddings(rng, args.chunks, args.dim)
+    queries = random_embeddings(rng, args.queries, args.dim)
+    document_filter = {"document_name": f"doc_{args.documents // 2:05d}.pdf"}
+
+    print(f"Korpus: {args.chunks} Chunks x {args.dim} Dimensionen, {args.documents} Dokumente")
+    print(f"{'Variante':<28} {'p50 ms':>9} {'p95 ms':>9}")
+
+    baseline = measure(lambda q: np.argpartition(embeddings @ -q, args.n_results)[:args.n_results], queries)
+    print(f"{'NumPy im RAM (Referenz)':<28} {baseline['p50']:>9.2f} {baseline['p95']:>9.2f}")
+
+    for backend in args.backends:
+        with tempfile.TemporaryDirectory() as directory:
+            options = {"dtype": args.dtype} if backend == "numpy" else {}
+            store = create_vector_store(
+                backend,
+                persist_directory=directory,
+                embedding_function=lambda texts: random_embeddings(rng, len(texts), args.dim),
+                query_batch_wait_ms=0,
+                **options
+            )
+            load_time = fill_store(store, embeddings, args.documents)
+            print(f"{backend}: {args.chunks} Chunks in {load_time:.1f} s geladen")
+
+            for label, where in (("ohne Filter", None), ("Filter document_name", document_filter)):
+                result = measure(
+                    lambda q: store.search_by_vector(q, n_results=args.n_results, where=where),
+                    queries
+                )
+                print(f"{backend + ' ' + label:<28} {result['p50']:>9.2f} {result['p95']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
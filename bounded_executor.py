@@ -0,0 +1,145 @@
+from typing import Any, Callable, Dict
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import logging
+import math
+import threading
+import time
+
+class ExecutorQueueFull(Exception):
+    """Die Warteschlange eines BoundedExecutor ist voll"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"Warteschlange '{name}' ist voll")
+        self.name = name
+        self.retry_after = retry_after
+
+class BoundedExecutor:
+    def __init__(self,
+                 name: str,
+                 max_workers: int,
+                 max_queue: int,
+                 sample_size: int = 1000):
+        """
+        Thread-Pool mit begrenzter Warteschlange und Metriken
+
+        Nimmt höchstens max_workers laufende plus max_queue wartende
+        Aufgaben an; weitere Aufgaben werden sofort mit ExecutorQueueFull
+        abgelehnt, statt unbegrenzt Speicher und Wartezeit aufzubauen.
+
+        Args:
+            name: Name für Logs und Metriken
+            max_workers: Anzahl der Worker-Threads
+            max_queue: Maximale Anzahl wartender Aufgaben
+            sample_size: Anzahl der Messwerte für Warte- und Laufzeitstatistiken
+        """
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_times = deque(maxlen=sample_size)
+        self._run_times = deque(maxlen=sample_size)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Reiht eine Aufgabe ein oder wirft ExecutorQueueFull"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            retry_after = self.retry_after()
+            self.logger.warning(f"Executor '{self.name}' ausgelastet, Anfrage abgelehnt (Retry-After {retry_after}s)")
+            raise ExecutorQueueFull(self.name, retry_after)
+
+        with self._lock:
+            self._queued += 1
+        enqueued_at = time.perf_counter()
+
+        def run():
+            started_at = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._wait_times.append(started_at - enqueued_at)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._run_times.append(time.perf_counter() - started_at)
+                self._slots.release()
+
+        def release_if_cancelled(future: Future):
+            # Vor dem Start abgebrochene Aufgaben (z. B. Client-Abbruch) geben ihren Platz frei
+            if future.cancelled():
+                with self._lock:
+                    self._queued -= 1
+                self._slots.release()
+
+        try:
+            future = self._executor.submit(run)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(release_if_cancelled)
+        return future
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Führt eine Aufgabe aus, ohne die Event-Loop zu blockieren"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def retry_after(self) -> int:
+        """Geschätzte Sekunden, bis wieder ein Platz in der Warteschlange frei ist"""
+        with self._lock:
+            run_times = list(self._run_times)
+            backlog = self._queued + self._running
+        if not run_times:
+            return 1
+        average = sum(run_times) / len(run_times)
+        return max(1, math.ceil(average * backlog / self.max_workers))
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def metrics(self) -> Dict:
+        """Warteschlangentiefe, Auslastung sowie Warte- und Laufzeiten in Millisekunden"""
+        with self._lock:
+            wait_times = sorted(self._wait_times)
+            run_times = sorted(self._run_times)
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_time_ms": _summarize(wait_times),
+                "run_time_ms": _summarize(run_times)
+            }
+
+def _summarize(sorted_values: list) -> Dict:
+    """Mittelwert und Perzentile einer sortierten Liste von Sekundenwerten (in ms)"""
+    if not sorted_values:
+        return {"avg": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+    def percentile(p: float) -> float:
+        return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))] * 1000
+
+    return {
+        "avg": sum(sorted_values) / len(sorted_values) * 1000,
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": sorted_values[-1] * 1000
+    }
@@ -0,0 +1,438 @@
+"""
+Massenimport: alle PDFs eines Verzeichnisbaums in die Vektordatenbank laden
+
+Extraktion und Chunking laufen in einem Prozesspool über alle CPU-Kerne
+(ein Dokument pro Aufgabe). Die fertigen Chunks mehrerer Dokumente werden
+gesammelt und in vollen Batches eingebettet und blockweise in den
+VectorStore geschrieben. Als Dokumentname dient der relative Pfad zum
+Startverzeichnis, damit gleichnamige Dateien in Unterordnern sich nicht
+überschreiben.
+
+Der Import ist fortsetzbar: Dokumente, die bereits im Dokumentkatalog
+stehen, werden übersprungen; Fehlschläge werden in einer Fortschrittsdatei
+(JSON Lines) protokolliert und bei einem erneuten Lauf nur mit
+--retry-failed wiederholt.
+
+Mit --sync wird der Ordner inkrementell abgeglichen: ein Manifest
+(Pfad, Größe, mtime, Inhalts-Hash) bestimmt neue, geänderte und entfernte
+Dateien. Neue werden importiert, geänderte als Delta aktualisiert, die
+Chunks entfernter Dateien gelöscht; alles andere wird übersprungen.
+
+Aufruf: python bulk_ingest.py VERZEICHNIS [--workers N] [--embed-batch 2048]
+        [--persist-directory chroma_db] [--state bulk_ingest_state.jsonl] [--retry-failed]
+        [--sync] [--manifest DATEI] [--embedding-backend torch|onnx|onnx-int8]
+        [--vector-store chroma|numpy]
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+import argparse
+import contextlib
+import json
+import logging
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from embedding_backends import BACKENDS
+from extraction_cache import ExtractionCache, hash_file
+from parallel_extraction import resolve_worker_count
+from pdf_processor import (
+    EXTRACTION_BACKEND,
+    ExtractedText,
+    PageChunker,
+    PDFSearchEngine,
+    extract_chunks_from_range,
+)
+from sync_manifest import SyncManifest
+from base_vector_store import VECTOR_STORE_BACKENDS, DocumentChunks
+
+logger = logging.getLogger(__name__)
+
+def find_pdfs(root: Path) -> List[Path]:
+    """Alle PDF-Dateien unterhalb von root (rekursiv, sortiert)"""
+    return sorted(p for p in root.rglob("*") if p.is_file() and p.suffix.lower() == ".pdf")
+
+def document_name_for(path: Path, root: Path) -> str:
+    """Dokumentname eines Imports: relativer Pfad mit "/" als Trenner"""
+    return path.relative_to(root).as_posix()
+
+def extract_document(pdf_path: str, chunker: PageChunker) -> ExtractedText:
+    """
+    Extrahiert und chunkt eine komplette PDF (läuft in Worker-Prozessen)
+
+    Nutzt den Extraktions-Cache wie PDFSearchEngine.extract_text_from_pdf,
+    verarbeitet die Seiten aber seriell, da die Parallelität hier über die
+    Dokumente entsteht.
+    """
+    try:
+        content_hash = hash_file(pdf_path)
+        cache = ExtractionCache()
+        cached = cache.get(content_hash, EXTRACTION_BACKEND)
+
+        if cached:
+            page_count = cached.page_count
+            chunks = [
+                chunk
+                for page_num, text in enumerate(cached.pages, 1)
+                for chunk in chunker.create_chunks(text, page_num)
+            ]
+        else:
+            with contextlib.closing(fitz.open(pdf_path)) as doc:
+                page_count = len(doc)
+            pages = extract_chunks_from_range(pdf_path, 0, page_count, chunker)
+            chunks = [chunk for _, _, page_chunks in pages for chunk in page_chunks]
+            # Mit fehlgeschlagenen Seiten nicht cachen, sonst blieben sie dauerhaft leer
+            if all(text is not None for _, text, _ in pages):
+                cache.put(content_hash, EXTRACTION_BACKEND, [text for _, text, _ in pages])
+
+        if not chunks:
+            return ExtractedText(
+                content=[],
+                page_count=page_count,
+                success=False,
+                error_message="Keine verwertbaren Textinhalte gefunden",
+                content_hash=content_hash
+            )
+
+        return ExtractedText(
+            content=[],  # Texte stecken in den Chunks; spart Serialisierung zwischen Prozessen
+            page_count=page_count,
+            success=True,
+            chunks=chunks,
+            content_hash=content_hash
+        )
+
+    except Exception as e:
+        return ExtractedText(
+            content=[],
+            page_count=0,
+            success=False,
+            error_message=f"Fehler bei der Textextraktion: {str(e)}"
+        )
+
+@dataclass
+class IngestStats:
+    """Zähler und Durchsatz eines Massenimports"""
+    files_total: int = 0
+    files_done: int = 0
+    files_failed: int = 0
+    pages: int = 0
+    chunks: int = 0
+    started_at: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def summary(self) -> str:
+        elapsed = max(self.elapsed, 1e-9)
+        processed = self.files_done + self.files_failed
+        remaining = self.files_total - processed
+        eta = elapsed / processed * remaining if processed else 0
+        return (
+            f"{processed}/{self.files_total} Dateien "
+            f"({self.files_failed} Fehler), {self.pages} Seiten, {self.chunks} Chunks | "
+            f"{self.pages / elapsed:.1f} Seiten/s, {self.chunks / elapsed:.1f} Chunks/s | "
+            f"Restzeit ~{eta / 60:.0f} min"
+        )
+
+class ProgressLog:
+    def __init__(self, path: Path):
+        """Fortschrittsdatei im JSON-Lines-Format (eine Zeile pro abgeschlossenem Dokument)"""
+        self.path = Path(path)
+
+    def failed(self) -> Set[str]:
+        """Dokumente, deren letzter Versuch fehlgeschlagen ist"""
+        status: Dict[str, str] = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Abgebrochene letzte Zeile
+                    status[entry["document_name"]] = entry["status"]
+        return {name for name, state in status.items() if state == "failed"}
+
+    def record(self, entries: Iterable[Dict]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                entry["timestamp"] = datetime.now().isoformat()
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+
+class BulkIngestor:
+    def __init__(self,
+                 engine: PDFSearchEngine,
+                 workers: Optional[int] = None,
+                 embed_batch_size: int = 2048,
+                 progress_log: Optional[ProgressLog] = None,
+                 report_interval: float = 10.0,
+                 on_result: Optional[Callable[[str, bool, Optional[str]], None]] = None):
+        """
+        Paralleler Import vieler PDFs
+
+        Args:
+            engine: Suchmaschine (Modell, Embedding-Cache und VectorStore)
+            workers: Anzahl der Extraktionsprozesse (None = alle CPU-Kerne)
+            embed_batch_size: Chunks, die gesammelt und gemeinsam eingebettet werden
+            progress_log: Optional - Fortschrittsdatei für fortsetzbare Importe
+            report_interval: Sekunden zwischen Durchsatzmeldungen
+            on_result: Optional - Callback (Dokumentname, Erfolg, Inhalts-Hash) je Dokument
+        """
+        self.engine = engine
+        self.workers = resolve_worker_count(workers)
+        self.embed_batch_size = embed_batch_size
+        self.progress_log = progress_log
+        self.report_interval = report_interval
+        self.on_result = on_result
+        self.stats = IngestStats()
+        self._buffer: List[Tuple[str, ExtractedText]] = []
+        self._buffered_chunks = 0
+        self._last_report = 0.0
+
+    def ingest(self, files: List[Tuple[Path, str]]) -> IngestStats:
+        """
+        Importiert die Dateien (Pfad, Dokumentname)
+
+        Returns:
+            Zähler und Durchsatz des Laufs
+        """
+        self.stats = IngestStats(files_total=len(files), started_at=time.perf_counter())
+        self._last_report = time.perf_counter()
+        if not files:
+            return self.stats
+
+        # Mehr Aufgaben als Prozesse einreihen, damit der Pool während des Einbettens weiterarbeitet
+        max_in_flight = self.workers * 4
+        queue = iter(files)
+        in_flight = {}
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                for path, name in queue:
+                    in_flight[pool.submit(extract_document, str(path), self.engine.chunker)] = name
+                    if len(in_flight) >= max_in_flight:
+                        break
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._collect(in_flight.pop(future), future.result())
+
+                if self._buffered_chunks >= self.embed_batch_size:
+                    self._flush()
+                self._report()
+
+        self._flush()
+        logger.info(f"Import abgeschlossen: {self.stats.summary()}")
+        return self.stats
+
+    def _collect(self, name: str, extracted: ExtractedText) -> None:
+        if not extracted.success:
+            self.stats.files_failed += 1
+            logger.warning(f"{name}: {extracted.error_message}")
+            self._record([{"document_name": name, "status": "failed", "error": extracted.error_message}])
+            self._notify(name, False, extracted.content_hash)
+            return
+
+        self._buffer.append((name, extracted))
+        self._buffered_chunks += len(extracted.chunks)
+
+    def _flush(self) -> None:
+        """Bettet alle gesammelten Chunks gemeinsam ein und schreibt sie in einem Durchgang"""
+        if not self._buffer:
+            return
+
+        buffer, self._buffer, self._buffered_chunks = self._buffer, [], 0
+        vector_store = self.engine.vector_store
+        entries = []
+
+        try:
+            # Bereits gespeicherte Dokumente (geänderte Fassungen) werden als Delta aktualisiert:
+            # nur Chunks mit neuer inhaltsabgeleiteter ID müssen eingebettet werden
+            needed: Dict[str, List[int]] = {}
+            for name, extracted in buffer:
+                if vector_store.get_document_info(name) is None:
+                    needed[name] = list(range(len(extracted.chunks)))
+                else:
+                    stored_ids = vector_store.get_document_chunk_ids(name)
+                    chunk_ids = vector_store.chunk_ids_for(name, [chunk.text for chunk in extracted.chunks])
+                    needed[name] = [i for i, chunk_id in enumerate(chunk_ids) if chunk_id not in stored_ids]
+
+            to_embed = [extracted.chunks[i] for name, extracted in buffer for i in needed[name]]
+            embeddings = self.engine.generate_embeddings(to_embed) if to_embed else None
+
+            documents = []
+            offset = 0
+            for name, extracted in buffer:
+                count = len(needed[name])
+                document_embeddings = embeddings[offset:offset + count] if count else None
+                offset += count
+
+                if vector_store.get_document_info(name) is None:
+                    documents.append(DocumentChunks(
+                        document_name=name,
+                        chunks=[chunk.text for chunk in extracted.chunks],
+                        embeddings=document_embeddings,
+                        page_numbers=[chunk.page_num for chunk in extracted.chunks],
+                        page_count=extracted.page_count,
+                        content_hash=extracted.content_hash
+                    ))
+                    continue
+
+                by_index = dict(zip(needed[name], document_embeddings if count else []))
+                vector_store.update_document(
+                    document_name=name,
+                    chunks=[chunk.text for chunk in extracted.chunks],
+                    page_numbers=[chunk.page_num for chunk in extracted.chunks],
+                    embed=lambda indices, by_index=by_index: np.stack([by_index[i] for i in indices]),
+                    page_count=extracted.page_count,
+                    content_hash=extracted.content_hash
+                )
+
+            if documents and not vector_store.add_documents(documents):
+                raise RuntimeError("Chunks konnten nicht gespeichert werden")
+
+        except Exception as e:
+            logger.error(f"Fehler beim Einbetten/Speichern von {len(buffer)} Dokumenten: {str(e)}")
+            self.stats.files_failed += len(buffer)
+            self._record([{"document_name": name, "status": "failed", "error": str(e)} for name, _ in buffer])
+            for name, extracted in buffer:
+                self._notify(name, False, extracted.content_hash)
+            return
+
+        for name, extracted in buffer:
+            self.stats.files_done += 1
+            self.stats.pages += extracted.page_count
+            self.stats.chunks += len(extracted.chunks)
+            entries.append({
+                "document_name": name,
+                "status": "done",
+                "pages": extracted.page_count,
+                "chunks": len(extracted.chunks),
+                "content_hash": extracted.content_hash
+            })
+            self._notify(name, True, extracted.content_hash)
+        self._record(entries)
+
+    def _notify(self, name: str, success: bool, content_hash: Optional[str]) -> None:
+        if self.on_result is not None:
+            self.on_result(name, success, content_hash)
+
+    def _record(self, entries: List[Dict]) -> None:
+        if self.progress_log is not None:
+            self.progress_log.record(entries)
+
+    def _report(self) -> None:
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            print(self.stats.summary(), flush=True)
+
+def sync_directory(engine: PDFSearchEngine,
+                   root: Path,
+                   manifest: SyncManifest,
+                   args: argparse.Namespace,
+                   progress_log: ProgressLog) -> None:
+    """Gleicht den Ordner inkrementell mit der Vektordatenbank ab"""
+    files = [(path, document_name_for(path, root)) for path in find_pdfs(root)]
+    plan = manifest.plan(files, engine.vector_store.catalog)
+    print(f"{len(files)} PDFs gefunden: {plan.summary()}")
+
+    # Entfernte Dateien: Chunks löschen
+    for name in plan.removed:
+        if engine.vector_store.delete_document(name):
+            manifest.forget(name)
+
+    # Geänderte Dateien werden zusammen mit den neuen importiert und dabei als Delta
+    # aktualisiert (nur neue Chunks werden eingebettet, verschwundene gelöscht)
+    paths = {name: path for path, name in plan.new + plan.changed}
+
+    def on_result(name: str, success: bool, content_hash: Optional[str]) -> None:
+        if success:
+            manifest.record(paths[name], name, content_hash)
+
+    ingestor = BulkIngestor(
+        engine,
+        workers=args.workers,
+        embed_batch_size=args.embed_batch,
+        progress_log=progress_log,
+        report_interval=args.report_interval,
+        on_result=on_result
+    )
+    try:
+        stats = ingestor.ingest(plan.new + plan.changed)
+    finally:
+        manifest.save()
+    print(stats.summary())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="Wurzelverzeichnis mit PDF-Dateien")
+    parser.add_argument("--workers", type=int, default=None, help="Extraktionsprozesse (Standard: alle CPU-Kerne)")
+    parser.add_argument("--embed-batch", type=int, default=2048, help="Chunks pro Einbettungs- und Schreibdurchgang")
+    parser.add_argument("--persist-directory", default="chroma_db", help="Verzeichnis der Vektordatenbank")
+    parser.add_argument("--embedding-backend", choices=BACKENDS, default=None,
+                        help="Embedding-Backend (Standard: EMBEDDING_BACKEND oder torch)")
+    parser.add_argument("--vector-store", choices=VECTOR_STORE_BACKENDS, default=None,
+                        help="Vektordatenbank (Standard: VECTOR_STORE_BACKEND oder chroma)")
+    parser.add_argument("--state", default="bulk_ingest_state.jsonl", help="Fortschrittsdatei")
+    parser.add_argument("--retry-failed", action="store_true", help="Zuvor fehlgeschlagene Dokumente erneut versuchen")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Sekunden zwischen Statusmeldungen")
+    parser.add_argument("--sync", action="store_true", help="Inkrementeller Abgleich über ein Manifest")
+    parser.add_argument("--manifest", default=None,
+                        help="Manifest-Datei für --sync (Standard: <persist-directory>/sync_manifest.json)")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    root = Path(args.directory).resolve()
+    if not root.is_dir():
+        parser.error(f"Verzeichnis nicht gefunden: {root}")
+
+    engine = PDFSearchEngine(
+        persist_directory=args.persist_directory,
+        extraction_workers=1,
+        embedding_backend=args.embedding_backend,
+        vector_store_backend=args.vector_store
+    )
+    progress_log = ProgressLog(Path(args.state))
+    
+    if args.sync:
+        manifest_path = Path(args.manifest or Path(args.persist_directory) / "sync_manifest.json")
+        sync_directory(engine, root, SyncManifest(manifest_path), args, progress_log)
+        return
+
+    # Bereits importierte (Katalog) und zuvor fehlgeschlagene Dokumente überspringen
+    skip = set(engine.vector_store.list_documents())
+    if not args.retry_failed:
+        skip |= progress_log.failed()
+
+    all_files = [(path, document_name_for(path, root)) for path in find_pdfs(root)]
+    files = [(path, name) for path, name in all_files if name not in skip]
+    print(f"{len(all_files)} PDFs gefunden, {len(all_files) - len(files)} bereits verarbeitet, "
+          f"{len(files)} zu importieren ({resolve_worker_count(args.workers)} Prozesse)")
+
+    ingestor = BulkIngestor(
+        engine,
+        workers=args.workers,
+        embed_batch_size=args.embed_batch,
+        progress_log=progress_log,
+        report_interval=args.report_interval
+    )
+    stats = ingestor.ingest(files)
+    print(stats.summary())
+
+if __name__ == "__main__":
+    main()
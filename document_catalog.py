@@ -0,0 +1,141 @@
+from typing import Dict, List, Optional
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from file_lock import FileLock
+
+@dataclass
+class DocumentInfo:
+    """Katalogeintrag eines Dokuments in der Vektordatenbank"""
+    name: str
+    chunk_count: int
+    page_count: Optional[int] = None
+    content_hash: Optional[str] = None
+    ingested_at: str = None
+
+    def __post_init__(self):
+        if self.ingested_at is None:
+            self.ingested_at = datetime.now().isoformat()
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+class DocumentCatalog:
+    def __init__(self, path: Path):
+        """
+        Persistenter Dokumentkatalog neben der Vektordatenbank
+
+        Hält pro Dokument Name, Chunk- und Seitenanzahl, Inhalts-Hash und
+        Importzeitpunkt, damit Dokumentlisten ohne Durchlauf über alle
+        Chunks beantwortet werden können. Jede Änderung erhöht die Version
+        und wird atomar (temporäre Datei + Umbenennen) geschrieben; andere
+        Prozesse übernehmen Änderungen beim nächsten Zugriff.
+
+        Args:
+            path: Pfad zur JSON-Datei des Katalogs
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_path = self.path.with_suffix('.lock')
+        self.version = 0
+        self._documents: Dict[str, DocumentInfo] = {}
+        self._file_state = None
+        self._lock = threading.RLock()
+        self.reload_if_changed()
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def reload_if_changed(self) -> None:
+        """Lädt den Katalog neu, wenn ein anderer Prozess ihn geändert hat"""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return
+
+        # Inode mit prüfen: os.replace() erzeugt eine neue Datei, auch wenn
+        # Zeitstempel (grobe Auflösung) und Größe zufällig übereinstimmen
+        state = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if state == self._file_state:
+            return
+
+        with self._lock:
+            try:
+                data = json.loads(self.path.read_text(encoding='utf-8'))
+            except Exception as e:
+                self.logger.error(f"Dokumentkatalog konnte nicht gelesen werden: {str(e)}")
+                return
+
+            self.version = data.get('version', 0)
+            self._documents = {
+                name: DocumentInfo(**info) for name, info in data.get('documents', {}).items()
+            }
+            self._file_state = state
+
+    def names(self) -> List[str]:
+        self.reload_if_changed()
+        return sorted(self._documents)
+
+    def get(self, name: str) -> Optional[DocumentInfo]:
+        self.reload_if_changed()
+        return self._documents.get(name)
+
+    def __len__(self) -> int:
+        self.reload_if_changed()
+        return len(self._documents)
+
+    def __contains__(self, name: str) -> bool:
+        self.reload_if_changed()
+        return name in self._documents
+
+    def upsert(self, info: DocumentInfo) -> None:
+        """Fügt einen Eintrag hinzu oder ersetzt ihn"""
+        self.upsert_many([info])
+
+    def upsert_many(self, infos: List[DocumentInfo]) -> None:
+        """Fügt mehrere Einträge mit einem einzigen Schreibvorgang hinzu"""
+        with self._lock, FileLock(self._lock_path):
+            self.reload_if_changed()
+            for info in infos:
+                self._documents[info.name] = info
+            self._save()
+
+    def remove(self, name: str) -> None:
+        """Entfernt einen Eintrag (falls vorhanden)"""
+        with self._lock, FileLock(self._lock_path):
+            self.reload_if_changed()
+            self._documents.pop(name, None)
+            self._save()
+
+    def replace_all(self, documents: List[DocumentInfo]) -> None:
+        """Ersetzt den gesamten Katalog (z. B. beim Leeren oder Neuaufbau)"""
+        with self._lock, FileLock(self._lock_path):
+            self.reload_if_changed()
+            self._documents = {info.name: info for info in documents}
+            self._save()
+
+    def _save(self) -> None:
+        self.version += 1
+        data = {
+            'version': self.version,
+            'documents': {name: info.to_dict() for name, info in self._documents.items()}
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        stat = self.path.stat()
+        self._file_state = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
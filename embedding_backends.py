@@ -0,0 +1,339 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from pathlib import Path
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from text_resources import apply_offline_mode
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Einheitliche Tokenlänge für alle Nutzer eines geteilten Modells
+DEFAULT_MAX_SEQ_LENGTH = 512
+
+logger = logging.getLogger(__name__)
+
+class TorchBackend:
+    def __init__(self,
+                 model_name: str,
+                 device: Optional[str] = None,
+                 max_seq_length: Optional[int] = None):
+        """
+        SentenceTransformer über PyTorch (fp32, GPU wenn verfügbar)
+
+        Args:
+            model_name: Name des SentenceTransformer-Modells
+            device: Optional - 'cuda' oder 'cpu' (Standard: automatisch)
+            max_seq_length: Optional - maximale Tokenanzahl pro Text
+        """
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        self.name = "torch"
+        self.model_name = model_name
+        self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        self.model = SentenceTransformer(model_name, device=self.device)
+        if max_seq_length:
+            self.model.max_seq_length = max_seq_length
+        self.model.eval()
+
+    def encode(self,
+               texts: Sequence[str],
+               batch_size: int = 32,
+               normalize_embeddings: bool = False,
+               show_progress_bar: bool = False) -> np.ndarray:
+        import torch
+
+        with torch.no_grad():
+            return self.model.encode(
+                list(texts),
+                batch_size=batch_size,
+                show_progress_bar=show_progress_bar,
+                convert_to_numpy=True,
+                normalize_embeddings=normalize_embeddings
+            )
+
+class OnnxBackend:
+    def __init__(self,
+                 model_name: str,
+                 quantize: bool = True,
+                 model_dir: Optional[str] = None,
+                 max_seq_length: Optional[int] = None,
+                 threads: Optional[int] = None):
+        """
+        Transformer als ONNX-Modell über ONNX Runtime auf der CPU
+
+        Beim ersten Aufruf wird das SentenceTransformer-Modell nach ONNX
+        exportiert (benötigt dann einmalig torch) und optional dynamisch
+        auf int8 quantisiert; danach genügen onnxruntime und der Tokenizer.
+        Pooling (Mean/CLS/Max) entspricht dem des Originalmodells.
+
+        Args:
+            model_name: Name des SentenceTransformer-Modells
+            quantize: Gewichte dynamisch auf int8 quantisieren
+            model_dir: Ablage der exportierten Modelle (Standard: ONNX_MODEL_DIR oder onnx_models)
+            max_seq_length: Optional - maximale Tokenanzahl pro Text
+            threads: Optional - Anzahl der Inferenz-Threads (Standard: ONNX Runtime)
+        """
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "Für das ONNX-Backend werden 'onnxruntime' und 'transformers' benötigt "
+                "(pip install onnxruntime transformers)"
+            ) from e
+
+        self.name = "onnx-int8" if quantize else "onnx"
+        self.model_name = model_name
+        self.device = "cpu"
+
+        base_dir = Path(model_dir or os.environ.get("ONNX_MODEL_DIR", "onnx_models"))
+        self.directory = base_dir / (re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name) + ("-int8" if quantize else "-fp32"))
+        if not (self.directory / "model.onnx").exists():
+            export_onnx(model_name, self.directory, quantize)
+
+        config = json.loads((self.directory / "pooling.json").read_text())
+        self.pooling = config["mode"]
+        self.max_seq_length = max_seq_length or config["max_seq_length"]
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.directory))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(self.directory / "model.onnx"),
+            options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = [i.name for i in self.session.get_inputs()]
+        logger.info(f"ONNX-Modell geladen: {self.directory}")
+
+    def encode(self,
+               texts: Sequence[str],
+               batch_size: int = 32,
+               normalize_embeddings: bool = False,
+               show_progress_bar: bool = False) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.session.get_outputs()[0].shape[-1] or 0), dtype=np.float32)
+
+        # Nach Länge sortieren, damit pro Batch wenig Padding entsteht
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        results: List[np.ndarray] = []
+
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start:start + batch_size]]
+            encoded = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            inputs = {name: encoded[name].astype(np.int64) for name in self._input_names if name in encoded}
+            token_embeddings = self.session.run(None, inputs)[0]
+            results.append(self._pool(token_embeddings, encoded["attention_mask"]))
+
+        embeddings = np.empty((len(texts), results[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.concatenate(results)
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+        return embeddings
+
+    def _pool(self, token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.pooling == "cls":
+            return token_embeddings[:, 0].astype(np.float32)
+
+        mask = attention_mask[:, :, np.newaxis].astype(np.float32)
+        if self.pooling == "max":
+            return np.where(mask > 0, token_embeddings, -1e9).max(axis=1).astype(np.float32)
+
+        summed = (token_embeddings * mask).sum(axis=1)
+        return (summed / np.maximum(mask.sum(axis=1), 1e-9)).astype(np.float32)
+
+def export_onnx(model_name: str, directory: Path, quantize: bool) -> None:
+    """Exportiert den Transformer eines SentenceTransformer-Modells nach ONNX (optional int8)"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Exportiere '{model_name}' nach ONNX ({'int8' if quantize else 'fp32'})...")
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0]
+    pooling = model[1]
+    auto_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+
+    directory.mkdir(parents=True, exist_ok=True)
+    tokenizer.save_pretrained(str(directory))
+
+    if getattr(pooling, "pooling_mode_cls_token", False):
+        mode = "cls"
+    elif getattr(pooling, "pooling_mode_max_tokens", False):
+        mode = "max"
+    else:
+        mode = "mean"
+    (directory / "pooling.json").write_text(json.dumps({
+        "mode": mode,
+        "max_seq_length": model.max_seq_length
+    }))
+
+    dummy = tokenizer(["Beispieltext für den Export"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = directory / "model_fp32.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            auto_model,
+            tuple(dummy[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(fp32_path), str(directory / "model.onnx"), weight_type=QuantType.QInt8)
+        fp32_path.unlink()
+    else:
+        fp32_path.replace(directory / "model.onnx")
+    logger.info(f"ONNX-Export abgeschlossen: {directory}")
+
+def create_backend(model_name: str,
+                   backend: str = "torch",
+                   device: Optional[str] = None,
+                   max_seq_length: Optional[int] = None):
+    """
+    Erzeugt ein Embedding-Backend
+
+    Args:
+        model_name: Name des SentenceTransformer-Modells
+        backend: 'torch', 'onnx' (fp32) oder 'onnx-int8' (dynamisch quantisiert)
+        device: Optional - Gerät für das torch-Backend
+        max_seq_length: Optional - maximale Tokenanzahl pro Text
+    """
+    # Im Offline-Modus nur lokal vorhandene Modelle verwenden
+    apply_offline_mode()
+
+    if backend == "torch":
+        return TorchBackend(model_name, device=device, max_seq_length=max_seq_length)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxBackend(model_name, quantize=backend == "onnx-int8", max_seq_length=max_seq_length)
+    raise ValueError(f"Unbekanntes Embedding-Backend '{backend}' (erlaubt: {', '.join(BACKENDS)})")
+
+# Prozessweite Registry: jedes (Modell, Backend, Gerät) wird höchstens einmal geladen
+_registry: Dict[Tuple[str, str, Optional[str]], Tuple[object, threading.Lock]] = {}
+_registry_lock = threading.Lock()
+
+def canonical_model_name(model_name: str) -> str:
+    """'sentence-transformers/X' und 'X' bezeichnen dasselbe Modell"""
+    prefix = "sentence-transformers/"
+    return model_name[len(prefix):] if model_name.startswith(prefix) else model_name
+
+class SharedEncoder:
+    def __init__(self, key: Tuple[str, str, Optional[str]]):
+        """
+        Verweis auf ein prozessweit geteiltes Embedding-Backend
+
+        Das Backend wird erst beim ersten Einbetten geladen. Alle Verweise mit
+        gleichem Schlüssel nutzen dieselbe Instanz; Aufrufe werden abschnittsweise
+        serialisiert, da Tokenizer nicht threadsicher sind. Große Importe geben
+        das Modell so zwischen den Abschnitten für Suchanfragen frei.
+        """
+        self.key = key
+        self.model_name, self.name, self._device = key
+
+    @property
+    def loaded(self) -> bool:
+        return self.key in _registry
+
+    @property
+    def device(self) -> str:
+        return self._load()[0].device
+
+    def _load(self) -> Tuple[object, threading.Lock]:
+        entry = _registry.get(self.key)
+        if entry is None:
+            with _registry_lock:
+                entry = _registry.get(self.key)
+                if entry is None:
+                    start = time.perf_counter()
+                    backend = create_backend(
+                        self.model_name,
+                        self.name,
+                        device=self._device,
+                        max_seq_length=DEFAULT_MAX_SEQ_LENGTH
+                    )
+                    entry = (backend, threading.Lock())
+                    _registry[self.key] = entry
+                    logger.info(
+                        f"Modell '{self.model_name}' ({self.name}) geladen auf {backend.device} "
+                        f"in {time.perf_counter() - start:.1f}s"
+                    )
+        return entry
+
+    def encode(self,
+               texts: Sequence[str],
+               batch_size: int = 32,
+               normalize_embeddings: bool = False,
+               show_progress_bar: bool = False) -> np.ndarray:
+        backend, lock = self._load()
+        texts = list(texts)
+        step = batch_size * 4
+
+        if len(texts) <= step:
+            with lock:
+                return backend.encode(texts, batch_size, normalize_embeddings, show_progress_bar)
+
+        # Ein Fortschrittsbalken über alle Teile statt einem je Teil
+        progress = None
+        if show_progress_bar:
+            from tqdm.auto import tqdm  # Abhängigkeit von sentence-transformers/transformers
+            progress = tqdm(total=len(texts), desc="Embeddings", unit="Text")
+
+        parts = []
+        try:
+            for start in range(0, len(texts), step):
+                with lock:
+                    parts.append(backend.encode(texts[start:start + step], batch_size, normalize_embeddings))
+                if progress is not None:
+                    progress.update(len(parts[-1]))
+        finally:
+            if progress is not None:
+                progress.close()
+        return np.concatenate(parts)
+
+def get_encoder(model_name: str, backend: str = "torch", device: Optional[str] = None) -> SharedEncoder:
+    """
+    Liefert das geteilte Embedding-Backend für (Modell, Backend, Gerät)
+
+    Args:
+        model_name: Name des SentenceTransformer-Modells
+        backend: 'torch', 'onnx' oder 'onnx-int8'
+        device: Optional - Gerät für das torch-Backend (Standard: automatisch)
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unbekanntes Embedding-Backend '{backend}' (erlaubt: {', '.join(BACKENDS)})")
+    if backend != "torch":
+        device = "cpu"
+    return SharedEncoder((canonical_model_name(model_name), backend, device))
+
+def loaded_encoders() -> List[Dict]:
+    """Übersicht der in diesem Prozess geladenen Modelle"""
+    return [
+        {"model": model_name, "backend": backend_name, "device": entry[0].device}
+        for (model_name, backend_name, _), entry in list(_registry.items())
+    ]
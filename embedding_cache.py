@@ -0,0 +1,239 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from pathlib import Path
+import numpy as np
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+from file_lock import FileLock
+from memory_cache import CacheStats, MemoryCache
+
+KEY_SIZE = 16  # Bytes pro Schlüssel (gekürzter SHA-256 des Chunk-Textes)
+
+def text_key(text: str) -> bytes:
+    """Kompakter Schlüssel eines Textes"""
+    return hashlib.sha256(text.encode('utf-8')).digest()[:KEY_SIZE]
+
+class EmbeddingCache:
+    def __init__(self,
+                 cache_dir: str,
+                 model_name: str,
+                 normalize: bool = True):
+        """
+        Persistenter Embedding-Cache auf der Festplatte
+
+        Pro Kombination aus Modell und Normalisierung gibt es ein eigenes
+        Verzeichnis mit einer Float32-Matrix (vectors.f32, per Memory-Map
+        gelesen) und einem Schlüsselindex (keys.bin, 16 Byte pro Zeile in
+        derselben Reihenfolge). Beide Dateien werden nur angehängt.
+
+        Args:
+            cache_dir: Basisverzeichnis des Caches
+            model_name: Name des Embedding-Modells
+            normalize: Ob die Embeddings normalisiert wurden
+        """
+        self.logger = logging.getLogger(__name__)
+        self.model_name = model_name
+        self.normalize = normalize
+
+        namespace = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name) + ('__norm' if normalize else '__raw')
+        self.directory = Path(cache_dir) / namespace
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._keys_path = self.directory / 'keys.bin'
+        self._vectors_path = self.directory / 'vectors.f32'
+        self._meta_path = self.directory / 'meta.json'
+        self._lock_path = self.directory / '.lock'
+
+        self.stats = CacheStats()
+        self.dim: Optional[int] = None
+        self._index = {}
+        self._rows = 0
+        self._keys_size = 0  # zuletzt gelesene Größe der Schlüsseldatei
+        self._vectors: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+
+        self._refresh()
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def get_many(self, texts: Sequence[str]) -> Tuple[List[Optional[np.ndarray]], List[int]]:
+        """
+        Schlägt die Embeddings mehrerer Texte nach
+
+        Returns:
+            (Liste mit Embedding oder None je Text, Indizes der Fehlzugriffe)
+        """
+        with self._lock:
+            if self._keys_path.exists() and self._keys_path.stat().st_size != self._keys_size:
+                self._refresh()
+
+            found: List[Optional[np.ndarray]] = []
+            missing = []
+            for i, text in enumerate(texts):
+                row = self._index.get(text_key(text))
+                if row is None:
+                    found.append(None)
+                    missing.append(i)
+                else:
+                    found.append(np.array(self._vectors[row]))
+
+            self.stats.hits += len(texts) - len(missing)
+            self.stats.misses += len(missing)
+            return found, missing
+
+    def put_many(self, texts: Sequence[str], embeddings: np.ndarray) -> None:
+        """Hängt neue Embeddings an (bereits vorhandene Schlüssel werden übersprungen)"""
+        if len(texts) == 0:
+            return
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock, FileLock(self._lock_path):
+            self._refresh()
+
+            if self.dim is None:
+                self.dim = int(embeddings.shape[1])
+                self._meta_path.write_text(json.dumps({
+                    'dim': self.dim,
+                    'model_name': self.model_name,
+                    'normalize': self.normalize
+                }))
+            elif embeddings.shape[1] != self.dim:
+                raise ValueError(f"Embedding-Dimension {embeddings.shape[1]} passt nicht zum Cache ({self.dim})")
+
+            new_keys = []
+            new_rows = []
+            seen = set()
+            for text, embedding in zip(texts, embeddings):
+                key = text_key(text)
+                if key in self._index or key in seen:
+                    continue
+                seen.add(key)
+                new_keys.append(key)
+                new_rows.append(embedding)
+
+            if not new_keys:
+                return
+
+            # Erst die Vektoren, dann die Schlüssel schreiben: ein Schlüssel zeigt nie auf eine fehlende Zeile.
+            # Reste eines abgebrochenen Schreibvorgangs werden vorher abgeschnitten.
+            with open(self._keys_path, 'ab') as f:
+                f.truncate(self._rows * KEY_SIZE)
+            with open(self._vectors_path, 'ab') as f:
+                f.truncate(self._rows * self.dim * 4)
+                np.stack(new_rows).astype(np.float32).tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._keys_path, 'ab') as f:
+                f.write(b''.join(new_keys))
+
+            self._refresh()
+
+    def _refresh(self) -> None:
+        """Liest neu angehängte Schlüssel (auch aus anderen Prozessen) und mappt die Matrix neu"""
+        if self.dim is None and self._meta_path.exists():
+            self.dim = json.loads(self._meta_path.read_text())['dim']
+        if self.dim is None or not self._keys_path.exists() or not self._vectors_path.exists():
+            return
+
+        vector_rows = self._vectors_path.stat().st_size // (self.dim * 4)
+        with open(self._keys_path, 'rb') as f:
+            f.seek(self._rows * KEY_SIZE)
+            data = f.read()
+
+        keys_size = self._rows * KEY_SIZE + len(data)
+        key_rows = keys_size // KEY_SIZE
+        rows = min(key_rows, vector_rows)
+        for i in range(rows - self._rows):
+            self._index.setdefault(data[i * KEY_SIZE:(i + 1) * KEY_SIZE], self._rows + i)
+
+        self._rows = rows
+        # Gelesene Dateigröße merken, nicht rows * KEY_SIZE: nach einem abgebrochenen
+        # Schreibvorgang hat die Schlüsseldatei mehr Zeilen als die Matrix und
+        # get_many würde sonst bei jedem Aufruf neu einlesen
+        self._keys_size = keys_size
+        self._vectors = (
+            np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dim))
+            if rows > 0 else None
+        )
+
+class QueryEmbeddingCache:
+    def __init__(self,
+                 max_entries: int = 1024,
+                 disk_cache: Optional[EmbeddingCache] = None):
+        """
+        LRU-Cache für Query-Embeddings mit optionaler Festplattenstufe
+
+        Args:
+            max_entries: Anzahl der Queries im Arbeitsspeicher
+            disk_cache: Optional - gemeinsamer EmbeddingCache für mehrere Prozesse
+        """
+        self.memory = MemoryCache(max_entries=max_entries)
+        self.disk_cache = disk_cache
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Vereinheitlicht Unicode-Form und Leerzeichen (Groß-/Kleinschreibung bleibt erhalten)"""
+        return ' '.join(unicodedata.normalize('NFC', query).split())
+
+    def get_or_compute(self,
+                       query: str,
+                       compute: Callable[[str], np.ndarray]) -> np.ndarray:
+        """Liefert das Embedding einer Query aus dem Cache oder berechnet es"""
+        key = self.normalize_query(query)
+
+        embedding = self.memory.get(key)
+        if embedding is not None:
+            return embedding
+
+        if self.disk_cache is not None:
+            found, _ = self.disk_cache.get_many([key])
+            embedding = found[0]
+
+        if embedding is None:
+            embedding = np.asarray(compute(key), dtype=np.float32)
+            if self.disk_cache is not None:
+                self.disk_cache.put_many([key], embedding[np.newaxis, :])
+
+        self.memory.put(key, embedding)
+        return embedding
+
+    def get_or_compute_many(self,
+                            queries: Sequence[str],
+                            compute_many: Callable[[List[str]], np.ndarray]) -> List[np.ndarray]:
+        """Wie get_or_compute, berechnet aber alle Fehlzugriffe in einem Modelldurchlauf"""
+        keys = [self.normalize_query(query) for query in queries]
+        embeddings: List[Optional[np.ndarray]] = [self.memory.get(key) for key in keys]
+
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing and self.disk_cache is not None:
+            found, _ = self.disk_cache.get_many([keys[i] for i in missing])
+            for i, embedding in zip(missing, found):
+                embeddings[i] = embedding
+            missing = [i for i in missing if embeddings[i] is None]
+
+        if missing:
+            # Doppelte Queries im selben Batch nur einmal berechnen
+            unique_keys = list(dict.fromkeys(keys[i] for i in missing))
+            computed = np.asarray(compute_many(unique_keys), dtype=np.float32)
+            if self.disk_cache is not None:
+                self.disk_cache.put_many(unique_keys, computed)
+            by_key = dict(zip(unique_keys, computed))
+            for i in missing:
+                embeddings[i] = by_key[keys[i]]
+
+        for key, embedding in zip(keys, embeddings):
+            self.memory.put(key, embedding)
+        return embeddings
+
+    def info(self) -> Dict:
+        """Statistiken beider Cache-Stufen"""
+        info = {"memory": self.memory.info()}
+        if self.disk_cache is not None:
+            info["disk"] = {"entries": len(self.disk_cache), **self.disk_cache.stats.to_dict()}
+        return info
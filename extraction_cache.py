@@ -0,0 +1,126 @@
+from typing import List, Optional
+from dataclasses import dataclass
+from pathlib import Path
+import hashlib
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+
+@dataclass
+class CachedExtraction:
+    """Im Cache abgelegter Extraktionsstand einer PDF"""
+    content_hash: str
+    pages: List[str]
+    page_count: int
+
+def hash_file(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """Berechnet den SHA-256-Hash einer Datei blockweise"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 max_bytes: Optional[int] = None):
+        """
+        Inhaltsadressierter Festplatten-Cache für extrahierte PDF-Seiten
+
+        Schlüssel ist der SHA-256-Hash der PDF-Bytes plus das Extraktions-
+        Backend (PyPDF2 und PyMuPDF liefern unterschiedlichen Text). Die
+        Einträge liegen als gzip-komprimiertes JSON im Cache-Verzeichnis;
+        bei Überschreiten von max_bytes werden die am längsten nicht
+        genutzten Einträge gelöscht.
+
+        Args:
+            cache_dir: Cache-Verzeichnis (Standard: EXTRACTION_CACHE_DIR)
+            max_bytes: Maximale Gesamtgröße (Standard: EXTRACTION_CACHE_MAX_BYTES)
+        """
+        self.logger = logging.getLogger(__name__)
+
+        if cache_dir is None:
+            default_dir = '/tmp/extraction_cache' if os.environ.get('VERCEL_ENV') else 'extraction_cache'
+            cache_dir = os.environ.get('EXTRACTION_CACHE_DIR', default_dir)
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('EXTRACTION_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _entry_path(self, content_hash: str, backend: str) -> Path:
+        return self.cache_dir / f"{content_hash}.{backend}.json.gz"
+
+    def get(self, content_hash: str, backend: str) -> Optional[CachedExtraction]:
+        """Liefert die gespeicherten Seiten oder None, wenn kein Eintrag existiert"""
+        path = self._entry_path(content_hash, backend)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"Defekter Cache-Eintrag {path.name} wird verworfen: {str(e)}")
+            path.unlink(missing_ok=True)
+            return None
+
+        # Zugriffszeit aktualisieren (Grundlage der LRU-Verdrängung)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.logger.info(f"Extraktions-Cache-Treffer für {content_hash[:12]} ({backend})")
+        return CachedExtraction(
+            content_hash=content_hash,
+            pages=data['pages'],
+            page_count=data['page_count']
+        )
+
+    def put(self, content_hash: str, backend: str, pages: List[str]) -> None:
+        """Speichert die Seitentexte atomar und verdrängt bei Bedarf alte Einträge"""
+        path = self._entry_path(content_hash, backend)
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as f:
+                json.dump({'page_count': len(pages), 'pages': pages}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.logger.warning(f"Cache-Eintrag konnte nicht geschrieben werden: {str(e)}")
+            if tmp_path:
+                Path(tmp_path).unlink(missing_ok=True)
+            return
+
+        self._evict()
+
+    def _evict(self) -> None:
+        """Löscht die ältesten Einträge, bis die Gesamtgröße unter max_bytes liegt"""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in self.cache_dir.glob('*.json.gz'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            for _, size, entry in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                entry.unlink(missing_ok=True)
+                total -= size
+                self.logger.debug(f"Cache-Eintrag verdrängt: {entry.name}")
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+try:
+    import fcntl  # Dateisperre für mehrere Prozesse (nicht unter Windows verfügbar)
+except ImportError:
+    fcntl = None
+
+class FileLock:
+    """Exklusive Sperre über eine Lock-Datei für Schreibvorgänge mehrerer Prozesse"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._file = open(self.path, 'a')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        return False
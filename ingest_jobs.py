@@ -0,0 +1,294 @@
+from typing import Callable, Dict, List, Optional
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from pathlib import Path
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import uuid
+
+# Gewichtung der Phasen für Fortschritt und Restzeit
+STAGE_WEIGHTS = {"extracting": 0.3, "embedding": 0.65, "storing": 0.05}
+
+@dataclass
+class IngestJob:
+    """Zustand eines Import-Auftrags"""
+    id: str
+    filename: str
+    file_path: str
+    status: str  # queued, running, done, failed
+    content_hash: Optional[str] = None
+    worker_id: Optional[str] = None
+    stage: Optional[str] = None
+    pages_total: int = 0
+    pages_done: int = 0
+    chunks_total: int = 0
+    chunks_embedded: int = 0
+    error: Optional[str] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+    @property
+    def progress(self) -> float:
+        """Geschätzter Fortschritt zwischen 0 und 1"""
+        if self.status == "done":
+            return 1.0
+        if self.status != "running" or self.stage is None:
+            return 0.0
+
+        done = 0.0
+        for stage, weight in STAGE_WEIGHTS.items():
+            if stage == self.stage:
+                if stage == "extracting" and self.pages_total:
+                    done += weight * self.pages_done / self.pages_total
+                elif stage == "embedding" and self.chunks_total:
+                    done += weight * self.chunks_embedded / self.chunks_total
+                break
+            done += weight
+        return min(done, 1.0)
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Geschätzte Restzeit auf Basis der bisherigen Laufzeit"""
+        progress = self.progress
+        if self.status != "running" or not self.started_at or progress <= 0:
+            return None
+        elapsed = (datetime.now() - datetime.fromisoformat(self.started_at)).total_seconds()
+        return elapsed * (1 - progress) / progress
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data.pop("file_path")
+        data.pop("content_hash")
+        data.pop("worker_id")
+        data["progress"] = round(self.progress, 3)
+        data["eta_seconds"] = round(self.eta_seconds, 1) if self.eta_seconds is not None else None
+        return data
+
+class JobStore:
+    def __init__(self, db_path: str = "ingest_jobs.db", lease_timeout: float = 120.0):
+        """
+        Persistente Warteschlange für Import-Aufträge (SQLite)
+
+        Laufende Aufträge gehören dem Prozess, der sie übernommen hat
+        (worker_id); dessen Worker erneuern updated_at regelmäßig. Aufträge,
+        deren letztes Lebenszeichen älter als lease_timeout ist (Prozess
+        abgestürzt oder beendet), werden wieder eingereiht - Aufträge
+        anderer laufender Prozesse bleiben unberührt.
+
+        Args:
+            db_path: Pfad zur SQLite-Datenbank
+            lease_timeout: Sekunden ohne Lebenszeichen, nach denen ein laufender
+                Auftrag als verwaist gilt
+        """
+        self.logger = logging.getLogger(__name__)
+        self.lease_timeout = lease_timeout
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                content_hash TEXT,
+                worker_id TEXT,
+                stage TEXT,
+                pages_total INTEGER DEFAULT 0,
+                pages_done INTEGER DEFAULT 0,
+                chunks_total INTEGER DEFAULT 0,
+                chunks_embedded INTEGER DEFAULT 0,
+                error TEXT,
+                created_at TEXT,
+                started_at TEXT,
+                updated_at TEXT,
+                finished_at TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "content_hash" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN content_hash TEXT")
+        if "worker_id" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN worker_id TEXT")
+
+        with self._lock:
+            self._requeue_stale()
+
+    def _requeue_stale(self) -> int:
+        """Reiht laufende Aufträge ohne aktuelles Lebenszeichen wieder ein (Aufrufer hält _lock)"""
+        cutoff = (datetime.now() - timedelta(seconds=self.lease_timeout)).isoformat()
+        requeued = self._conn.execute(
+            "UPDATE jobs SET status = 'queued', stage = NULL, worker_id = NULL "
+            "WHERE status = 'running' AND updated_at < ?",
+            (cutoff,)
+        ).rowcount
+        if requeued:
+            self.logger.info(f"{requeued} unterbrochene Import-Aufträge wieder eingereiht")
+        return requeued
+
+    def create(self, filename: str, file_path: str, content_hash: Optional[str] = None) -> IngestJob:
+        """Reiht einen neuen Auftrag ein (content_hash: bereits beim Upload berechneter SHA-256)"""
+        now = datetime.now().isoformat()
+        job = IngestJob(
+            id=uuid.uuid4().hex,
+            filename=filename,
+            file_path=file_path,
+            status="queued",
+            content_hash=content_hash,
+            created_at=now,
+            updated_at=now
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, filename, file_path, status, content_hash, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.filename, job.file_path, job.status, job.content_hash, job.created_at, job.updated_at)
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return IngestJob(**dict(row)) if row else None
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def claim_next(self) -> Optional[IngestJob]:
+        """Übernimmt den ältesten wartenden Auftrag (atomar, auch über Prozesse hinweg)"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_stale()
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker_id = ?, started_at = ?, updated_at = ? WHERE id = ?",
+                        (self.worker_id, now, now, row["id"])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row else None
+
+    def heartbeat(self) -> None:
+        """Erneuert das Lebenszeichen aller laufenden Aufträge dieses Prozesses"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE status = 'running' AND worker_id = ?",
+                (datetime.now().isoformat(), self.worker_id)
+            )
+
+    def update(self, job_id: str, **fields) -> None:
+        """Aktualisiert Phase und Zähler eines Auftrags (nur als dessen aktueller Besitzer)"""
+        fields["updated_at"] = datetime.now().isoformat()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ? AND worker_id = ?",
+                (*fields.values(), job_id, self.worker_id)
+            )
+
+    def finish(self, job_id: str, error: Optional[str] = None) -> None:
+        """Markiert einen Auftrag als abgeschlossen oder fehlgeschlagen"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            # Nur der aktuelle Besitzer schließt ab (ein verwaister Auftrag kann neu vergeben sein)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = NULL, error = ?, finished_at = ?, updated_at = ? "
+                "WHERE id = ? AND worker_id = ?",
+                ("failed" if error else "done", error, now, now, job_id, self.worker_id)
+            )
+
+class IngestWorkerPool:
+    def __init__(self,
+                 job_store: JobStore,
+                 process: Callable[[IngestJob, Callable], Optional[str]],
+                 workers: int = 1,
+                 poll_interval: float = 2.0):
+        """
+        Worker-Threads, die Aufträge aus dem JobStore abarbeiten
+
+        Args:
+            job_store: Persistente Warteschlange
+            process: Funktion (Auftrag, Fortschritts-Callback) -> Fehlermeldung oder None
+            workers: Anzahl der Worker-Threads
+            poll_interval: Sekunden zwischen Abfragen, wenn die Warteschlange leer ist
+        """
+        self.logger = logging.getLogger(__name__)
+        self.job_store = job_store
+        self.process = process
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=self._run, name=f"ingest-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        if workers:
+            self._threads.append(threading.Thread(target=self._heartbeat, name="ingest-heartbeat", daemon=True))
+
+    def start(self) -> None:
+        for thread in self._threads:
+            thread.start()
+
+    def notify(self) -> None:
+        """Weckt wartende Worker nach dem Einreihen eines Auftrags"""
+        self._wakeup.set()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _heartbeat(self) -> None:
+        """Hält die Aufträge dieses Prozesses gegenüber anderen Prozessen am Leben"""
+        interval = self.job_store.lease_timeout / 4
+        while not self._stopped.wait(interval):
+            try:
+                self.job_store.heartbeat()
+            except Exception as e:
+                self.logger.error(f"Lebenszeichen der Import-Aufträge fehlgeschlagen: {str(e)}")
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            # Vor der Abfrage zurücksetzen: ein notify() währenddessen weckt das nächste wait()
+            self._wakeup.clear()
+            try:
+                job = self.job_store.claim_next()
+            except Exception as e:
+                self.logger.error(f"Auftrag konnte nicht übernommen werden: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                continue
+
+            self.logger.info(f"Starte Import-Auftrag {job.id} ({job.filename})")
+
+            def report(stage: str, **counts) -> None:
+                self.job_store.update(job.id, stage=stage, **counts)
+
+            try:
+                error = self.process(job, report)
+            except Exception as e:
+                self.logger.error(f"Import-Auftrag {job.id} abgebrochen: {str(e)}")
+                error = f"Interner Fehler: {str(e)}"
+
+            self.job_store.finish(job.id, error)
+            self.logger.info(f"Import-Auftrag {job.id} {'fehlgeschlagen' if error else 'abgeschlossen'}")
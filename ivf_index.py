@@ -0,0 +1,148 @@
+from typing import List, Optional
+from pathlib import Path
+import os
+import tempfile
+
+import numpy as np
+
+# Zeilen pro Block bei Zuordnung und Training (begrenzt den Zwischenspeicher)
+BLOCK_ROWS = 16384
+# Trainingspunkte je Liste (k-means auf einer Stichprobe)
+TRAIN_SAMPLE_PER_LIST = 64
+
+def default_list_count(rows: int) -> int:
+    """Anzahl der Listen: etwa Wurzel der Zeilenzahl (Aufwand pro Anfrage wächst mit √N)"""
+    return int(min(max(np.sqrt(rows), 16), 65536))
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray, centroid_norms: np.ndarray) -> np.ndarray:
+    """Index des nächsten Zentroids je Zeile (quadrierte L2-Distanz, |x|² entfällt)"""
+    result = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+        scores = centroid_norms[None, :] - 2.0 * (block @ centroids.T)
+        result[start:start + len(block)] = np.argmin(scores, axis=1)
+    return result
+
+class IVFIndex:
+    """
+    Invertierte Dateiliste (IVF) für die approximative Nachbarsuche
+
+    Die Zeilen der Embedding-Matrix werden per k-means auf Listen verteilt;
+    eine Anfrage vergleicht sich mit allen Zentroiden und durchsucht nur die
+    nprobe nächsten Listen exakt. Die Listen sind als CSR-Struktur (Zeilen
+    nach Liste sortiert) abgelegt, neu hinzugefügte Zeilen liegen bis zum
+    nächsten Zusammenführen in einem kleinen Zusatzbereich.
+    """
+
+    def __init__(self, centroids: np.ndarray, assignments: Optional[np.ndarray] = None, trained_rows: int = 0):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        self.trained_rows = trained_rows
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self.rows = 0
+        self._indexed_rows = 0  # Zeilen in der CSR-Struktur, danach Zusatzbereich
+        self._order = np.zeros(0, dtype=np.int64)
+        self._starts = np.zeros(self.n_lists + 1, dtype=np.int64)
+        if assignments is not None:
+            self.add(np.asarray(assignments, dtype=np.int32))
+            self._rebuild_lists()
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def dim(self) -> int:
+        return self.centroids.shape[1]
+
+    @property
+    def assignments(self) -> np.ndarray:
+        return self._assignments[:self.rows]
+
+    @classmethod
+    def train(cls, sample: np.ndarray, n_lists: int, iterations: int = 10, seed: int = 0) -> "IVFIndex":
+        """k-means (Lloyd) auf einer Stichprobe der gespeicherten Embeddings (ohne Zuordnung)"""
+        sample = np.asarray(sample, dtype=np.float32)
+        n_lists = min(n_lists, len(sample))
+        rng = np.random.default_rng(seed)
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = _nearest(sample, centroids, np.einsum("ij,ij->i", centroids, centroids))
+            counts = np.bincount(labels, minlength=n_lists)
+            filled = counts > 0
+            # Summen je Liste über die nach Liste sortierte Stichprobe
+            order = np.argsort(labels, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            centroids[filled] = sums / counts[filled, None]
+            # Leere Listen mit zufälligen Punkten neu belegen
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+
+        return cls(centroids, trained_rows=len(sample))
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Ordnet Vektoren ihrer nächsten Liste zu"""
+        return _nearest(vectors, self.centroids, self.centroid_norms)
+
+    def add(self, list_ids: np.ndarray) -> None:
+        """Hängt die Listenzuordnung der nächsten Zeilen an (Zeilennummern fortlaufend)"""
+        needed = self.rows + len(list_ids)
+        if needed > len(self._assignments):
+            grown = np.zeros(max(needed, 2 * len(self._assignments), 1024), dtype=np.int32)
+            grown[:self.rows] = self._assignments[:self.rows]
+            self._assignments = grown
+        self._assignments[self.rows:needed] = list_ids
+        self.rows = needed
+
+    def _rebuild_lists(self) -> None:
+        assignments = self.assignments
+        self._order = np.argsort(assignments, kind="stable")
+        self._starts = np.zeros(self.n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=self.n_lists), out=self._starts[1:])
+        self._indexed_rows = self.rows
+
+    def probe(self, queries: np.ndarray, nprobe: int) -> np.ndarray:
+        """Die nprobe nächsten Listen je Anfrage (Form: Anfragen x nprobe)"""
+        nprobe = min(nprobe, self.n_lists)
+        scores = self.centroid_norms[None, :] - 2.0 * (queries @ self.centroids.T)
+        return np.argpartition(scores, nprobe - 1, axis=1)[:, :nprobe]
+
+    def candidates(self, list_ids: np.ndarray) -> np.ndarray:
+        """Aufsteigend sortierte Zeilen der angegebenen Listen"""
+        pending = self.rows - self._indexed_rows
+        if pending > max(BLOCK_ROWS, self._indexed_rows // 10):
+            self._rebuild_lists()
+            pending = 0
+
+        parts: List[np.ndarray] = [self._order[self._starts[i]:self._starts[i + 1]] for i in list_ids]
+        if pending:
+            tail = self._assignments[self._indexed_rows:self.rows]
+            parts.append(self._indexed_rows + np.flatnonzero(np.isin(tail, list_ids)))
+        rows = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        rows.sort()  # Zugriff auf die Matrix in Speicherreihenfolge
+        return rows
+
+    def save(self, path: Path) -> None:
+        """Speichert Zentroide und Zuordnung atomar"""
+        path = Path(path)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    centroids=self.centroids,
+                    assignments=self.assignments,
+                    trained_rows=np.int64(self.trained_rows)
+                )
+            os.replace(tmp_path, path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["assignments"], int(data["trained_rows"]))
@@ -0,0 +1,156 @@
+from typing import Any, Callable, Dict, Hashable, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+import threading
+import time
+import sys
+
+@dataclass
+class CacheStats:
+    """Zähler für Treffer, Fehlzugriffe und Verdrängungen eines Caches"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hit_rate
+        }
+
+class MemoryCache:
+    def __init__(self,
+                 max_entries: Optional[int] = 128,
+                 max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None,
+                 size_of: Optional[Callable[[Any], int]] = None):
+        """
+        Threadsicherer In-Memory-Cache mit LRU-Verdrängung, optionaler TTL
+        und Größenabrechnung
+
+        Args:
+            max_entries: Maximale Anzahl an Einträgen (None = unbegrenzt)
+            max_bytes: Maximale Gesamtgröße aller Einträge (None = unbegrenzt)
+            ttl_seconds: Lebensdauer eines Eintrags seit dem letzten Schreiben
+            size_of: Funktion zur Größenbestimmung eines Werts in Bytes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.size_of = size_of or sys.getsizeof
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Liefert den Wert zu einem Schlüssel und markiert ihn als zuletzt benutzt"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return default
+
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """
+        Speichert einen Wert und verdrängt bei Bedarf die ältesten Einträge
+
+        Returns:
+            False, wenn der Wert allein bereits größer als max_bytes ist
+        """
+        size = self.size_of(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, expires_at)
+            self._total_bytes += size
+            self._evict()
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Entfernt einen Eintrag und gibt seinen Wert zurück"""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries[key][0]
+            self._remove(key)
+            return value
+
+    def clear(self) -> None:
+        """Leert den Cache (Statistiken bleiben erhalten)"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[2] is None or entry[2] > time.monotonic())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._total_bytes
+
+    def info(self) -> Dict:
+        """Liefert Füllstand und Statistiken des Caches"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                **self.stats.to_dict()
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._total_bytes -= size
+
+    def _evict(self) -> None:
+        """Entfernt abgelaufene und anschließend die am längsten unbenutzten Einträge"""
+        if self.ttl_seconds:
+            now = time.monotonic()
+            expired = [k for k, (_, _, exp) in self._entries.items() if exp is not None and exp <= now]
+            for key in expired:
+                self._remove(key)
+                self.stats.expirations += 1
+
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries) or
+            (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.stats.evictions += 1
@@ -0,0 +1,108 @@
+from typing import Callable, Dict, List, Sequence
+from concurrent.futures import Future
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+class MicroBatcher:
+    def __init__(self,
+                 encode_batch: Callable[[List[str]], Sequence[np.ndarray]],
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0,
+                 name: str = "query-batcher"):
+        """
+        Fasst gleichzeitige Einzelanfragen zu Batches für das Embedding-Modell zusammen
+
+        Ein Hintergrund-Thread sammelt eingehende Texte, bis max_batch_size
+        erreicht ist oder seit dem ersten wartenden Text max_wait_ms
+        vergangen sind, berechnet alle Embeddings in einem Modelldurchlauf
+        und verteilt die Ergebnisse an die wartenden Aufrufer.
+
+        Args:
+            encode_batch: Funktion, die eine Liste von Texten einbettet
+            max_batch_size: Maximale Anzahl Texte pro Modelldurchlauf
+            max_wait_ms: Maximale Wartezeit auf weitere Anfragen
+            name: Name des Hintergrund-Threads
+        """
+        self.logger = logging.getLogger(__name__)
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+
+        self._thread = threading.Thread(target=self._worker, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Reiht einen Text ein; das Future liefert sein Embedding"""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str) -> np.ndarray:
+        """Bettet einen Text ein (blockierend)"""
+        return self.submit(text).result()
+
+    async def encode_async(self, text: str) -> np.ndarray:
+        """Bettet einen Text ein, ohne die Event-Loop zu blockieren"""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000
+            }
+
+    def _collect(self) -> list:
+        """Wartet auf den ersten Text und sammelt bis zur Batchgröße oder Frist weitere"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Frist abgelaufen: nur noch bereits wartende Texte mitnehmen
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self) -> None:
+        while True:
+            batch = self._collect()
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = self.encode_batch(texts)
+                if len(embeddings) != len(texts):
+                    raise ValueError(f"{len(embeddings)} Embeddings für {len(texts)} Texte erhalten")
+                for (_, future), embedding in zip(batch, embeddings):
+                    if not future.done():  # abgebrochene Anfragen überspringen
+                        future.set_result(np.asarray(embedding, dtype=np.float32))
+            except Exception as e:
+                self.logger.error(f"Fehler beim Einbetten eines Batches ({len(texts)} Texte): {str(e)}")
+                # Jede noch offene Anfrage beenden, sonst wartet der Aufrufer ewig
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            with self._lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._largest_batch = max(self._largest_batch, len(batch))
@@ -0,0 +1,978 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from base_vector_store import BaseVectorStore, VectorStoreException
+from file_lock import FileLock
+from ivf_index import IVFIndex, TRAIN_SAMPLE_PER_LIST, default_list_count
+from projection import PCAProjection
+from quantization import CONVERT_BLOCK_ROWS, Int8Matrix, int8_row_dtype, quantization_mode, quantize_int8
+
+# Kompaktieren, sobald gelöschte Zeilen diesen Anteil (und die Mindestanzahl) übersteigen
+COMPACT_DEAD_RATIO = 0.25
+COMPACT_MIN_DEAD = 10000
+# ANN-Index neu trainieren, wenn der Bestand seit dem Training um diesen Faktor gewachsen ist
+ANN_RETRAIN_GROWTH = 4
+# Listenzuordnung neuer Zeilen spätestens nach so vielen Zeilen (oder 10 %) speichern
+ANN_SAVE_MIN_ROWS = 10000
+# Stichprobengröße für die PCA-Projektion
+PCA_SAMPLE_ROWS = 50000
+# Versuche eines Lesezugriffs, der mit dem Umschreiben des Index (neue Generation) zusammenfällt
+READ_ATTEMPTS = 5
+
+def _block_dot(matrix, index, queries: np.ndarray) -> np.ndarray:
+    """Skalarprodukte ausgewählter Zeilen (Slice oder Zeilenliste) mit allen Anfragen"""
+    if isinstance(matrix, Int8Matrix):
+        return matrix.dot(index, queries)
+    block = matrix[index]
+    if block.dtype == np.float32:
+        return block @ queries.T
+    # float16 in kleinen Blöcken umrechnen, die im CPU-Cache bleiben
+    result = np.empty((len(block), len(queries)), dtype=np.float32)
+    for start in range(0, len(block), CONVERT_BLOCK_ROWS):
+        part = block[start:start + CONVERT_BLOCK_ROWS]
+        result[start:start + len(part)] = part.astype(np.float32) @ queries.T
+    return result
+
+class NumpyVectorStore(BaseVectorStore):
+    def __init__(self,
+                 *args,
+                 dtype: Optional[str] = None,
+                 search_block_rows: int = 65536,
+                 ann_index: Optional[str] = None,
+                 nprobe: Optional[int] = None,
+                 ann_lists: Optional[int] = None,
+                 ann_min_rows: Optional[int] = None,
+                 quantization: Optional[str] = None,
+                 rescore_factor: Optional[int] = None,
+                 pca_dim: Optional[int] = None,
+                 pca_min_rows: Optional[int] = None,
+                 **kwargs):
+        """
+        In-Process-Vektorindex ohne externen Dienst
+
+        Die Embeddings liegen in einer zusammenhängenden, memory-mapped Matrix
+        (eine Zeile pro Chunk), daneben parallele Arrays für Gültigkeit,
+        quadrierte Normen und Dokument-Codes. Texte und Metadaten stehen in
+        einem Journal (JSON Lines), das nur für die Treffer gelesen wird.
+        Die Suche ist exakt: Matrix-Vektor-Produkt blockweise, Top-k über
+        argpartition, where-Filter als Zeilenmaske. Distanzen sind wie bei
+        Chroma quadrierte L2-Distanzen.
+
+        Schreibvorgänge hängen an Matrix und Journal an (Sperrdatei für
+        mehrere Prozesse); andere Prozesse übernehmen sie beim nächsten
+        Zugriff. Gelöschte Zeilen werden markiert und beim Kompaktieren in
+        eine neue Generation der Dateien entfernt.
+
+        Mit ann_index='ivf' wird ab ann_min_rows Chunks ein IVF-Index auf den
+        gespeicherten Embeddings trainiert (siehe ivf_index.py); ungefilterte
+        Suchen durchsuchen dann nur die nprobe nächsten Listen. Neue Chunks
+        werden ihrer Liste direkt zugeordnet, gelöschte über die Zeilenmaske
+        ausgeblendet. Zentroide und Zuordnung liegen neben der Matrix.
+
+        Mit quantization='int8' liegt zusätzlich eine int8-Kopie der Matrix
+        (ein Skalierungsfaktor pro Zeile, 4x kleiner als float32) vor, über
+        die die erste Suchstufe läuft. Die besten rescore_factor * k Kandidaten
+        werden anschließend mit den Originalvektoren (standardmäßig float16)
+        exakt neu bewertet; die Originale werden dabei nur für diese Zeilen
+        gelesen und müssen nicht im Arbeitsspeicher liegen.
+
+        Mit pca_dim wird ab pca_min_rows Chunks eine PCA-Projektion auf einer
+        Stichprobe der gespeicherten Embeddings angepasst und der Bestand in
+        eine neue Generation mit pca_dim Dimensionen umgeschrieben. Danach
+        werden neue Chunks und Suchanfragen mit derselben Projektion
+        abgebildet; sie liegt neben der Matrix. Ein Embedding-Cache behält
+        die vollen Embeddings.
+
+        Args:
+            dtype: 'float32' oder 'float16' (halber Speicher, blockweise Umrechnung
+                bei der Suche); Standard aus NUMPY_STORE_DTYPE, sonst float32
+                (float16 mit int8-Quantisierung)
+            search_block_rows: Zeilen pro Block bei der Suche (begrenzt den Zwischenspeicher)
+            ann_index: 'ivf' für approximative Suche, None/'none' für exakte Suche;
+                Standard aus ANN_INDEX
+            nprobe: Durchsuchte Listen pro Anfrage (Standard aus ANN_NPROBE, sonst 16);
+                mehr Listen erhöhen Recall und Latenz
+            ann_lists: Anzahl der IVF-Listen (Standard aus ANN_LISTS, sonst etwa √N)
+            ann_min_rows: Mindestanzahl Chunks für das Training (Standard aus
+                ANN_MIN_ROWS, sonst 100000); darunter bleibt die Suche exakt
+            quantization: 'int8' für die komprimierte erste Suchstufe, 'none' für
+                die Suche auf den Originalen; Standard aus NUMPY_STORE_QUANTIZATION
+            rescore_factor: Kandidaten je Ergebnis für die Neubewertung (Standard
+                aus RESCORE_FACTOR, sonst 4)
+            pca_dim: Zieldimension der PCA-Projektion (Standard aus EMBEDDING_PCA_DIM,
+                sonst keine Projektion); gilt nur, solange noch keine Projektion existiert
+            pca_min_rows: Mindestanzahl Chunks für das Anpassen der Projektion
+                (Standard aus PCA_MIN_ROWS, sonst 10000)
+            Weitere Parameter siehe BaseVectorStore
+        """
+        self.quantization = quantization_mode(quantization or os.environ.get("NUMPY_STORE_QUANTIZATION"))
+        self.rescore_factor = rescore_factor or int(os.environ.get("RESCORE_FACTOR", "4"))
+        self.pca_dim = pca_dim or int(os.environ.get("EMBEDDING_PCA_DIM", "0")) or None
+        self.pca_min_rows = pca_min_rows if pca_min_rows is not None else int(os.environ.get("PCA_MIN_ROWS", "10000"))
+        default_dtype = "float16" if self.quantization == "int8" else "float32"
+        self.dtype = np.dtype(dtype or os.environ.get("NUMPY_STORE_DTYPE", default_dtype))
+        if self.dtype not in (np.dtype(np.float32), np.dtype(np.float16)):
+            raise ValueError(f"Nicht unterstützter dtype '{self.dtype}' (erlaubt: float32, float16)")
+        self.search_block_rows = search_block_rows
+        self.ann_index = (ann_index or os.environ.get("ANN_INDEX", "none")).lower()
+        if self.ann_index not in ("ivf", "none"):
+            raise ValueError(f"Unbekannter ANN-Index '{self.ann_index}' (erlaubt: ivf, none)")
+        self.nprobe = nprobe or int(os.environ.get("ANN_NPROBE", "16"))
+        self.ann_lists = ann_lists or int(os.environ.get("ANN_LISTS", "0")) or None
+        self.ann_min_rows = ann_min_rows if ann_min_rows is not None else int(os.environ.get("ANN_MIN_ROWS", "100000"))
+        self._lock = threading.RLock()
+        super().__init__(*args, **kwargs)
+
+    # Dateien und Zustand
+
+    def _open_storage(self) -> bool:
+        self._manifest_path = self.persist_directory / f"{self.collection_name}_numpy.json"
+        self._lock_path = self.persist_directory / f"{self.collection_name}_numpy.lock"
+        self._reset_state()
+
+        with FileLock(self._lock_path):
+            created = not self._manifest_path.exists()
+            if created:
+                self._write_generation(1, None, [])
+                self.logger.info(f"Neuer NumPy-Index '{self.collection_name}' erstellt")
+
+        self._refresh()
+        if not created:
+            self.logger.info(f"NumPy-Index '{self.collection_name}' geladen ({len(self._row_of)} Chunks)")
+            if self._projection is not None and self.pca_dim and self._projection.output_dim != self.pca_dim:
+                self.logger.warning(
+                    f"NumPy-Index ist auf {self._projection.output_dim} Dimensionen projiziert, "
+                    f"pca_dim={self.pca_dim} wird ignoriert"
+                )
+            # Bestehender Index ohne Projektion oder (aktuellen) ANN-Index: jetzt nachholen
+            if self._projection_needed() or (self.ann_index == "ivf" and self._ann_needs_training()):
+                with self._lock, FileLock(self._lock_path):
+                    self._refresh()
+                    self._maintain_projection()
+                    self._maintain_ann()
+        return created
+
+    def _vectors_path(self, generation: int) -> Path:
+        return self.persist_directory / f"{self.collection_name}_{generation}.vectors"
+
+    def _journal_path(self, generation: int) -> Path:
+        return self.persist_directory / f"{self.collection_name}_{generation}.jsonl"
+
+    def _codes_path(self, generation: int) -> Path:
+        return self.persist_directory / f"{self.collection_name}_{generation}.codes"
+
+    def _projection_path(self, generation: int) -> Path:
+        return self.persist_directory / f"{self.collection_name}_{generation}.pca.npz"
+
+    def _ann_path(self, generation: int) -> Path:
+        return self.persist_directory / f"{self.collection_name}_{generation}.ivf.npz"
+
+    def _reset_state(self) -> None:
+        self._generation: Optional[int] = None
+        self._manifest_state = None
+        self._dim: Optional[int] = None
+        self._journal_offset = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._codes: Optional[Int8Matrix] = None
+        self._projection: Optional[PCAProjection] = None
+        self._ids: List[Optional[str]] = []
+        self._row_of: Dict[str, int] = {}
+        self._doc_code_of: Dict[str, int] = {}
+        self._dead = 0
+        # Parallele Arrays je Zeile (Kapazität wächst durch Verdoppeln)
+        self._alive = np.zeros(0, dtype=bool)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._doc_codes = np.zeros(0, dtype=np.int32)
+        self._offsets = np.zeros(0, dtype=np.int64)  # Position des aktuellen Journal-Eintrags
+        self._lengths = np.zeros(0, dtype=np.int32)
+        self._normed_rows = 0
+        self._ann: Optional[IVFIndex] = None
+        self._ann_state = None
+        self._ann_saved_rows = 0
+
+    def _write_manifest(self, generation: int, dim: Optional[int]) -> None:
+        """Schreibt das Manifest atomar; es bestimmt die gültige Generation der Dateien"""
+        data = {"generation": generation, "dim": dim, "dtype": self.dtype.name, "quantization": self.quantization}
+        fd, tmp_path = tempfile.mkstemp(dir=self.persist_directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._manifest_path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def _write_generation(self,
+                          generation: int,
+                          dim: Optional[int],
+                          records: List[Dict],
+                          vector_blocks: Iterable[np.ndarray] = ()) -> None:
+        """Legt Matrix (ggf. mit int8-Codes) und Journal einer neuen Generation an und schaltet das Manifest um"""
+        with open(self._vectors_path(generation), "wb") as f:
+            for block in vector_blocks:
+                f.write(np.ascontiguousarray(block, dtype=self.dtype).tobytes())
+        if self.quantization == "int8":
+            self._write_codes(generation, dim)
+        with open(self._journal_path(generation), "wb") as f:
+            f.write(b"".join(self._encode_entry(record) for record in records))
+        self._write_manifest(generation, dim)
+
+    def _write_codes(self, generation: int, dim: Optional[int]) -> None:
+        """Quantisiert die Matrix einer Generation blockweise in die Code-Datei"""
+        with open(self._codes_path(generation), "wb") as f:
+            row_bytes = (dim or 0) * self.dtype.itemsize
+            rows = self._vectors_path(generation).stat().st_size // row_bytes if row_bytes else 0
+            if rows == 0:
+                return
+            vectors = np.memmap(self._vectors_path(generation), dtype=self.dtype, mode="r", shape=(rows, dim))
+            for start in range(0, rows, self.search_block_rows):
+                f.write(quantize_int8(vectors[start:start + self.search_block_rows]).tobytes())
+
+    @staticmethod
+    def _encode_entry(entry: Dict) -> bytes:
+        return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= len(self._alive):
+            return
+        capacity = max(rows, 2 * len(self._alive), 1024)
+        for name in ("_alive", "_sq_norms", "_doc_codes", "_offsets", "_lengths"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _refresh(self) -> None:
+        """Übernimmt Änderungen anderer Prozesse (neue Generation oder angehängte Journal-Einträge)"""
+        with self._lock:
+            try:
+                stat = self._manifest_path.stat()
+            except FileNotFoundError:
+                return
+
+            state = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            if state != self._manifest_state:
+                manifest = json.loads(self._manifest_path.read_text(encoding="utf-8"))
+                if manifest["generation"] != self._generation:
+                    self._reset_state()
+                    self._generation = manifest["generation"]
+                    # Die Projektion gehört fest zu einer Generation
+                    projection_path = self._projection_path(self._generation)
+                    if projection_path.exists():
+                        self._projection = PCAProjection.load(projection_path)
+                self._dim = manifest["dim"]
+                if np.dtype(manifest["dtype"]) != self.dtype:
+                    self.logger.warning(
+                        f"NumPy-Index ist als {manifest['dtype']} gespeichert, verwende {manifest['dtype']} statt {self.dtype.name}"
+                    )
+                    self.dtype = np.dtype(manifest["dtype"])
+                stored_quantization = manifest.get("quantization", "none")
+                if stored_quantization != self.quantization:
+                    self.logger.warning(
+                        f"NumPy-Index ist mit Quantisierung '{stored_quantization}' gespeichert, "
+                        f"verwende diese statt '{self.quantization}'"
+                    )
+                    self.quantization = stored_quantization
+                self._manifest_state = state
+
+            self._read_journal()
+            self._sync_ann()
+
+    def _read_journal(self) -> None:
+        path = self._journal_path(self._generation)
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size <= self._journal_offset:
+            return
+
+        with open(path, "rb") as f:
+            f.seek(self._journal_offset)
+            data = f.read(size - self._journal_offset)
+
+        # Nur vollständige Zeilen übernehmen (ein Schreiber kann gerade anhängen)
+        end = data.rfind(b"\n") + 1
+        position = 0
+        while position < end:
+            line_end = data.index(b"\n", position) + 1
+            line = data[position:line_end]
+            if line.strip():
+                self._apply(json.loads(line), self._journal_offset + position, len(line))
+            position = line_end
+        self._journal_offset += end
+        self._map_vectors()
+
+    def _apply(self, entry: Dict, offset: int, length: int) -> None:
+        """Wendet einen Journal-Eintrag auf den Speicherzustand an"""
+        op = entry["op"]
+        if op == "add":
+            row = entry["row"]
+            self._ensure_capacity(row + 1)
+            if row >= len(self._ids):
+                self._ids.extend([None] * (row + 1 - len(self._ids)))
+            name = entry["meta"]["document_name"]
+            code = self._doc_code_of.setdefault(name, len(self._doc_code_of))
+            self._ids[row] = entry["id"]
+            self._row_of[entry["id"]] = row
+            self._alive[row] = True
+            self._doc_codes[row] = code
+            self._offsets[row] = offset
+            self._lengths[row] = length
+        elif op == "set":
+            row = self._row_of.get(entry["id"])
+            if row is not None:
+                self._offsets[row] = offset
+                self._lengths[row] = length
+        elif op == "del":
+            row = self._row_of.pop(entry["id"], None)
+            if row is not None:
+                self._alive[row] = False
+                self._ids[row] = None
+                self._dead += 1
+
+    def _map_vectors(self) -> None:
+        """Blendet die Matrix bis zur letzten bekannten Zeile ein und berechnet neue Normen"""
+        rows = len(self._ids)
+        if rows == 0 or self._dim is None:
+            return
+        if self._vectors is None or len(self._vectors) < rows:
+            self._vectors = np.memmap(
+                self._vectors_path(self._generation), dtype=self.dtype, mode="r", shape=(rows, self._dim)
+            )
+        if self.quantization == "int8" and (self._codes is None or len(self._codes) < rows):
+            self._codes = Int8Matrix(np.memmap(
+                self._codes_path(self._generation), dtype=int8_row_dtype(self._dim), mode="r", shape=(rows,)
+            ))
+        for start in range(self._normed_rows, rows, self.search_block_rows):
+            end = min(start + self.search_block_rows, rows)
+            block = np.asarray(self._vectors[start:end], dtype=np.float32)
+            self._sq_norms[start:end] = np.einsum("ij,ij->i", block, block)
+        self._normed_rows = rows
+
+    def _read_records(self, rows: Iterable[int]) -> Dict[int, Dict]:
+        """Liest die Journal-Einträge (ID, Text, Metadaten) einzelner Zeilen"""
+        rows = sorted(set(int(row) for row in rows))
+        if not rows:
+            return {}
+        records = {}
+        with open(self._journal_path(self._generation), "rb") as f:
+            for row in rows:
+                f.seek(int(self._offsets[row]))
+                records[row] = json.loads(f.read(int(self._lengths[row])))
+        return records
+
+    def _read_current(self, select_rows: Callable[[], Iterable[int]]) -> Dict[int, Dict]:
+        """
+        Liest Journal-Einträge ohne Sperrdatei aus der aktuellen Generation
+
+        select_rows wird unter _lock nach dem Abgleich mit dem Manifest
+        aufgerufen. Hat ein anderer Prozess die Generation inzwischen ersetzt
+        und ihre Dateien gelöscht, wird auf der neuen Generation wiederholt.
+        """
+        for _ in range(READ_ATTEMPTS):
+            with self._lock:
+                self._refresh()
+                try:
+                    return self._read_records(select_rows())
+                except FileNotFoundError:
+                    self.logger.debug("Generation während des Lesens gewechselt, wiederhole")
+        raise VectorStoreException("Lesen wegen gleichzeitiger Umschreibungen des Index abgebrochen")
+
+    def _append(self, entries: List[Dict], vectors: Optional[np.ndarray] = None, first_row: int = 0) -> None:
+        """Hängt Zeilen an die Matrix und Einträge an das Journal an (Aufrufer hält beide Sperren)"""
+        if vectors is not None and len(vectors):
+            row_bytes = self._dim * self.dtype.itemsize
+            with open(self._vectors_path(self._generation), "r+b") as f:
+                # Reste eines abgebrochenen Schreibvorgangs hinter der letzten bekannten Zeile verwerfen
+                f.truncate(first_row * row_bytes)
+                f.seek(first_row * row_bytes)
+                f.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+            if self.quantization == "int8":
+                # Codes aus den gespeicherten Originalen (gleiche Rundung wie beim Kompaktieren)
+                codes = quantize_int8(np.asarray(vectors, dtype=self.dtype))
+                with open(self._codes_path(self._generation), "ab") as f:
+                    f.truncate(first_row * codes.dtype.itemsize)
+                    f.write(codes.tobytes())
+        with open(self._journal_path(self._generation), "ab") as f:
+            f.write(b"".join(self._encode_entry(entry) for entry in entries))
+        self._read_journal()
+
+    # ANN-Index
+
+    def _sync_ann(self) -> None:
+        """Lädt den gespeicherten IVF-Index (falls geändert) und ordnet neue Zeilen zu"""
+        if self.ann_index != "ivf" or self._generation is None:
+            return
+        path = self._ann_path(self._generation)
+        try:
+            stat = path.stat()
+            state = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except FileNotFoundError:
+            state = None
+
+        if state != self._ann_state:
+            self._ann = None
+            if state is not None:
+                ann = IVFIndex.load(path)
+                if ann.dim == self._dim:
+                    self._ann = ann
+                    self._ann_saved_rows = ann.rows
+                else:
+                    self.logger.warning("IVF-Index passt nicht zur Dimension des NumPy-Index, wird ignoriert")
+            self._ann_state = state
+
+        rows = len(self._ids)
+        if self._ann is not None and self._ann.rows < rows:
+            self._ann.add(self._ann.assign(self._vectors[self._ann.rows:rows]))
+
+    def _ann_needs_training(self) -> bool:
+        alive = len(self._row_of)
+        if alive < max(self.ann_min_rows, 1):
+            return False
+        return self._ann is None or alive > ANN_RETRAIN_GROWTH * self._ann.trained_rows
+
+    def _save_ann(self) -> None:
+        path = self._ann_path(self._generation)
+        self._ann.save(path)
+        stat = path.stat()
+        self._ann_state = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        self._ann_saved_rows = self._ann.rows
+
+    def _train_ann(self) -> None:
+        """Trainiert den IVF-Index auf einer Stichprobe und ordnet alle Zeilen zu (Aufrufer hält beide Sperren)"""
+        start = time.perf_counter()
+        alive_rows = np.flatnonzero(self._alive[:len(self._ids)])
+        n_lists = self.ann_lists or default_list_count(len(alive_rows))
+        sample_size = min(len(alive_rows), n_lists * TRAIN_SAMPLE_PER_LIST)
+        sample_rows = np.sort(np.random.default_rng(0).choice(alive_rows, sample_size, replace=False))
+
+        ann = IVFIndex.train(self._vectors[sample_rows], n_lists)
+        ann.trained_rows = len(alive_rows)
+        ann.add(ann.assign(self._vectors[:len(self._ids)]))
+        self._ann = ann
+        self._save_ann()
+        self.logger.info(
+            f"IVF-Index mit {ann.n_lists} Listen für {len(alive_rows)} Chunks trainiert "
+            f"({time.perf_counter() - start:.1f} s)"
+        )
+
+    def _maintain_ann(self) -> None:
+        """Trainiert bei Bedarf und speichert die Zuordnung neuer Zeilen (Aufrufer hält beide Sperren)"""
+        if self.ann_index != "ivf":
+            return
+        if self._ann_needs_training():
+            self._train_ann()
+        elif self._ann is not None and self._ann.rows - self._ann_saved_rows >= max(ANN_SAVE_MIN_ROWS, self._ann_saved_rows // 10):
+            self._save_ann()
+
+    def train_ann_index(self) -> None:
+        """Trainiert den IVF-Index neu (z. B. nach starken Änderungen am Bestand)"""
+        if self.ann_index != "ivf":
+            raise VectorStoreException("Kein ANN-Index konfiguriert (ann_index='ivf')")
+        with self._lock, FileLock(self._lock_path):
+            self._refresh()
+            if self._row_of:
+                self._train_ann()
+
+    # PCA-Projektion
+
+    def _projection_needed(self) -> bool:
+        return (
+            self.pca_dim is not None
+            and self._projection is None
+            and self._dim is not None
+            and self._dim > self.pca_dim
+            and len(self._row_of) >= max(self.pca_min_rows, 1)
+        )
+
+    def _fit_projection(self, target_dim: int) -> None:
+        """Passt die PCA auf einer Stichprobe an und schreibt den Bestand projiziert um (Aufrufer hält beide Sperren)"""
+        start = time.perf_counter()
+        projection = PCAProjection.fit(self.sample_embeddings(PCA_SAMPLE_ROWS), target_dim)
+        self._rewrite(projection)
+        self.logger.info(
+            f"PCA-Projektion {projection.input_dim} -> {projection.output_dim} Dimensionen für "
+            f"{len(self._row_of)} Chunks angewendet (erklärte Varianz {projection.explained_variance_ratio:.1%}, "
+            f"{time.perf_counter() - start:.1f} s)"
+        )
+
+    def _maintain_projection(self) -> None:
+        """Passt die Projektion an, sobald genug Chunks vorliegen (Aufrufer hält beide Sperren)"""
+        if self._projection_needed():
+            self._fit_projection(self.pca_dim)
+
+    def fit_projection(self, target_dim: Optional[int] = None) -> None:
+        """
+        Reduziert die gespeicherten Embeddings per PCA auf target_dim Dimensionen
+
+        Nur einmal möglich: die vollen Embeddings werden dabei ersetzt. Für eine
+        andere Zieldimension muss der Bestand neu eingelesen werden.
+        """
+        target_dim = target_dim or self.pca_dim
+        if not target_dim:
+            raise VectorStoreException("Keine Zieldimension für die PCA-Projektion angegeben")
+        with self._lock, FileLock(self._lock_path):
+            self._refresh()
+            if self._projection is not None:
+                raise VectorStoreException(
+                    f"Index ist bereits auf {self._projection.output_dim} Dimensionen projiziert"
+                )
+            if not self._row_of:
+                raise VectorStoreException("Keine Embeddings zum Anpassen der PCA-Projektion vorhanden")
+            self._fit_projection(target_dim)
+            self._maintain_ann()
+
+    # Speicherzugriffe
+
+    def _add_records(self,
+                     chunk_ids: List[str],
+                     embeddings: np.ndarray,
+                     texts: List[str],
+                     metadatas: List[Dict],
+                     added_ids: List[str]) -> None:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        with self._lock, FileLock(self._lock_path):
+            self._refresh()
+
+            if self._projection is not None:
+                if embeddings.shape[1] != self._projection.input_dim:
+                    raise VectorStoreException(
+                        f"Dimension der Embeddings ({embeddings.shape[1]}) passt nicht zur "
+                        f"PCA-Projektion ({self._projection.input_dim})"
+                    )
+                embeddings = self._projection.apply(embeddings)
+
+            if self._dim is None:
+                self._dim = int(embeddings.shape[1])
+                self._write_manifest(self._generation, self._dim)
+                self._manifest_state = None
+            elif embeddings.shape[1] != self._dim:
+                raise VectorStoreException(
+                    f"Dimension der Embeddings ({embeddings.shape[1]}) passt nicht zum Index ({self._dim})"
+                )
+
+            # Wie bei Chroma: vorhandene IDs werden nicht erneut eingefügt
+            keep = [i for i, chunk_id in enumerate(chunk_ids) if chunk_id not in self._row_of]
+            if len(keep) < len(chunk_ids):
+                self.logger.warning(f"{len(chunk_ids) - len(keep)} Chunks bereits vorhanden, übersprungen")
+            if not keep:
+                return
+
+            first_row = len(self._ids)
+            entries = [
+                {"op": "add", "row": first_row + n, "id": chunk_ids[i], "text": texts[i], "meta": metadatas[i]}
+                for n, i in enumerate(keep)
+            ]
+            self._append(entries, embeddings[keep], first_row)
+            added_ids.extend(chunk_ids[i] for i in keep)
+            self._maintain_projection()
+            self._maintain_ann()
+
+    def _update_metadatas(self, records: List[Tuple[str, Dict]]) -> None:
+        with self._lock, FileLock(self._lock_path):
+            self._refresh()
+            current = self._read_records(self._row_of[chunk_id] for chunk_id, _ in records if chunk_id in self._row_of)
+            entries = []
+            for chunk_id, metadata in records:
+                row = self._row_of.get(chunk_id)
+                if row is not None:
+                    entries.append({"op": "set", "id": chunk_id, "text": current[row]["text"], "meta": metadata})
+            if entries:
+                self._append(entries)
+
+    def _delete_ids(self, chunk_ids: List[str]) -> None:
+        with self._lock, FileLock(self._lock_path):
+            self._refresh()
+            entries = [{"op": "del", "id": chunk_id} for chunk_id in chunk_ids if chunk_id in self._row_of]
+            if entries:
+                self._append(entries)
+            if self._dead > max(COMPACT_MIN_DEAD, COMPACT_DEAD_RATIO * len(self._ids)):
+                self._compact()
+
+    def _compact(self) -> None:
+        """Entfernt gelöschte Zeilen (Aufrufer hält beide Sperren)"""
+        dead = self._dead
+        self._rewrite()
+        self.logger.info(f"NumPy-Index kompaktiert: {dead} gelöschte Zeilen entfernt")
+
+    def _rewrite(self, projection: Optional[PCAProjection] = None) -> None:
+        """
+        Schreibt die gültigen Zeilen in eine neue Generation (Aufrufer hält beide Sperren)
+
+        Mit projection werden die Vektoren dabei abgebildet; der IVF-Index wird
+        dann nicht übernommen, sondern neu trainiert.
+        """
+        rows = np.flatnonzero(self._alive[:len(self._ids)])
+        old_generation = self._generation
+        new_generation = old_generation + 1
+        records = self._read_records(rows)
+        entries = []
+        for new_row, row in enumerate(rows):
+            record = records[int(row)]
+            entries.append({"op": "add", "row": new_row, "id": record["id"], "text": record["text"], "meta": record["meta"]})
+
+        # Projektion und IVF-Zuordnung ablegen (vor dem Umschalten des Manifests)
+        dim = self._dim
+        if projection is not None:
+            projection.save(self._projection_path(new_generation))
+            dim = projection.output_dim
+        else:
+            if self._projection is not None:
+                self._projection.save(self._projection_path(new_generation))
+            ann = self._ann
+            if ann is None and self._ann_path(old_generation).exists():
+                # IVF-Index eines anderen Prozesses (hier nicht aktiviert) ebenfalls übernehmen
+                ann = IVFIndex.load(self._ann_path(old_generation))
+                if ann.rows < len(self._ids):
+                    ann.add(ann.assign(self._vectors[ann.rows:len(self._ids)]))
+            if ann is not None:
+                IVFIndex(ann.centroids, ann.assignments[rows], ann.trained_rows).save(self._ann_path(new_generation))
+
+        # Matrix blockweise umkopieren, damit nie der ganze Index im Speicher liegt
+        vector_blocks = (
+            self._vectors[rows[start:start + self.search_block_rows]]
+            for start in range(0, len(rows), self.search_block_rows)
+        )
+        if projection is not None:
+            vector_blocks = (projection.apply(block) for block in vector_blocks)
+        self._write_generation(new_generation, dim, entries, vector_blocks)
+
+        self._reset_state()
+        self._refresh()
+        self._delete_generation_files(old_generation)
+
+    def _delete_generation_files(self, generation: int) -> None:
+        for path in (self._vectors_path(generation), self._journal_path(generation), self._codes_path(generation),
+                     self._projection_path(generation), self._ann_path(generation)):
+            path.unlink(missing_ok=True)
+
+    def _document_rows(self, document_name: str) -> np.ndarray:
+        code = self._doc_code_of.get(document_name)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        rows = len(self._ids)
+        return np.flatnonzero((self._doc_codes[:rows] == code) & self._alive[:rows])
+
+    def _document_metadatas(self, document_name: str) -> Dict[str, Dict]:
+        records = self._read_current(lambda: self._document_rows(document_name))
+        return {record["id"]: record["meta"] for record in records.values()}
+
+    def _all_metadatas(self) -> List[Dict]:
+        records = self._read_current(lambda: np.flatnonzero(self._alive[:len(self._ids)]))
+        return [record["meta"] for record in records.values()]
+
+    def _delete_document_records(self, document_name: str) -> None:
+        self._refresh()
+        with self._lock:
+            chunk_ids = [self._ids[row] for row in self._document_rows(document_name)]
+        self._delete_ids(chunk_ids)
+
+    def _clear_records(self) -> None:
+        with self._lock, FileLock(self._lock_path):
+            self._refresh()
+            old_generation = self._generation
+            self._write_generation(old_generation + 1, None, [])
+            self._reset_state()
+            self._refresh()
+            self._delete_generation_files(old_generation)
+
+    # Suche und Abruf
+
+    def _where_mask(self, where: Dict, rows: int) -> np.ndarray:
+        """Zeilenmaske für Chroma-kompatible Filter ($eq, $in, $and; Dokumentname über Codes)"""
+        mask = np.ones(rows, dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for part in condition:
+                    mask &= self._where_mask(part, rows)
+                continue
+
+            if isinstance(condition, dict):
+                if "$eq" in condition:
+                    values = [condition["$eq"]]
+                elif "$in" in condition:
+                    values = list(condition["$in"])
+                else:
+                    raise VectorStoreException(f"Filter {condition} wird vom NumPy-Backend nicht unterstützt")
+            else:
+                values = [condition]
+
+            if key == "document_name":
+                codes = [self._doc_code_of[value] for value in values if value in self._doc_code_of]
+                mask &= np.isin(self._doc_codes[:rows], codes)
+            else:
+                # Andere Felder stehen nur im Journal (langsamer Pfad)
+                candidates = np.flatnonzero(mask & self._alive[:rows])
+                records = self._read_records(candidates)
+                field_mask = np.zeros(rows, dtype=bool)
+                for row, record in records.items():
+                    field_mask[row] = record["meta"].get(key) in values
+                mask &= field_mask
+        return mask
+
+    def _exact_hits(self,
+                    queries: np.ndarray,
+                    q_norms: np.ndarray,
+                    vectors: np.ndarray,
+                    sq_norms: np.ndarray,
+                    mask: np.ndarray,
+                    k: int) -> List[List[Tuple[int, float]]]:
+        """Top-k über alle Zeilen der Maske (exakt bezogen auf die übergebene Matrix)"""
+        rows = len(mask)
+        best_distances = []
+        best_rows = []
+        if mask.sum() < rows // 4:
+            # Stark gefiltert: nur die passenden Zeilen einlesen
+            selected = np.flatnonzero(mask)
+            blocks = [(selected, None)]
+        else:
+            blocks = [
+                (None, (start, min(start + self.search_block_rows, rows)))
+                for start in range(0, rows, self.search_block_rows)
+            ]
+
+        for selected, bounds in blocks:
+            if selected is not None:
+                dots = _block_dot(vectors, selected, queries)
+                block_norms = sq_norms[selected]
+                block_mask = None
+                row_ids = selected
+            else:
+                start, end = bounds
+                block_mask = mask[start:end]
+                if not block_mask.any():
+                    continue
+                dots = _block_dot(vectors, slice(start, end), queries)
+                block_norms = sq_norms[start:end]
+                row_ids = np.arange(start, end)
+
+            # Quadrierte L2-Distanz: |d|² + |q|² - 2 d·q
+            distances = block_norms[:, None] + q_norms[None, :] - 2.0 * dots
+            if block_mask is not None:
+                distances[~block_mask] = np.inf
+
+            block_k = min(k, len(row_ids))
+            top = np.argpartition(distances, block_k - 1, axis=0)[:block_k]
+            best_distances.append(np.take_along_axis(distances, top, axis=0))
+            best_rows.append(row_ids[top])
+
+        distances = np.concatenate(best_distances)
+        result_rows = np.concatenate(best_rows)
+        order = np.argsort(distances, axis=0, kind="stable")[:k]
+
+        return [
+            [(int(result_rows[j, q]), float(distances[j, q])) for j in order[:, q] if np.isfinite(distances[j, q])]
+            for q in range(len(queries))
+        ]
+
+    def _ann_hits(self,
+                  ann: IVFIndex,
+                  queries: np.ndarray,
+                  q_norms: np.ndarray,
+                  vectors: np.ndarray,
+                  sq_norms: np.ndarray,
+                  mask: np.ndarray,
+                  k: int,
+                  required: int) -> List[Optional[List[Tuple[int, float]]]]:
+        """Top-k über die nprobe nächsten IVF-Listen (None, falls dort weniger als required Treffer liegen)"""
+        rows = len(mask)
+        with self._lock:
+            probes = ann.probe(queries, self.nprobe)
+            candidate_rows = [ann.candidates(lists) for lists in probes]
+
+        hits = []
+        for q, candidates in enumerate(candidate_rows):
+            candidates = candidates[candidates < rows]
+            candidates = candidates[mask[candidates]]
+            if len(candidates) < required:
+                hits.append(None)
+                continue
+            dots = _block_dot(vectors, candidates, queries[q:q + 1])[:, 0]
+            distances = sq_norms[candidates] + q_norms[q] - 2.0 * dots
+            top_k = min(k, len(candidates))
+            top = np.argpartition(distances, top_k - 1)[:top_k]
+            top = top[np.argsort(distances[top], kind="stable")]
+            hits.append([(int(candidates[j]), float(distances[j])) for j in top])
+        return hits
+
+    def _rescore(self,
+                 hits: List[List[Tuple[int, float]]],
+                 queries: np.ndarray,
+                 q_norms: np.ndarray,
+                 vectors: np.ndarray,
+                 sq_norms: np.ndarray,
+                 k: int) -> List[List[Tuple[int, float]]]:
+        """Bewertet die Kandidaten der ersten Stufe mit den Originalvektoren neu"""
+        rescored = []
+        for q, query_hits in enumerate(hits):
+            rows = np.array(sorted(row for row, _ in query_hits), dtype=np.int64)
+            if len(rows) == 0:
+                rescored.append([])
+                continue
+            dots = _block_dot(vectors, rows, queries[q:q + 1])[:, 0]
+            distances = sq_norms[rows] + q_norms[q] - 2.0 * dots
+            order = np.argsort(distances, kind="stable")[:k]
+            rescored.append([(int(rows[j]), float(distances[j])) for j in order])
+        return rescored
+
+    def _score(self, queries: np.ndarray, n_results: int, where: Optional[Dict]) -> Tuple[Optional[int], List[List[Tuple[int, float]]]]:
+        """Zeilen und Distanzen der Treffer je Anfrage samt der Generation, auf die sich die Zeilen beziehen"""
+        self._refresh()
+        with self._lock:
+            generation = self._generation
+            rows = len(self._ids)
+            vectors = self._vectors
+            codes = self._codes
+            projection = self._projection
+            sq_norms = self._sq_norms[:rows]
+            mask = self._alive[:rows].copy()
+            if where and rows:
+                mask &= self._where_mask(where, rows)
+            ann = self._ann
+
+        candidates = int(mask.sum())
+        if candidates == 0:
+            return generation, [[] for _ in queries]
+        if projection is not None and queries.shape[1] == projection.input_dim:
+            queries = projection.apply(queries)
+        k = min(n_results, candidates)
+        q_norms = np.einsum("ij,ij->i", queries, queries)
+
+        # Erste Stufe über die int8-Codes mit mehr Kandidaten, danach Neubewertung
+        if codes is not None:
+            first_stage, first_k = codes, min(candidates, k * self.rescore_factor)
+        else:
+            first_stage, first_k = vectors, k
+
+        # IVF nur ohne starke Filter; stark gefilterte Suchen sind exakt ohnehin schnell
+        if ann is not None and candidates >= rows // 4:
+            hits = self._ann_hits(ann, queries, q_norms, first_stage, sq_norms, mask, first_k, k)
+            missing = [q for q, query_hits in enumerate(hits) if query_hits is None]
+            if missing:
+                exact = self._exact_hits(queries[missing], q_norms[missing], first_stage, sq_norms, mask, first_k)
+                for q, query_hits in zip(missing, exact):
+                    hits[q] = query_hits
+        else:
+            hits = self._exact_hits(queries, q_norms, first_stage, sq_norms, mask, first_k)
+
+        if codes is not None:
+            hits = self._rescore(hits, queries, q_norms, vectors, sq_norms, k)
+        return generation, hits
+
+    def search_many_by_vector(self,
+                              query_embeddings: List[np.ndarray],
+                              n_results: int = 3,
+                              where: Optional[Dict] = None) -> List[List[Dict]]:
+        try:
+            queries = np.asarray(np.stack([np.asarray(e, dtype=np.float32) for e in query_embeddings]))
+
+            # Die Zeilennummern gelten nur innerhalb ihrer Generation: hat ein
+            # Kompaktieren oder Leeren während der Bewertung eine neue Generation
+            # geschrieben, wird die Suche auf der neuen wiederholt
+            for _ in range(READ_ATTEMPTS):
+                try:
+                    generation, hits = self._score(queries, n_results, where)
+                    with self._lock:
+                        self._refresh()
+                        if self._generation == generation:
+                            records = self._read_records(row for query_hits in hits for row, _ in query_hits)
+                            break
+                except FileNotFoundError:
+                    pass  # Generation von einem anderen Prozess bereits ersetzt
+                self.logger.debug("Generation während der Suche gewechselt, wiederhole Suche")
+            else:
+                raise VectorStoreException("Suche wegen gleichzeitiger Umschreibungen des Index abgebrochen")
+
+            return [[{
+                'id': records[row]['id'],
+                'text': records[row]['text'],
+                'metadata': records[row]['meta'],
+                'distance': max(distance, 0.0)
+            } for row, distance in query_hits] for query_hits in hits]
+
+        except VectorStoreException:
+            raise
+        except Exception as e:
+            self.logger.error(f"Fehler bei der Suche: {str(e)}")
+            raise VectorStoreException(f"Suchfehler: {str(e)}")
+
+    def get_chunk_texts(self, chunk_ids: List[str]) -> Dict[str, str]:
+        """Holt die Texte mehrerer Chunks in einem Aufruf (ID -> Text)"""
+        try:
+            records = self._read_current(
+                lambda: [self._row_of[chunk_id] for chunk_id in dict.fromkeys(chunk_ids) if chunk_id in self._row_of]
+            )
+            return {record['id']: record['text'] for record in records.values()}
+
+        except Exception as e:
+            self.logger.error(f"Fehler beim Abrufen der Chunks: {str(e)}")
+            raise VectorStoreException(f"Fehler beim Abrufen der Chunks: {str(e)}")
+
+    def get_document_chunks(self, document_name: str) -> List[Dict]:
+        """Holt alle Chunks eines bestimmten Dokuments (nach Chunk-Nummer sortiert)"""
+        try:
+            records = self._read_current(lambda: self._document_rows(document_name))
+            chunks = [{
+                'id': record['id'],
+                'text': record['text'],
+                'metadata': record['meta']
+            } for record in records.values()]
+            chunks.sort(key=lambda x: x['metadata']['chunk_number'])
+            return chunks
+
+        except Exception as e:
+            self.logger.error(f"Fehler beim Abrufen der Dokument-Chunks: {str(e)}")
+            raise VectorStoreException(f"Fehler beim Abrufen der Chunks: {str(e)}")
+
+    def sample_embeddings(self, max_rows: Optional[int] = None, seed: int = 0) -> np.ndarray:
+        """Gespeicherte Embeddings (alle oder eine Zufallsstichprobe von max_rows) als float32-Matrix"""
+        self._refresh()
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:len(self._ids)])
+            if max_rows is not None and len(rows) > max_rows:
+                rows = np.sort(np.random.default_rng(seed).choice(rows, max_rows, replace=False))
+            if len(rows) == 0:
+                return np.zeros((0, self._dim or 0), dtype=np.float32)
+            return np.asarray(self._vectors[rows], dtype=np.float32)
+
+    def stats(self) -> Dict:
+        """Zeilen, gelöschte Zeilen, Größe der Matrix, Projektion und Zustand des ANN-Index"""
+        self._refresh()
+        with self._lock:
+            rows = len(self._ids)
+            projection = None
+            if self._projection is not None:
+                projection = {
+                    "input_dim": self._projection.input_dim,
+                    "output_dim": self._projection.output_dim,
+                    "explained_variance": self._projection.explained_variance_ratio
+                }
+            ann = None
+            if self._ann is not None:
+                ann = {
+                    "type": "ivf",
+                    "lists": self._ann.n_lists,
+                    "nprobe": self.nprobe,
+                    "trained_rows": self._ann.trained_rows
+                }
+            return {
+                "chunks": len(self._row_of),
+                "rows": rows,
+                "deleted_rows": self._dead,
+                "dim": self._dim,
+                "dtype": self.dtype.name,
+                "matrix_bytes": rows * (self._dim or 0) * self.dtype.itemsize,
+                "quantization": self.quantization,
+                "codes_bytes": self._codes.nbytes if self._codes is not None else 0,
+                "projection": projection,
+                "ann": ann
+            }
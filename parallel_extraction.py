@@ -0,0 +1,96 @@
+from typing import Any, Callable, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_PAGES = 50  # Unterhalb dieser Seitenzahl lohnt sich der Prozessstart nicht
+
+def resolve_worker_count(max_workers: Optional[int] = None) -> int:
+    """Bestimmt die Anzahl der Worker-Prozesse (Standard: alle CPU-Kerne)"""
+    if max_workers is None or max_workers <= 0:
+        return os.cpu_count() or 1
+    return max_workers
+
+def split_page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """
+    Teilt die Seiten 0..page_count in zusammenhängende, etwa gleich große Bereiche
+
+    Returns:
+        Liste von (start, end)-Tupeln (end exklusiv) in Seitenreihenfolge
+    """
+    parts = max(1, min(parts, page_count))
+    base, remainder = divmod(page_count, parts)
+
+    ranges = []
+    start = 0
+    for i in range(parts):
+        end = start + base + (1 if i < remainder else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+def extract_pages_parallel(pdf_path: str,
+                           page_count: int,
+                           range_function: Callable[..., List[Any]],
+                           *args,
+                           max_workers: Optional[int] = None,
+                           min_pages: int = DEFAULT_MIN_PAGES,
+                           on_progress: Optional[Callable[[int], None]] = None) -> List[Any]:
+    """
+    Verarbeitet die Seiten einer PDF in Seitenbereichen auf mehreren Prozessen
+
+    Jeder Worker öffnet die Datei selbst und ruft
+    range_function(pdf_path, start, end, *args) auf; die Teilergebnisse
+    werden in Seitenreihenfolge zusammengeführt. Kleine Dokumente und
+    max_workers=1 werden seriell im aktuellen Prozess verarbeitet.
+
+    Args:
+        pdf_path: Pfad zur PDF-Datei
+        page_count: Anzahl der Seiten
+        range_function: Modulweite (picklebare) Funktion, die eine Liste pro Bereich liefert
+        max_workers: Anzahl der Prozesse (None = alle CPU-Kerne)
+        min_pages: Mindestseitenzahl für die parallele Verarbeitung
+        on_progress: Optional - wird nach jedem Bereich mit der Zahl fertiger Seiten aufgerufen
+    """
+    workers = min(resolve_worker_count(max_workers), page_count)
+
+    def extract_serial() -> List[Any]:
+        results = range_function(pdf_path, 0, page_count, *args)
+        if on_progress:
+            on_progress(page_count)
+        return results
+
+    if workers <= 1 or page_count < min_pages:
+        return extract_serial()
+
+    # Mehr Bereiche als Worker, damit ungleich aufwändige Seiten besser verteilt werden
+    ranges = split_page_ranges(page_count, workers * 4)
+    logger.info(f"Verarbeite {page_count} Seiten in {len(ranges)} Bereichen auf {workers} Prozessen")
+
+    # Ohne Prozesse (z.B. Serverless ohne /dev/shm oder Semaphoren) seriell weiterarbeiten
+    executor = None
+    try:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = [
+            executor.submit(range_function, pdf_path, start, end, *args)
+            for start, end in ranges
+        ]
+    except (OSError, NotImplementedError, BrokenProcessPool) as e:
+        logger.warning(f"Prozesspool nicht verfügbar, verarbeite seriell: {str(e)}")
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return extract_serial()
+
+    results = []
+    pages_done = 0
+    with executor:
+        for (start, end), future in zip(ranges, futures):
+            results.extend(future.result())
+            pages_done += end - start
+            if on_progress:
+                on_progress(pages_done)
+    return results
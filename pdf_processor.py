@@ -1,34 +1,27 @@
-from typing import List, Dict, Optional, Tuple, Union
+from typing import Callable, List, Dict, Optional, Tuple, Union
 import fitz  # PyMuPDF
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from pathlib import Path
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import re
-from nltk.tokenize import sent_tokenize
-import nltk
 import unicodedata
-import torch
-from tqdm import tqdm
-from vector_store import VectorStore
-from search_result import SearchResult, SearchResultFormatter
+from base_vector_store import VectorStoreException, create_vector_store
+from search_result import BatchSearchResult, SearchResult, SearchResultFormatter
 from input_validation import InputValidator, ValidationResult
+from memory_cache import MemoryCache
+from embedding_cache import EmbeddingCache
+from embedding_backends import get_encoder
+from extraction_cache import ExtractionCache, hash_file
+from parallel_extraction import DEFAULT_MIN_PAGES, extract_pages_parallel
+from text_resources import sent_tokenize  # NLTK punkt erst beim ersten Aufruf
 import contextlib
 from functools import wraps
+import json
+import os
 import time
 
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-@dataclass
-class ExtractedText:
-    content: List[str]
-    page_count: int
-    success: bool
-    error_message: Optional[str] = None
+EXTRACTION_BACKEND = 'pymupdf'  # Schlüsselteil im Extraktions-Cache
 
 @dataclass
 class TextChunk:
@@ -38,6 +31,15 @@ class TextChunk:
     token_count: int
     embedding: Optional[np.ndarray] = None
 
+@dataclass
+class ExtractedText:
+    content: List[str]
+    page_count: int
+    success: bool
+    error_message: Optional[str] = None
+    chunks: List[TextChunk] = field(default_factory=list)
+    content_hash: Optional[str] = None
+
 # Benutzerdefinierte Ausnahmen
 class PDFProcessingError(Exception):
     """Basisklasse für PDF-Verarbeitungsfehler"""
@@ -75,47 +77,12 @@ def retry_on_error(max_attempts: int = 3, delay: float = 1.0):
         return wrapper
     return decorator
 
-class PDFSearchEngine:
-    def __init__(self,
-                 model_name: str = 'paraphrase-multilingual-mpnet-base-v2',  # Besseres Modell für mehrsprachige Dokumente
-                 chunk_size: int = 512,
-                 chunk_overlap: int = 50,
-                 min_chunk_size: int = 100,
-                 batch_size: int = 32,
-                 persist_directory: str = "chroma_db"):
-        self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.INFO)
-        
-        self.validator = InputValidator()
-        
-        # Initialisierung des Modells mit verbesserten Einstellungen
-        try:
-            self.model = SentenceTransformer(model_name)
-            self.model.max_seq_length = 512  # Optimale Länge für die meisten Transformers
-            
-            # GPU-Beschleunigung wenn verfügbar
-            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-            self.model.to(self.device)
-            
-            self.batch_size = batch_size
-            self.logger.info(f"Modell '{model_name}' geladen auf {self.device}")
-            
-        except Exception as e:
-            self.logger.error(f"Fehler beim Laden des Modells: {str(e)}")
-            raise
-            
-        self.documents: Dict[str, List[TextChunk]] = {}
-        self.embeddings: Dict[str, np.ndarray] = {}
-        self.chunk_size = chunk_size
-        self.chunk_overlap = chunk_overlap
-        self.min_chunk_size = min_chunk_size
-        
-        # Vektordatenbank initialisieren
-        self.vector_store = VectorStore(
-            persist_directory=persist_directory,
-            embedding_model_name=model_name
-        )
-        self.result_formatter = SearchResultFormatter()
+@dataclass
+class PageChunker:
+    """Seitenweises Chunking ohne Modellabhängigkeit (picklebar für Worker-Prozesse)"""
+    chunk_size: int = 512
+    chunk_overlap: int = 50
+    min_chunk_size: int = 100
 
     def estimate_tokens(self, text: str) -> int:
         """Schätzt die Anzahl der Tokens in einem Text"""
@@ -219,8 +186,137 @@ class PDFSearchEngine:
         
         return chunks
 
-    def extract_text_from_pdf(self, pdf_path: str) -> ExtractedText:
-        """Extrahiert Text aus einer PDF-Datei mit verbessertem Chunking"""
+def extract_chunks_from_range(pdf_path: str,
+                              start: int,
+                              end: int,
+                              chunker: PageChunker) -> List[Tuple[int, str, List[TextChunk]]]:
+    """
+    Extrahiert und chunkt die Seiten start..end-1 einer PDF (läuft auch in Worker-Prozessen)
+    
+    Returns:
+        Liste von (Seitennummer, Seitentext, Chunks) in Seitenreihenfolge;
+        Seitentext None kennzeichnet eine Seite, deren Extraktion fehlschlug
+    """
+    logger = logging.getLogger(__name__)
+    pages = []
+    
+    with contextlib.closing(fitz.open(pdf_path)) as doc:
+        for page_index in range(start, end):
+            page_num = page_index + 1
+            try:
+                text = doc[page_index].get_text()
+                # Text in Chunks aufteilen
+                page_chunks = chunker.create_chunks(text, page_num)
+                pages.append((page_num, text, page_chunks))
+                
+                if page_chunks:
+                    logger.debug(
+                        f"Seite {page_num}: {len(page_chunks)} Chunks erstellt "
+                        f"(durchschnittlich {sum(c.token_count for c in page_chunks)/len(page_chunks):.0f} Tokens)"
+                    )
+                
+            except Exception as e:
+                logger.warning(f"Fehler beim Verarbeiten von Seite {page_num}: {str(e)}")
+                pages.append((page_num, None, []))
+    
+    return pages
+
+class PDFSearchEngine:
+    def __init__(self,
+                 model_name: str = 'paraphrase-multilingual-mpnet-base-v2',  # Besseres Modell für mehrsprachige Dokumente
+                 chunk_size: int = 512,
+                 chunk_overlap: int = 50,
+                 min_chunk_size: int = 100,
+                 batch_size: int = 32,
+                 persist_directory: str = "chroma_db",
+                 extraction_workers: Optional[int] = None,
+                 parallel_min_pages: int = DEFAULT_MIN_PAGES,
+                 extraction_cache: Optional[ExtractionCache] = None,
+                 embedding_cache_dir: Optional[str] = "embedding_cache",
+                 query_cache_dir: Optional[str] = None,
+                 result_cache_size: int = 256,
+                 query_batch_size: int = 32,
+                 query_batch_wait_ms: float = 5.0,
+                 embedding_backend: Optional[str] = None,
+                 vector_store_backend: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.INFO)
+        
+        self.validator = InputValidator()
+        
+        # Embedding-Backend: 'torch' (Standard), 'onnx' oder 'onnx-int8' (ONNX Runtime auf der CPU)
+        self.embedding_backend = embedding_backend or os.environ.get('EMBEDDING_BACKEND', 'torch')
+        
+        # Geteiltes Modell aus der prozessweiten Registry (wird erst beim ersten Einbetten geladen,
+        # max_seq_length 512, GPU wenn verfügbar); dieselbe Instanz bettet auch die Queries ein
+        self.encoder = get_encoder(model_name, self.embedding_backend)
+        self.batch_size = batch_size
+        
+        # Quantisierte Backends liefern leicht abweichende Vektoren und bekommen eigene Cache-Einträge
+        encoder_id = model_name if self.embedding_backend == 'torch' else f"{model_name}@{self.embedding_backend}"
+            
+        # Persistenter Embedding-Cache (None = deaktiviert)
+        self.embedding_cache = (
+            EmbeddingCache(embedding_cache_dir, encoder_id, normalize=True)
+            if embedding_cache_dir else None
+        )
+            
+        self.documents: Dict[str, List[TextChunk]] = {}
+        self.embeddings: Dict[str, np.ndarray] = {}
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.min_chunk_size = min_chunk_size
+        self.chunker = PageChunker(chunk_size, chunk_overlap, min_chunk_size)
+        
+        # Parallele Extraktion: None = alle CPU-Kerne, 1 = seriell
+        self.extraction_workers = extraction_workers
+        self.parallel_min_pages = parallel_min_pages
+        
+        # Inhaltsadressierter Cache: identische PDF-Bytes werden nicht erneut geparst
+        self.extraction_cache = extraction_cache or ExtractionCache()
+        
+        # Vektordatenbank initialisieren ('chroma' oder 'numpy', Standard: VECTOR_STORE_BACKEND oder chroma)
+        self.vector_store = create_vector_store(
+            vector_store_backend,
+            persist_directory=persist_directory,
+            embedding_function_name=encoder_id,
+            embedding_function=self.encoder.encode,
+            query_cache_dir=query_cache_dir,
+            query_batch_size=query_batch_size,
+            query_batch_wait_ms=query_batch_wait_ms
+        )
+        self.result_formatter = SearchResultFormatter()
+        
+        # Ergebnis-Cache, gültig bis sich der Index ändert (Versionszähler des VectorStores)
+        self.result_cache = MemoryCache(max_entries=result_cache_size)
+        self._result_cache_version = self.vector_store.version
+
+    def estimate_tokens(self, text: str) -> int:
+        """Schätzt die Anzahl der Tokens in einem Text"""
+        return self.chunker.estimate_tokens(text)
+    
+    def clean_text(self, text: str) -> str:
+        """Bereinigt den Text von unerwünschten Zeichen und Formatierungen"""
+        return self.chunker.clean_text(text)
+    
+    def create_chunks(self, text: str, page_num: int) -> List[TextChunk]:
+        """
+        Teilt Text in semantisch sinnvolle Chunks unter Berücksichtigung von Satzgrenzen
+        """
+        return self.chunker.create_chunks(text, page_num)
+
+    def extract_text_from_pdf(self,
+                              pdf_path: str,
+                              content_hash: Optional[str] = None,
+                              progress: Optional[Callable[..., None]] = None) -> ExtractedText:
+        """
+        Extrahiert Text aus einer PDF-Datei mit verbessertem Chunking
+        
+        Args:
+            pdf_path: Pfad zur PDF-Datei
+            content_hash: Optional - bereits bekannter SHA-256 der Datei
+            progress: Optional - Callback progress(stage, **zähler) für Fortschrittsmeldungen
+        """
         try:
             path = Path(pdf_path)
             if not path.exists():
@@ -229,36 +325,61 @@ class PDFSearchEngine:
             if not path.suffix.lower() == '.pdf':
                 raise PDFExtractionError(f"Datei ist keine PDF: {pdf_path}")
             
-            doc = fitz.open(pdf_path)
-            all_chunks = []
+            # Extraktions-Cache vor jedem Parsen prüfen
+            content_hash = content_hash or hash_file(pdf_path)
+            cached = self.extraction_cache.get(content_hash, EXTRACTION_BACKEND)
             
-            for page_num, page in enumerate(doc, 1):
-                try:
-                    text = page.get_text()
-                    # Text in Chunks aufteilen
-                    page_chunks = self.create_chunks(text, page_num)
-                    all_chunks.extend(page_chunks)
-                    
-                    self.logger.debug(
-                        f"Seite {page_num}: {len(page_chunks)} Chunks erstellt "
-                        f"(durchschnittlich {sum(c.token_count for c in page_chunks)/len(page_chunks):.0f} Tokens)"
+            if cached:
+                page_count = cached.page_count
+                if progress:
+                    progress("extracting", pages_total=page_count, pages_done=page_count)
+                all_chunks = [
+                    chunk
+                    for page_num, text in enumerate(cached.pages, 1)
+                    for chunk in self.create_chunks(text, page_num)
+                ]
+            else:
+                with contextlib.closing(fitz.open(pdf_path)) as doc:
+                    page_count = len(doc)
+                
+                if progress:
+                    progress("extracting", pages_total=page_count, pages_done=0)
+                
+                # Seitenbereiche auf mehrere Prozesse verteilen (kleine Dokumente seriell)
+                pages = extract_pages_parallel(
+                    pdf_path,
+                    page_count,
+                    extract_chunks_from_range,
+                    self.chunker,
+                    max_workers=self.extraction_workers,
+                    min_pages=self.parallel_min_pages,
+                    on_progress=(lambda done: progress("extracting", pages_done=done)) if progress else None
+                )
+                all_chunks = [chunk for _, _, page_chunks in pages for chunk in page_chunks]
+                # Mit fehlgeschlagenen Seiten nicht cachen, sonst blieben sie dauerhaft leer
+                failed_pages = [page_num for page_num, text, _ in pages if text is None]
+                if failed_pages:
+                    self.logger.warning(
+                        f"{len(failed_pages)} Seiten von {path.name} nicht extrahiert, Ergebnis wird nicht gecacht"
                     )
-                    
-                except Exception as e:
-                    self.logger.warning(f"Fehler beim Verarbeiten von Seite {page_num}: {str(e)}")
+                else:
+                    self.extraction_cache.put(content_hash, EXTRACTION_BACKEND, [text for _, text, _ in pages])
             
             if not all_chunks:
                 return ExtractedText(
                     content=[],
-                    page_count=len(doc),
+                    page_count=page_count,
                     success=False,
-                    error_message="Keine verwertbaren Textinhalte gefunden"
+                    error_message="Keine verwertbaren Textinhalte gefunden",
+                    content_hash=content_hash
                 )
             
             return ExtractedText(
                 content=[chunk.text for chunk in all_chunks],
-                page_count=len(doc),
-                success=True
+                page_count=page_count,
+                success=True,
+                chunks=all_chunks,
+                content_hash=content_hash
             )
             
         except FileNotFoundError as e:
@@ -280,25 +401,55 @@ class PDFSearchEngine:
                 error_message=f"Fehler bei der Textextraktion: {str(e)}"
             )
 
-    def generate_embeddings(self, chunks: List[TextChunk]) -> np.ndarray:
+    def generate_embeddings(self,
+                            chunks: List[TextChunk],
+                            progress: Optional[Callable[..., None]] = None) -> np.ndarray:
         """
         Generiert Einbettungen für eine Liste von TextChunks mit Batch-Verarbeitung
-        und Fortschrittsanzeige
+        und Fortschrittsanzeige (bereits berechnete Chunks kommen aus dem Embedding-Cache)
         """
         texts = [chunk.text for chunk in chunks]
         self.logger.info(f"Generiere Einbettungen für {len(texts)} Chunks...")
         
         try:
-            # Aktiviere den Evaluierungsmodus für bessere Performance
-            self.model.eval()
-            with torch.no_grad():
-                embeddings = self.model.encode(
-                    texts,
-                    batch_size=self.batch_size,
-                    show_progress_bar=True,
-                    convert_to_numpy=True,
-                    normalize_embeddings=True  # Normalisierung für effizientere Ähnlichkeitsberechnung
-                )
+            # Nur Cache-Fehlzugriffe an das Modell senden
+            if self.embedding_cache is not None:
+                found, missing = self.embedding_cache.get_many(texts)
+            else:
+                found, missing = [None] * len(texts), list(range(len(texts)))
+            
+            if progress:
+                progress("embedding", chunks_total=len(texts), chunks_embedded=len(texts) - len(missing))
+            
+            if missing:
+                missing_texts = [texts[i] for i in missing]
+                
+                # Mit Fortschritts-Callback in Abschnitten einbetten, damit Zwischenstände gemeldet werden
+                step = self.batch_size * 8 if progress else len(missing_texts)
+                parts = []
+                
+                for start in range(0, len(missing_texts), step):
+                    parts.append(self.encoder.encode(
+                        missing_texts[start:start + step],
+                        batch_size=self.batch_size,
+                        show_progress_bar=progress is None,
+                        normalize_embeddings=True  # Normalisierung für effizientere Ähnlichkeitsberechnung
+                    ))
+                    if progress:
+                        progress("embedding", chunks_embedded=len(texts) - len(missing) + start + len(parts[-1]))
+                new_embeddings = np.concatenate(parts)
+                
+                if self.embedding_cache is not None:
+                    self.embedding_cache.put_many(missing_texts, new_embeddings)
+                
+                for i, embedding in zip(missing, new_embeddings):
+                    found[i] = embedding
+            
+            embeddings = np.stack(found).astype(np.float32)
+            self.logger.info(
+                f"Embedding-Cache: {len(texts) - len(missing)} Treffer, "
+                f"{len(missing)} neu berechnet"
+            )
             
             # Speichere Einbettungen in den Chunks
             for chunk, embedding in zip(chunks, embeddings):
@@ -311,36 +462,52 @@ class PDFSearchEngine:
             raise
 
     @retry_on_error(max_attempts=3)
-    def load_pdf(self, pdf_path: str) -> Tuple[bool, Optional[str]]:
-        """PDF-Datei laden mit erweiterter Fehlerbehandlung"""
+    def load_pdf(self,
+                 pdf_path: str,
+                 content_hash: Optional[str] = None,
+                 progress: Optional[Callable[..., None]] = None,
+                 document_name: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """
+        PDF-Datei laden mit erweiterter Fehlerbehandlung
+        
+        Args:
+            pdf_path: Pfad zur PDF-Datei
+            content_hash: Optional - bereits bekannter SHA-256 der Datei
+            progress: Optional - Callback progress(stage, **zähler) mit den Phasen
+                      extracting (pages_total, pages_done), embedding (chunks_total,
+                      chunks_embedded) und storing
+            document_name: Optional - Name des Dokuments in der Datenbank (Standard: Dateiname)
+        """
         try:
             # Eingabevalidierung
             validation = self.validator.validate_pdf_file(pdf_path)
             if not validation.is_valid:
                 return False, validation.error_message
             
-            # PDF verarbeiten mit Ressourcenverwaltung
-            with contextlib.closing(fitz.open(pdf_path)) as doc:
-                extracted = self.extract_text_from_pdf(doc)
-                
-                if not extracted.success:
-                    return False, extracted.error_message
-                
-                path = Path(pdf_path)
-                chunks = self.create_chunks(extracted.content, path.name)
-                
-                if not chunks:
-                    return False, "Keine verwertbaren Textabschnitte gefunden"
-                
-                # Chunks zur Vektordatenbank hinzufügen
-                try:
-                    self._add_chunks_to_db(chunks, path.name)
-                except DatabaseError as e:
-                    return False, f"Datenbankfehler: {str(e)}"
-                
-                # Erfolgsprotokoll
-                self._log_success(path.name, extracted.page_count, len(chunks))
-                return True, None
+            # PDF extrahieren und chunken
+            extracted = self.extract_text_from_pdf(pdf_path, content_hash, progress)
+            
+            if not extracted.success:
+                return False, extracted.error_message
+            
+            path = Path(pdf_path)
+            document_name = document_name or path.name
+            chunks = extracted.chunks
+            
+            if not chunks:
+                return False, "Keine verwertbaren Textabschnitte gefunden"
+            
+            # Chunks abgleichen: nur neue Chunks werden eingebettet und eingefügt
+            try:
+                self._store_document(chunks, document_name, extracted, progress)
+            except DatabaseError as e:
+                return False, f"Datenbankfehler: {str(e)}"
+            
+            self.documents[document_name] = chunks
+            
+            # Erfolgsprotokoll
+            self._log_success(document_name, extracted.page_count, len(chunks))
+            return True, None
                 
         except PDFExtractionError as e:
             self.logger.error(f"Fehler bei der PDF-Extraktion: {str(e)}")
@@ -351,31 +518,39 @@ class PDFSearchEngine:
     
     def get_context(self, document: str, chunk_num: int) -> Optional[str]:
         """Holt Kontext aus benachbarten Chunks"""
+        metadata = {'document_name': document, 'chunk_number': chunk_num}
+        return self.get_contexts([metadata])[0]
+    
+    def get_contexts(self, metadatas: List[Dict]) -> List[Optional[str]]:
+        """
+        Holt den Kontext mehrerer Treffer mit einem einzigen Datenbankzugriff
+        
+        Die IDs der Nachbar-Chunks stehen in den Metadaten; alle werden
+        gemeinsam nachgeschlagen.
+        """
         try:
-            chunks = self.vector_store.get_document_chunks(document)
-            chunks.sort(key=lambda x: x['metadata']['chunk_num'])
-            
-            for i, chunk in enumerate(chunks):
-                if chunk['metadata']['chunk_num'] == chunk_num:
-                    context = []
-                    
-                    # Vorheriger Chunk
-                    if i > 0:
-                        prev_text = chunks[i-1]['text']
-                        context.append(prev_text[-100:])  # Letzten 100 Zeichen
-                    
-                    # Nächster Chunk
-                    if i < len(chunks) - 1:
-                        next_text = chunks[i+1]['text']
-                        context.append(next_text[:100])  # Ersten 100 Zeichen
-                    
-                    return " ... ".join(context) if context else None
-                    
-            return None
-            
+            neighbors = [self.vector_store.neighbor_ids(meta) for meta in metadatas]
+            texts = self.vector_store.get_chunk_texts(
+                [chunk_id for pair in neighbors for chunk_id in pair if chunk_id]
+            )
         except Exception as e:
             self.logger.warning(f"Kontext konnte nicht geladen werden: {str(e)}")
-            return None
+            return [None] * len(metadatas)
+        
+        contexts = []
+        for prev_id, next_id in neighbors:
+            context = []
+            
+            # Vorheriger Chunk
+            if prev_id in texts:
+                context.append(texts[prev_id][-100:])  # Letzten 100 Zeichen
+            
+            # Nächster Chunk
+            if next_id in texts:
+                context.append(texts[next_id][:100])  # Ersten 100 Zeichen
+            
+            contexts.append(" ... ".join(context) if context else None)
+        return contexts
 
     def search(self,
               query: str,
@@ -385,6 +560,12 @@ class PDFSearchEngine:
               format_output: bool = True) -> Union[str, List[SearchResult], Tuple[bool, str]]:
         """Semantische Suche mit erweiterter Fehlerbehandlung"""
         try:
+            # Ergebnis-Cache: gültig, solange sich der Index nicht geändert hat
+            cache_key = self._result_cache_key(query, top_k, min_score, filter_dict)
+            results = self.result_cache.get(cache_key)
+            if results is not None:
+                return self._finish_search(list(results), query, format_output)
+            
             # Eingabevalidierung
             query_validation = self.validator.validate_query(query)
             if not query_validation.is_valid:
@@ -400,63 +581,234 @@ class PDFSearchEngine:
             
             # Suche durchführen
             try:
-                raw_results = self.vector_store.similarity_search(
+                raw_results = self.vector_store.search(
                     query=query,
                     n_results=top_k,
-                    filter_dict=filter_dict
+                    where=filter_dict
                 )
-            except DatabaseError as e:
+            except VectorStoreException as e:
                 return False, f"Datenbankfehler bei der Suche: {str(e)}"
             
             # Ergebnisse verarbeiten
             results = self._process_search_results(raw_results, min_score)
+            self.result_cache.put(cache_key, tuple(results))
             
-            if not results:
-                return [], "Keine relevanten Ergebnisse gefunden"
-            
-            # Ausgabe formatieren
-            if format_output:
-                return self.result_formatter.format_results(results, query)
-            return results
+            return self._finish_search(results, query, format_output)
             
         except Exception as e:
             self.logger.error(f"Fehler bei der Suche: {str(e)}")
             return False, f"Interner Fehler bei der Suche: {str(e)}"
     
-    def _add_chunks_to_db(self, chunks: List[Dict], document_name: str) -> None:
-        """Fügt Chunks zur Datenbank hinzu mit Fehlerbehandlung"""
+    def search_batch(self, queries: List[Dict]) -> List[BatchSearchResult]:
+        """
+        Beantwortet mehrere Suchanfragen gemeinsam
+        
+        Alle nicht gecachten Queries werden in einem Modelldurchlauf
+        eingebettet; pro Filter wird eine einzige Datenbankabfrage mit allen
+        zugehörigen Query-Embeddings gestellt, und der Kontext aller Treffer
+        wird mit einem Zugriff geladen.
+        
+        Args:
+            queries: Liste von Dicts mit query, top_k, min_score und optional filter_dict
+        
+        Returns:
+            Ein BatchSearchResult pro Anfrage (gleiche Reihenfolge); Fehler
+            einzelner Anfragen stehen im Feld error. Die Ausführungszeit ist
+            der Anteil der Anfrage an den gemeinsamen Schritten, die Summe
+            ergibt die Laufzeit des Batches
+        """
+        def elapsed_ms(start: float) -> float:
+            return (time.perf_counter() - start) * 1000
+        
+        items: List[Optional[BatchSearchResult]] = [None] * len(queries)
+        pending = []  # (Index, Cache-Schlüssel)
+        
+        for i, q in enumerate(queries):
+            start = time.perf_counter()
+            query = q['query']
+            top_k = q.get('top_k', 3)
+            min_score = q.get('min_score', 0.3)
+            
+            # Eingabevalidierung
+            validation = self.validator.validate_query(query)
+            if validation.is_valid:
+                validation = self.validator.validate_search_params(top_k, min_score)
+            if not validation.is_valid:
+                items[i] = BatchSearchResult(query, [], elapsed_ms(start), validation.error_message)
+                continue
+            
+            cache_key = self._result_cache_key(query, top_k, min_score, q.get('filter_dict'))
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                items[i] = BatchSearchResult(query, list(cached), elapsed_ms(start))
+            else:
+                pending.append((i, cache_key))
+        
+        if pending:
+            # Zeit je Anfrage: gemeinsame Schritte (Einbettung, Nachbearbeitung)
+            # anteilig auf alle, jede Datenbankabfrage anteilig auf ihre Gruppe
+            query_ms = [0.0] * len(pending)
+            
+            def share(start: float, positions: List[int]) -> None:
+                part = elapsed_ms(start) / len(positions)
+                for p in positions:
+                    query_ms[p] += part
+            
+            everyone = list(range(len(pending)))
+            step_start = time.perf_counter()
+            try:
+                if not self.vector_store.has_documents():
+                    raise VectorStoreException("Keine Dokumente zum Durchsuchen verfügbar")
+                
+                embeddings = self.vector_store.embed_queries([queries[i]['query'] for i, _ in pending])
+                share(step_start, everyone)
+                
+                # Anfragen mit gleichem Filter teilen sich eine Datenbankabfrage
+                groups: Dict[Optional[str], List[int]] = {}
+                for position, (i, _) in enumerate(pending):
+                    filter_dict = queries[i].get('filter_dict')
+                    frozen_filter = json.dumps(filter_dict, sort_keys=True) if filter_dict else None
+                    groups.setdefault(frozen_filter, []).append(position)
+                
+                raw_results: List[List[Dict]] = [[] for _ in pending]
+                for positions in groups.values():
+                    step_start = time.perf_counter()
+                    first = queries[pending[positions[0]][0]]
+                    group_results = self.vector_store.search_many_by_vector(
+                        [embeddings[p] for p in positions],
+                        n_results=max(queries[pending[p][0]].get('top_k', 3) for p in positions),
+                        where=first.get('filter_dict')
+                    )
+                    for p, raw in zip(positions, group_results):
+                        raw_results[p] = raw[:queries[pending[p][0]].get('top_k', 3)]
+                    share(step_start, positions)
+                
+                step_start = time.perf_counter()
+                processed = self._process_search_results_many(
+                    raw_results,
+                    [queries[i].get('min_score', 0.3) for i, _ in pending]
+                )
+                share(step_start, everyone)
+                
+                for p, ((i, cache_key), results) in enumerate(zip(pending, processed)):
+                    self.result_cache.put(cache_key, tuple(results))
+                    items[i] = BatchSearchResult(queries[i]['query'], results, query_ms[p])
+                    
+            except Exception as e:
+                self.logger.error(f"Fehler bei der Batch-Suche: {str(e)}")
+                share(step_start, everyone)
+                for p, (i, _) in enumerate(pending):
+                    items[i] = BatchSearchResult(queries[i]['query'], [], query_ms[p], str(e))
+        
+        return items
+    
+    def _finish_search(self,
+                       results: List[SearchResult],
+                       query: str,
+                       format_output: bool) -> Union[str, List[SearchResult], Tuple[bool, str]]:
+        """Gemeinsamer Abschluss für frische und gecachte Suchergebnisse"""
+        if not results:
+            return [], "Keine relevanten Ergebnisse gefunden"
+        
+        # Ausgabe formatieren
+        if format_output:
+            return self.result_formatter.format_results(results, query)
+        return results
+    
+    def _result_cache_key(self,
+                          query: str,
+                          top_k: int,
+                          min_score: float,
+                          filter_dict: Optional[Dict]) -> Tuple:
+        """Cache-Schlüssel einer Suche; verwirft veraltete Einträge nach Indexänderungen"""
+        version = self.vector_store.version
+        if version != self._result_cache_version:
+            self.result_cache.clear()
+            self._result_cache_version = version
+        
+        frozen_filter = json.dumps(filter_dict, sort_keys=True) if filter_dict else None
+        return (query, top_k, min_score, frozen_filter, version)
+    
+    def cache_stats(self) -> Dict:
+        """Trefferquoten und Verdrängungen der Such-Caches"""
+        stats = {
+            "result_cache": self.result_cache.info(),
+            "query_embedding_cache": self.vector_store.query_cache.info()
+        }
+        if self.vector_store.query_batcher is not None:
+            stats["query_batching"] = self.vector_store.query_batcher.stats()
+        if self.embedding_cache is not None:
+            stats["embedding_cache"] = {
+                "entries": len(self.embedding_cache),
+                **self.embedding_cache.stats.to_dict()
+            }
+        return stats
+    
+    def _store_document(self,
+                        chunks: List[TextChunk],
+                        document_name: str,
+                        extracted: ExtractedText,
+                        progress: Optional[Callable[..., None]] = None) -> Dict[str, int]:
+        """
+        Speichert ein Dokument als Delta gegenüber der bereits gespeicherten Fassung
+        
+        Bei einer überarbeiteten PDF werden nur neue Chunks eingebettet und
+        eingefügt und verschwundene gelöscht (siehe VectorStore.update_document).
+        """
+        def embed(indices: List[int]) -> np.ndarray:
+            embeddings = self.generate_embeddings([chunks[i] for i in indices], progress)
+            if progress:
+                progress("storing")
+            return embeddings
+        
         try:
-            self.vector_store.add_chunks(chunks, document_name)
-        except Exception as e:
-            raise DatabaseError(f"Fehler beim Hinzufügen zur Datenbank: {str(e)}")
+            return self.vector_store.update_document(
+                document_name=document_name,
+                chunks=[chunk.text for chunk in chunks],
+                page_numbers=[chunk.page_num for chunk in chunks],
+                embed=embed,
+                page_count=extracted.page_count,
+                content_hash=extracted.content_hash
+            )
+        except VectorStoreException as e:
+            raise DatabaseError(str(e))
     
     def _process_search_results(self, 
                               raw_results: List[Dict],
                               min_score: float) -> List[SearchResult]:
         """Verarbeitet Suchergebnisse mit Fehlerbehandlung"""
-        results = []
-        for r in raw_results:
-            try:
-                score = 1 - (r['distance'] or 0)
-                if score >= min_score:
-                    context = self.get_context(
-                        r['metadata']['document'],
-                        r['metadata']['chunk_num']
-                    )
-                    
+        return self._process_search_results_many([raw_results], [min_score])[0]
+    
+    def _process_search_results_many(self,
+                                     raw_results: List[List[Dict]],
+                                     min_scores: List[float]) -> List[List[SearchResult]]:
+        """Verarbeitet die Ergebnisse mehrerer Anfragen; der Kontext aller Treffer wird gemeinsam geladen"""
+        hits = [
+            [r for r in raw if 1 - (r['distance'] or 0) >= min_score]
+            for raw, min_score in zip(raw_results, min_scores)
+        ]
+        contexts = iter(self.get_contexts([r['metadata'] for query_hits in hits for r in query_hits]))
+        
+        all_results = []
+        for query_hits in hits:
+            results = []
+            for r in query_hits:
+                context = next(contexts)
+                try:
                     results.append(SearchResult(
                         text=r['text'],
-                        document=r['metadata']['document'],
-                        page=r['metadata']['page'],
-                        chunk=r['metadata']['chunk_num'],
-                        score=score,
+                        document=r['metadata']['document_name'],
+                        page=r['metadata']['page_number'],
+                        chunk=r['metadata']['chunk_number'],
+                        score=1 - (r['distance'] or 0),
                         context=context
                     ))
-            except Exception as e:
-                self.logger.warning(f"Fehler bei der Verarbeitung eines Ergebnisses: {str(e)}")
-                continue
+                except Exception as e:
+                    self.logger.warning(f"Fehler bei der Verarbeitung eines Ergebnisses: {str(e)}")
+                    continue
+            all_results.append(results)
                 
-        return results
+        return all_results
 
     def _log_success(self, document_name: str, page_count: int, chunk_count: int) -> None:
         """Loggt Erfolgsmeldungen für die PDF-Verarbeitung"""
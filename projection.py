@@ -0,0 +1,69 @@
+from pathlib import Path
+import os
+import tempfile
+
+import numpy as np
+
+class PCAProjection:
+    """
+    Lineare Dimensionsreduktion (PCA) für Embeddings
+
+    Die Projektion wird auf einer Stichprobe gespeicherter Embeddings
+    angepasst: Mittelwert abziehen, auf die Hauptachsen mit der größten
+    Varianz abbilden. Sie ist orthogonal, quadrierte L2-Distanzen im
+    Zielraum nähern daher die Distanzen im Originalraum an (es fehlt nur
+    der Anteil der verworfenen Achsen).
+    """
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray, explained_variance_ratio: float):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.ascontiguousarray(components, dtype=np.float32)  # Zieldimension x Eingangsdimension
+        self.explained_variance_ratio = float(explained_variance_ratio)
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def output_dim(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, sample: np.ndarray, target_dim: int) -> "PCAProjection":
+        """Hauptkomponenten über die Kovarianzmatrix (Eingangsdimension x Eingangsdimension)"""
+        sample = np.asarray(sample, dtype=np.float64)
+        if not 0 < target_dim < sample.shape[1]:
+            raise ValueError(f"Zieldimension {target_dim} muss zwischen 1 und {sample.shape[1] - 1} liegen")
+        mean = sample.mean(axis=0)
+        centered = sample - mean
+        covariance = centered.T @ centered / max(len(sample) - 1, 1)
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        order = np.argsort(eigenvalues)[::-1][:target_dim]
+        explained = eigenvalues[order].sum() / max(eigenvalues.sum(), 1e-12)
+        return cls(mean, eigenvectors[:, order].T, explained)
+
+    def apply(self, embeddings: np.ndarray) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        return (embeddings - self.mean) @ self.components.T
+
+    def save(self, path: Path) -> None:
+        """Speichert die Projektion atomar"""
+        path = Path(path)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    mean=self.mean,
+                    components=self.components,
+                    explained_variance_ratio=np.float64(self.explained_variance_ratio)
+                )
+            os.replace(tmp_path, path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    @classmethod
+    def load(cls, path: Path) -> "PCAProjection":
+        with np.load(path) as data:
+            return cls(data["mean"], data["components"], float(data["explained_variance_ratio"]))
@@ -0,0 +1,60 @@
+from typing import Optional
+
+import numpy as np
+
+QUANTIZATION_MODES = ("none", "int8")
+# Zeilen pro Umrechnung nach float32 (klein genug, um im CPU-Cache zu bleiben)
+CONVERT_BLOCK_ROWS = 1024
+
+def int8_row_dtype(dim: int) -> np.dtype:
+    """Zeilenformat der int8-Codes: Skalierungsfaktor (float32) und dim Codes"""
+    return np.dtype([("scale", "<f4"), ("codes", "i1", (dim,))])
+
+def quantize_int8(vectors: np.ndarray) -> np.ndarray:
+    """
+    Symmetrische int8-Quantisierung mit einem Skalierungsfaktor pro Zeile
+
+    Benötigt kein Training und bleibt damit bei inkrementellem Hinzufügen
+    stabil; der Fehler pro Komponente ist höchstens max|x| / 254.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.zeros(0, dtype=np.float32)
+    scales[scales == 0] = 1.0
+    rows = np.empty(len(vectors), dtype=int8_row_dtype(vectors.shape[1]))
+    rows["scale"] = scales
+    rows["codes"] = np.clip(np.rint(vectors / scales[:, None]), -127, 127)
+    return rows
+
+class Int8Matrix:
+    """
+    Lesezugriff auf die int8-Codes einer Embedding-Matrix
+
+    dot() berechnet Skalarprodukte direkt auf den Codes; die Umrechnung nach
+    float32 erfolgt in kleinen Blöcken, der Skalierungsfaktor wird erst auf
+    das Ergebnis angewendet.
+    """
+
+    def __init__(self, rows: np.ndarray):
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def dot(self, index, queries: np.ndarray) -> np.ndarray:
+        """Skalarprodukte der ausgewählten Zeilen mit den Anfragen (Zeilen x Anfragen)"""
+        rows = self.rows[index]
+        result = np.empty((len(rows), len(queries)), dtype=np.float32)
+        for start in range(0, len(rows), CONVERT_BLOCK_ROWS):
+            block = rows[start:start + CONVERT_BLOCK_ROWS]
+            result[start:start + len(block)] = (block["codes"].astype(np.float32) @ queries.T) * block["scale"][:, None]
+        return result
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.rows) * self.rows.dtype.itemsize
+
+def quantization_mode(value: Optional[str]) -> str:
+    mode = (value or "none").lower()
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unbekannte Quantisierung '{mode}' (erlaubt: {', '.join(QUANTIZATION_MODES)})")
+    return mode
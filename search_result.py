@@ -22,6 +22,23 @@ class SearchResult:
             'context': self.context
         }
 
+@dataclass
+class BatchSearchResult:
+    """Ergebnis einer einzelnen Anfrage innerhalb einer Batch-Suche"""
+    query: str
+    results: List[SearchResult]
+    execution_time_ms: float
+    error: Optional[str] = None
+    
+    def to_dict(self) -> Dict:
+        return {
+            'query': self.query,
+            'total_results': len(self.results),
+            'results': [r.to_dict() for r in self.results],
+            'execution_time_ms': self.execution_time_ms,
+            'error': self.error
+        }
+
 class SearchResultFormatter:
     def __init__(self, 
                  show_scores: bool = True,
@@ -2,9 +2,9 @@ from typing import List, Dict, Optional, Union, Tuple
 import logging
 from pathlib import Path
 from dataclasses import dataclass
-from sentence_transformers import SentenceTransformer
-import torch
-from vector_store import VectorStore, VectorStoreException
+import os
+from embedding_backends import get_encoder
+from base_vector_store import VectorStoreException, create_vector_store
 
 @dataclass
 class SearchResult:
@@ -20,30 +20,30 @@ class SemanticSearcher:
     def __init__(self,
                  model_name: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2",
                  persist_directory: str = "chroma_db",
-                 device: Optional[str] = None):
+                 device: Optional[str] = None,
+                 embedding_backend: Optional[str] = None):
         """
         Initialisiert den semantischen Sucher
         
         Args:
             model_name: Name des Embedding-Modells
             persist_directory: Verzeichnis der ChromaDB
-            device: Optional - 'cuda' oder 'cpu'
+            device: Optional - 'cuda' oder 'cpu' (nur torch-Backend)
+            embedding_backend: Optional - 'torch', 'onnx' oder 'onnx-int8' (Standard: EMBEDDING_BACKEND oder torch)
         """
         self.logger = logging.getLogger(__name__)
-        
-        # Device für Inferenz bestimmen
-        if device is None:
-            device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.embedding_backend = embedding_backend or os.environ.get("EMBEDDING_BACKEND", "torch")
         
         try:
-            # Embedding-Modell laden
-            self.model = SentenceTransformer(model_name, device=device)
-            self.logger.info(f"Modell '{model_name}' geladen auf {device}")
+            # Geteiltes Embedding-Modell (einmal pro Prozess, Laden beim ersten Einbetten)
+            self.encoder = get_encoder(model_name, self.embedding_backend, device=device)
             
-            # Vektordatenbank initialisieren
-            self.vector_store = VectorStore(
+            # Vektordatenbank initialisieren (Queries über dieselbe Modellinstanz)
+            self.vector_store = create_vector_store(
                 persist_directory=persist_directory,
-                embedding_function_name=model_name
+                embedding_function_name=model_name if self.embedding_backend == "torch"
+                else f"{model_name}@{self.embedding_backend}",
+                embedding_function=self.encoder.encode
             )
             
         except Exception as e:
@@ -0,0 +1,155 @@
+from typing import Dict, List, Optional, Set
+from bisect import bisect_right
+import logging
+import re
+import sys
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_SPLIT = re.compile(r'[.!?]')
+_WORD = re.compile(r'\w+')
+_SEPARATOR = '\x00'  # Trennt die kleingeschriebenen Sätze im zusammengefügten Suchtext
+
+def extract_keywords(query: str) -> List[str]:
+    """Bereinigt die Suchanfrage und extrahiert die Schlüsselwörter"""
+    cleaned_query = query.lower().strip()
+    cleaned_query = re.sub(r'[?.,!]', '', cleaned_query)
+    logger.debug(f"Bereinigte Query: '{cleaned_query}'")
+
+    # Wichtige Schlüsselwörter (Wörter mit mehr als 3 Buchstaben)
+    keywords = [word for word in cleaned_query.split() if len(word) > 3]
+
+    if not keywords:
+        # Wenn keine langen Schlüsselwörter gefunden wurden, alle Wörter verwenden
+        keywords = cleaned_query.split()
+        logger.debug(f"Keine langen Schlüsselwörter gefunden, verwende alle Wörter: {keywords}")
+
+    return keywords
+
+class SentenceIndex:
+    def __init__(self, text: str):
+        """
+        Vorberechneter Satzindex eines Dokuments für die Direktantwort-Suche
+
+        Der Text wird einmalig in Sätze zerlegt und kleingeschrieben; eine
+        Zuordnung Wort -> Satznummern erlaubt die Suche nach ganzen Wörtern
+        ohne erneuten Durchlauf über den gesamten Text.
+
+        Args:
+            text: Der vollständige Dokumenttext
+        """
+        self.text = text
+        self.sentences: List[str] = []
+        self._offsets: List[int] = []
+        self._postings: Dict[str, List[int]] = {}
+
+        lowered_parts = []
+        position = 0
+        for raw_sentence in _SENTENCE_SPLIT.split(text):
+            sentence = raw_sentence.strip()
+            if not sentence:
+                continue
+
+            sentence_id = len(self.sentences)
+            lowered = sentence.lower()
+            self.sentences.append(sentence)
+            self._offsets.append(position)
+            lowered_parts.append(lowered)
+            position += len(lowered) + 1
+
+            for word in set(_WORD.findall(lowered)):
+                self._postings.setdefault(word, []).append(sentence_id)
+
+        self._lowered = _SEPARATOR.join(lowered_parts)
+        self._size = (
+            sys.getsizeof(text)
+            + sum(sys.getsizeof(s) for s in self.sentences)
+            + sys.getsizeof(self._lowered)
+            + 8 * len(self._offsets)
+            + sum(sys.getsizeof(w) + 8 * len(ids) + 64 for w, ids in self._postings.items())
+        )
+
+    def estimated_size(self) -> int:
+        """Geschätzter Speicherbedarf des Index in Bytes (für die Cache-Abrechnung)"""
+        return self._size
+
+    def find_answer(self, keywords: List[str], max_matches: int = 3) -> Optional[Dict]:
+        """
+        Sucht die relevantesten Sätze zu den Schlüsselwörtern
+
+        Reihenfolge der Strategien wie bisher: Sätze mit allen Schlüsselwörtern
+        als ganze Wörter (1), Sätze mit mindestens einem (2) und Sätze mit
+        Teilwort-Treffern ("fallback"). Sortiert wird jeweils nach der Anzahl
+        enthaltener Schlüsselwörter, bei Gleichstand in Dokumentreihenfolge.
+
+        Die frühere Absatzsuche ("word_search") entfällt: Schlüsselwörter aus
+        extract_keywords enthalten keine Satzzeichen, jeder Absatz mit einem
+        Treffer enthält ihn daher auch in einem Satz.
+
+        Returns:
+            Dictionary mit direct_answer, matches und pattern_used oder None
+        """
+        if not keywords or not self.sentences:
+            return None
+
+        keywords = [k.lower() for k in keywords]
+
+        # Ein Durchlauf pro Schlüsselwort: Ganzwort- und Teilwort-Treffer
+        word_hits = [self._whole_word_hits(k) for k in keywords]
+        substring_hits = [self._substring_hits(k) for k in keywords]
+
+        def score(sentence_id: int) -> int:
+            return sum(sentence_id in hits for hits in substring_hits)
+
+        all_words = set.intersection(*word_hits)
+        if all_words:
+            return self._build_result(all_words, score, 1, max_matches)
+
+        any_word = set.union(*word_hits)
+        if any_word:
+            return self._build_result(any_word, score, 2, max_matches)
+
+        any_substring = set.union(*substring_hits)
+        if any_substring:
+            return self._build_result(any_substring, score, "fallback", max_matches)
+        return None
+
+    def _whole_word_hits(self, keyword: str) -> Set[int]:
+        """Sätze, die das Schlüsselwort als ganzes Wort enthalten"""
+        if _WORD.fullmatch(keyword):
+            return set(self._postings.get(keyword, ()))
+
+        # Schlüsselwörter mit Sonderzeichen: lineare Suche mit Wortgrenzen (ohne Backtracking)
+        pattern = re.compile(rf'\b{re.escape(keyword)}\b')
+        return {self._sentence_at(m.start()) for m in pattern.finditer(self._lowered)}
+
+    def _substring_hits(self, keyword: str) -> Set[int]:
+        """Sätze, die das Schlüsselwort als Teilzeichenkette enthalten"""
+        hits = set()
+        if not keyword:
+            return hits
+
+        start = self._lowered.find(keyword)
+        while start >= 0:
+            sentence_id = self._sentence_at(start)
+            hits.add(sentence_id)
+            # Direkt zum nächsten Satz springen, weitere Treffer im selben Satz zählen nicht
+            next_start = self._offsets[sentence_id + 1] if sentence_id + 1 < len(self._offsets) else len(self._lowered)
+            start = self._lowered.find(keyword, next_start)
+        return hits
+
+    def _sentence_at(self, position: int) -> int:
+        return bisect_right(self._offsets, position) - 1
+
+    def _build_result(self, sentence_ids: Set[int], score, pattern_used, max_matches: int) -> Dict:
+        ranked = sorted(sentence_ids, key=lambda i: (-score(i), i))
+        matches = [self.sentences[i] for i in ranked[:max_matches]]
+
+        for j, match in enumerate(matches):
+            logger.debug(f"Match {j+1}: {match[:100]}...")
+
+        return {
+            "direct_answer": matches[0],
+            "matches": matches,
+            "pattern_used": pattern_used
+        }
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from pathlib import Path
+import json
+import logging
+import os
+import tempfile
+
+from document_catalog import DocumentCatalog
+from extraction_cache import hash_file
+
+@dataclass
+class ManifestEntry:
+    """Stand einer importierten Datei beim letzten Abgleich"""
+    size: int
+    mtime_ns: int
+    content_hash: str
+    synced_at: str = None
+
+    def __post_init__(self):
+        if self.synced_at is None:
+            self.synced_at = datetime.now().isoformat()
+
+@dataclass
+class SyncPlan:
+    """Ergebnis des Vergleichs zwischen Verzeichnis, Manifest und Dokumentkatalog"""
+    new: List[Tuple[Path, str]] = field(default_factory=list)
+    changed: List[Tuple[Path, str]] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    adopted: int = 0  # Bereits im Katalog mit gleichem Hash, nur ins Manifest übernommen
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.new)} neu, {len(self.changed)} geändert, {len(self.removed)} entfernt, "
+            f"{self.unchanged} unverändert, {self.adopted} aus dem Katalog übernommen"
+        )
+
+class SyncManifest:
+    def __init__(self, path: Path):
+        """
+        Manifest eines synchronisierten Ordners (relativer Pfad -> Größe, mtime, Inhalts-Hash)
+
+        Args:
+            path: Pfad zur JSON-Datei des Manifests
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = Path(path)
+        self.entries: Dict[str, ManifestEntry] = {}
+
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            self.entries = {name: ManifestEntry(**entry) for name, entry in data.get('files', {}).items()}
+
+    def save(self) -> None:
+        """Schreibt das Manifest atomar (temporäre Datei + Umbenennen)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {'files': {name: asdict(entry) for name, entry in sorted(self.entries.items())}}
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def plan(self, files: List[Tuple[Path, str]], catalog: DocumentCatalog) -> SyncPlan:
+        """
+        Ordnet jede Datei einer Aktion zu
+
+        Dateien mit unveränderter Größe und mtime werden ohne Hash-Berechnung
+        übersprungen. Bei geänderten Metadaten entscheidet der Inhalts-Hash;
+        Dokumente, die bereits mit gleichem Hash im Katalog stehen (z. B. aus
+        einem früheren Massenimport), werden nur ins Manifest übernommen.
+        """
+        plan = SyncPlan()
+        seen = set()
+
+        for path, name in files:
+            seen.add(name)
+            stat = path.stat()
+            entry = self.entries.get(name)
+
+            if entry and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                plan.unchanged += 1
+                continue
+
+            content_hash = hash_file(str(path))
+            if entry and entry.content_hash == content_hash:
+                # Nur Zeitstempel geändert (z. B. Kopie oder touch)
+                self.entries[name] = ManifestEntry(stat.st_size, stat.st_mtime_ns, content_hash)
+                plan.unchanged += 1
+                continue
+
+            info = catalog.get(name)
+            if entry is None and info is not None and info.content_hash == content_hash:
+                self.entries[name] = ManifestEntry(stat.st_size, stat.st_mtime_ns, content_hash)
+                plan.adopted += 1
+                continue
+
+            if entry is not None or info is not None:
+                plan.changed.append((path, name))
+            else:
+                plan.new.append((path, name))
+
+        plan.removed = sorted(name for name in self.entries if name not in seen)
+        return plan
+
+    def record(self, path: Path, name: str, content_hash: Optional[str]) -> None:
+        """Übernimmt eine erfolgreich importierte Datei"""
+        stat = path.stat()
+        self.entries[name] = ManifestEntry(stat.st_size, stat.st_mtime_ns, content_hash or hash_file(str(path)))
+
+    def forget(self, name: str) -> None:
+        self.entries.pop(name, None)
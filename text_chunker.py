@@ -1,15 +1,10 @@
 from typing import List, Optional, Tuple
 from dataclasses import dataclass
-import nltk
-from nltk.tokenize import sent_tokenize
 import re
 import logging
 from enum import Enum
 
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+from text_resources import sent_tokenize  # NLTK punkt erst beim ersten Aufruf
 
 class ChunkingStrategy(Enum):
     CHARACTER = "character"
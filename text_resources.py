@@ -0,0 +1,74 @@
+from typing import Callable, List, Optional
+import logging
+import os
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+_sentence_tokenizer: Optional[Callable[[str], List[str]]] = None
+_lock = threading.Lock()
+
+def offline_mode() -> bool:
+    """Offline-Betrieb: keine Downloads (OFFLINE_MODE=1 oder HF_HUB_OFFLINE=1)"""
+    return (
+        os.environ.get("OFFLINE_MODE", "").lower() in ("1", "true", "yes")
+        or os.environ.get("HF_HUB_OFFLINE", "") == "1"
+    )
+
+def apply_offline_mode() -> None:
+    """
+    Verbietet Hugging Face im Offline-Modus jeden Netzwerkzugriff
+
+    Muss vor dem ersten Import von sentence_transformers/transformers
+    aufgerufen werden; Modelle kommen dann nur aus dem lokalen Cache.
+    """
+    if offline_mode():
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+def split_sentences(text: str) -> List[str]:
+    """Einfache Satztrennung an Satzzeichen (Ersatz, wenn NLTK punkt fehlt)"""
+    parts = re.split(r'(?<=[.!?])\s+(?=[A-ZÄÖÜ0-9"„(])', text.strip())
+    return [part for part in parts if part]
+
+def _load_sentence_tokenizer() -> Callable[[str], List[str]]:
+    import nltk
+    from nltk.tokenize import sent_tokenize as nltk_sent_tokenize
+
+    def available() -> bool:
+        try:
+            nltk_sent_tokenize("Erster Satz. Zweiter Satz.")
+            return True
+        except LookupError:
+            return False
+
+    if available():
+        return nltk_sent_tokenize
+
+    if offline_mode():
+        logger.warning("NLTK punkt nicht installiert (Offline-Modus) - verwende einfache Satztrennung")
+        return split_sentences
+
+    # Neuere NLTK-Versionen benötigen punkt_tab, ältere punkt
+    for resource in ("punkt_tab", "punkt"):
+        nltk.download(resource, quiet=True)
+    if available():
+        return nltk_sent_tokenize
+
+    logger.warning("NLTK punkt konnte nicht geladen werden - verwende einfache Satztrennung")
+    return split_sentences
+
+def sent_tokenize(text: str) -> List[str]:
+    """
+    Satztrennung mit NLTK punkt, geladen beim ersten Aufruf
+
+    Fehlt punkt, wird es einmalig heruntergeladen, im Offline-Modus
+    stattdessen auf eine einfache Satztrennung ausgewichen.
+    """
+    global _sentence_tokenizer
+    if _sentence_tokenizer is None:
+        with _lock:
+            if _sentence_tokenizer is None:
+                _sentence_tokenizer = _load_sentence_tokenizer()
+    return _sentence_tokenizer(text)
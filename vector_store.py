@@ -1,173 +1,152 @@
-from typing import List, Dict, Optional, Union
+from typing import Callable, List, Dict, Optional, Tuple
 import chromadb
 from chromadb.config import Settings
 from chromadb.utils import embedding_functions
 import numpy as np
 import logging
-from pathlib import Path
-from dataclasses import dataclass
-from datetime import datetime
-import json
 
-@dataclass
-class ChunkMetadata:
-    """Metadaten für einen Text-Chunk"""
-    document_name: str
-    chunk_id: str
-    page_number: int
-    chunk_number: int
-    timestamp: str = None
+from base_vector_store import (
+    BaseVectorStore,
+    ChunkMetadata,
+    DocumentChunks,
+    VectorStoreException,
+    create_vector_store
+)
+
+# Fehlende Collection: ValueError in älteren Chroma-Versionen, NotFoundError ab 0.6
+COLLECTION_NOT_FOUND = (ValueError, getattr(chromadb.errors, "NotFoundError", ValueError))
+
+# Ab Chroma 0.5 werden NumPy-Arrays direkt angenommen (ohne Umweg über Python-Listen)
+NUMPY_EMBEDDINGS = tuple(int(part) for part in chromadb.__version__.split(".")[:2]) >= (0, 5)
+
+class EncoderEmbeddingFunction(embedding_functions.EmbeddingFunction):
+    """Macht eine Funktion Texte -> Embeddings (z. B. ein ONNX-Backend) für Chroma nutzbar"""
     
-    def __post_init__(self):
-        if self.timestamp is None:
-            self.timestamp = datetime.now().isoformat()
+    def __init__(self, encode: Callable[[List[str]], np.ndarray]):
+        self.encode = encode
     
-    def to_dict(self) -> Dict:
-        return {
-            "document_name": self.document_name,
-            "chunk_id": self.chunk_id,
-            "page_number": self.page_number,
-            "chunk_number": self.chunk_number,
-            "timestamp": self.timestamp
-        }
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        return [np.asarray(embedding, dtype=np.float32) for embedding in self.encode(list(input))]
 
-class VectorStoreException(Exception):
-    """Basisklasse für VectorStore-Ausnahmen"""
-    pass
-
-class VectorStore:
-    def __init__(self,
-                 persist_directory: str = "chroma_db",
-                 collection_name: str = "pdf_chunks",
-                 embedding_function_name: str = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"):
-        """
-        Initialisiert die Vektordatenbank
+class VectorStore(BaseVectorStore):
+    """Vektordatenbank auf Basis von ChromaDB (Parameter siehe BaseVectorStore)"""
+    
+    def _open_storage(self) -> bool:
+        # Client initialisieren
+        self.client = chromadb.Client(Settings(
+            persist_directory=str(self.persist_directory),
+            anonymized_telemetry=False,
+            is_persistent=True
+        ))
         
-        Args:
-            persist_directory: Verzeichnis für persistente Speicherung
-            collection_name: Name der Collection
-            embedding_function_name: Name des Embedding-Modells
-        """
-        self.logger = logging.getLogger(__name__)
-        self.persist_directory = Path(persist_directory)
-        self.collection_name = collection_name
+        # Embedding-Funktion für Chroma (gleiche Modellinstanz wie die Query-Einbettung)
+        chroma_embedding_function = EncoderEmbeddingFunction(self.embedding_function)
         
+        # Collection erstellen oder laden
         try:
-            # Verzeichnis erstellen
-            self.persist_directory.mkdir(parents=True, exist_ok=True)
-            
-            # Client initialisieren
-            self.client = chromadb.Client(Settings(
-                persist_directory=str(self.persist_directory),
-                anonymized_telemetry=False,
-                is_persistent=True
-            ))
-            
-            # Embedding-Funktion konfigurieren
-            self.embedding_function = embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name=embedding_function_name
+            self.collection = self.client.get_collection(
+                name=self.collection_name,
+                embedding_function=chroma_embedding_function
             )
-            
-            # Collection erstellen oder laden
-            try:
-                self.collection = self.client.get_collection(
-                    name=collection_name,
-                    embedding_function=self.embedding_function
-                )
-                self.logger.info(f"Bestehende Collection '{collection_name}' geladen")
-            except ValueError:
-                self.collection = self.client.create_collection(
-                    name=collection_name,
-                    embedding_function=self.embedding_function
-                )
-                self.logger.info(f"Neue Collection '{collection_name}' erstellt")
-                
-        except Exception as e:
-            raise VectorStoreException(f"Fehler bei der Initialisierung: {str(e)}")
+            self.logger.info(f"Bestehende Collection '{self.collection_name}' geladen")
+            return False
+        except COLLECTION_NOT_FOUND:
+            self.collection = self.client.create_collection(
+                name=self.collection_name,
+                embedding_function=chroma_embedding_function
+            )
+            self.logger.info(f"Neue Collection '{self.collection_name}' erstellt")
+            return True
     
-    def add_chunks(self,
-                  chunks: List[str],
-                  embeddings: np.ndarray,
-                  document_name: str,
-                  page_numbers: List[int]) -> bool:
-        """
-        Fügt Chunks und ihre Embeddings zur Datenbank hinzu
-        
-        Args:
-            chunks: Liste von Textabschnitten
-            embeddings: NumPy-Array mit Embeddings
-            document_name: Name des Quelldokuments
-            page_numbers: Liste der Seitenzahlen für jeden Chunk
-        """
-        try:
-            # Eingabevalidierung
-            if len(chunks) != len(embeddings):
-                raise ValueError("Anzahl der Chunks und Embeddings stimmt nicht überein")
-            
-            if len(chunks) != len(page_numbers):
-                raise ValueError("Anzahl der Chunks und Seitenzahlen stimmt nicht überein")
-            
-            # IDs und Metadaten vorbereiten
-            chunk_ids = []
-            metadatas = []
-            
-            for i, (chunk, page_num) in enumerate(zip(chunks, page_numbers)):
-                chunk_id = f"{document_name}_chunk_{i}"
-                metadata = ChunkMetadata(
-                    document_name=document_name,
-                    chunk_id=chunk_id,
-                    page_number=page_num,
-                    chunk_number=i
-                )
-                
-                chunk_ids.append(chunk_id)
-                metadatas.append(metadata.to_dict())
-            
-            # Chunks zur Collection hinzufügen
+    def _add_records(self,
+                     chunk_ids: List[str],
+                     embeddings: np.ndarray,
+                     texts: List[str],
+                     metadatas: List[Dict],
+                     added_ids: List[str]) -> None:
+        """Fügt Chunks in Blöcken der maximalen Batchgröße hinzu (added_ids für Rollbacks)"""
+        batch_size = self._max_batch_size()
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        for start in range(0, len(chunk_ids), batch_size):
+            end = start + batch_size
+            batch = embeddings[start:end]
             self.collection.add(
-                ids=chunk_ids,
-                embeddings=embeddings.tolist(),  # NumPy-Array in Liste konvertieren
-                documents=chunks,
-                metadatas=metadatas
+                ids=chunk_ids[start:end],
+                embeddings=batch if NUMPY_EMBEDDINGS else batch.tolist(),
+                documents=texts[start:end],
+                metadatas=metadatas[start:end]
             )
-            
-            self.logger.info(
-                f"{len(chunks)} Chunks aus {document_name} zur Vektordatenbank hinzugefügt"
+            added_ids.extend(chunk_ids[start:end])
+    
+    def _update_metadatas(self, records: List[Tuple[str, Dict]]) -> None:
+        batch_size = self._max_batch_size()
+        for start in range(0, len(records), batch_size):
+            part = records[start:start + batch_size]
+            self.collection.update(
+                ids=[chunk_id for chunk_id, _ in part],
+                metadatas=[metadata for _, metadata in part]
             )
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Fehler beim Hinzufügen der Chunks: {str(e)}")
-            return False
     
-    def search(self,
-              query: str,
-              n_results: int = 3,
-              where: Optional[Dict] = None) -> List[Dict]:
+    def _delete_ids(self, chunk_ids: List[str]) -> None:
+        batch_size = self._max_batch_size()
+        for start in range(0, len(chunk_ids), batch_size):
+            self.collection.delete(ids=chunk_ids[start:start + batch_size])
+    
+    def _document_metadatas(self, document_name: str) -> Dict[str, Dict]:
+        existing = self.collection.get(where={"document_name": document_name}, include=["metadatas"])
+        return dict(zip(existing['ids'], existing['metadatas']))
+    
+    def _all_metadatas(self) -> List[Dict]:
+        if self.collection.count() == 0:
+            return []
+        return self.collection.get(include=["metadatas"])['metadatas'] or []
+    
+    def _delete_document_records(self, document_name: str) -> None:
+        self.collection.delete(
+            where={"document_name": document_name}
+        )
+    
+    def _clear_records(self) -> None:
+        self.collection.delete()
+    
+    def _max_batch_size(self) -> int:
+        """Maximale Anzahl Einträge pro collection.add (abhängig von der ChromaDB-Version)"""
+        try:
+            return self.client.get_max_batch_size()
+        except Exception:
+            return 5000
+    
+    def search_many_by_vector(self,
+                              query_embeddings: List[np.ndarray],
+                              n_results: int = 3,
+                              where: Optional[Dict] = None) -> List[List[Dict]]:
         """
-        Führt eine Ähnlichkeitssuche durch
+        Ähnlichkeitssuche für mehrere Query-Embeddings in einer Datenbankabfrage
         
         Args:
-            query: Suchanfrage
-            n_results: Anzahl der gewünschten Ergebnisse
-            where: Optionaler Filter für Metadaten
+            query_embeddings: Embeddings der Suchanfragen
+            n_results: Anzahl der gewünschten Ergebnisse je Anfrage
+            where: Optionaler Filter für Metadaten (gilt für alle Anfragen)
+        
+        Returns:
+            Eine Ergebnisliste pro Query-Embedding (gleiche Reihenfolge)
         """
         try:
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=[np.asarray(e, dtype=np.float32).tolist() for e in query_embeddings],
                 n_results=n_results,
                 where=where
             )
             
             # Ergebnisse formatieren
             formatted_results = []
-            for i in range(len(results['ids'][0])):
-                formatted_results.append({
-                    'id': results['ids'][0][i],
-                    'text': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'distance': results['distances'][0][i] if 'distances' in results else None
-                })
+            for q in range(len(results['ids'])):
+                formatted_results.append([{
+                    'id': results['ids'][q][i],
+                    'text': results['documents'][q][i],
+                    'metadata': results['metadatas'][q][i],
+                    'distance': results['distances'][q][i] if results.get('distances') else None
+                } for i in range(len(results['ids'][q]))])
             
             return formatted_results
             
@@ -175,78 +154,43 @@ class VectorStore:
             self.logger.error(f"Fehler bei der Suche: {str(e)}")
             raise VectorStoreException(f"Suchfehler: {str(e)}")
     
+    def get_chunk_texts(self, chunk_ids: List[str]) -> Dict[str, str]:
+        """Holt die Texte mehrerer Chunks in einem Aufruf (ID -> Text)"""
+        chunk_ids = list(dict.fromkeys(chunk_ids))
+        if not chunk_ids:
+            return {}
+        
+        try:
+            results = self.collection.get(ids=chunk_ids, include=["documents"])
+            return dict(zip(results['ids'], results['documents']))
+            
+        except Exception as e:
+            self.logger.error(f"Fehler beim Abrufen der Chunks: {str(e)}")
+            raise VectorStoreException(f"Fehler beim Abrufen der Chunks: {str(e)}")
+    
     def get_document_chunks(self, document_name: str) -> List[Dict]:
-        """Holt alle Chunks eines bestimmten Dokuments"""
+        """Holt alle Chunks eines bestimmten Dokuments (nach Chunk-Nummer sortiert)"""
         try:
-            results = self.collection.query(
-                query_texts=[""],  # Leere Abfrage
+            results = self.collection.get(
                 where={"document_name": document_name},
-                n_results=1000  # Hoher Wert, um alle Chunks zu bekommen
+                include=["documents", "metadatas"]
             )
             
-            return [{
+            chunks = [{
                 'id': id_,
                 'text': doc,
                 'metadata': meta
             } for id_, doc, meta in zip(
-                results['ids'][0],
-                results['documents'][0],
-                results['metadatas'][0]
+                results['ids'],
+                results['documents'],
+                results['metadatas']
             )]
+            chunks.sort(key=lambda x: x['metadata']['chunk_number'])
+            return chunks
             
         except Exception as e:
             self.logger.error(f"Fehler beim Abrufen der Dokument-Chunks: {str(e)}")
             raise VectorStoreException(f"Fehler beim Abrufen der Chunks: {str(e)}")
-    
-    def list_documents(self) -> List[str]:
-        """Listet alle verfügbaren Dokumente auf"""
-        try:
-            results = self.collection.get()
-            if not results['metadatas']:
-                return []
-            
-            # Eindeutige Dokumentnamen extrahieren
-            document_names = {
-                meta['document_name']
-                for meta in results['metadatas']
-            }
-            
-            return sorted(list(document_names))
-            
-        except Exception as e:
-            self.logger.error(f"Fehler beim Auflisten der Dokumente: {str(e)}")
-            raise VectorStoreException(f"Fehler beim Auflisten: {str(e)}")
-    
-    def has_documents(self) -> bool:
-        """Prüft, ob Dokumente in der Collection vorhanden sind"""
-        try:
-            return len(self.list_documents()) > 0
-        except:
-            return False
-    
-    def delete_document(self, document_name: str) -> bool:
-        """Löscht alle Chunks eines Dokuments"""
-        try:
-            self.collection.delete(
-                where={"document_name": document_name}
-            )
-            self.logger.info(f"Dokument '{document_name}' gelöscht")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Fehler beim Löschen von {document_name}: {str(e)}")
-            return False
-    
-    def clear(self) -> bool:
-        """Löscht alle Daten aus der Collection"""
-        try:
-            self.collection.delete()
-            self.logger.info("Collection geleert")
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Fehler beim Leeren der Collection: {str(e)}")
-            return False
 
 # Beispielverwendung
 if __name__ == "__main__":